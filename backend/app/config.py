@@ -32,7 +32,40 @@ class Settings(BaseSettings):
     UPDATE_PRICE_CRON: str = "30 6 * * *"   # 每天早上6:30更新前一日收盘价
     # Agent更新配置 - 偶数整点更新
     UPDATE_NEWS_CRON: str = "0 0,2,4,6,8,10,12,14,16,18,20,22 * * *"    # 偶数整点更新新闻
-    UPDATE_AI_ANALYSIS_CRON: str = "0 0,2,4,6,8,10,12,14,16,18,20,22 * * *"  # 偶数整点更新AI分析（看涨/看跌/机构/建议）
+    UPDATE_AI_ANALYSIS_CRON: str = "0 0,2,4,6,8,10,12,14,16,18,20,22 * * *"  # 偶数整点更新AI分析（看涨/看跌/机构/建议/总结）
+    AI_PIPELINE_CONCURRENCY: int = 3    # AI分析流水线（预热/定时更新）最大并发任务数
+    AI_COMBINED_FACTORS: bool = False   # 看涨/看跌因子合并为一次联网搜索（减少一半搜索调用和Token消耗）
+    ANALYSIS_CHANGE_DETECTION: bool = True  # 定时更新时跳过输入（新闻、金价、上游分析）无实质变化的AI分析
+    ANALYSIS_PRICE_CHANGE_THRESHOLD: float = 0.5  # 金价变动超过该幅度（%）视为输入变化
+    ANALYSIS_MAX_STALENESS: int = 21600  # 距上次运行超过该时间（秒）时无论输入是否变化都重新计算
+    
+    # 实时行情数据源配置
+    QUOTE_HEDGE_DELAY_MS: int = 300     # 对冲延迟：主数据源超过该时间未返回则并发请求备用数据源
+    QUOTE_FETCH_TIMEOUT: float = 5.0    # 单个数据源请求超时（秒）
+    QUOTE_POLLER_ENABLED: bool = True   # 是否启用后台行情轮询
+    QUOTE_POLL_INTERVAL: float = 5.0    # 后台行情轮询间隔（秒）
+    QUOTE_SNAPSHOT_MAX_AGE: float = 30.0  # 行情快照最大有效期（秒），超过则回退为直接请求
+    TICK_FLUSH_INTERVAL: float = 30.0   # 日内Tick落盘间隔（秒）
+    QUOTE_STREAM_QUEUE_SIZE: int = 16   # 行情推送每个客户端的队列长度（满时丢弃最旧消息）
+    CIRCUIT_WINDOW_SECONDS: float = 60.0  # 熔断器滚动统计窗口（秒）
+    CIRCUIT_MIN_REQUESTS: int = 5       # 窗口内至少多少次请求才计算错误率
+    CIRCUIT_ERROR_THRESHOLD: float = 0.5  # 错误率超过该值时熔断
+    CIRCUIT_OPEN_SECONDS: float = 30.0  # 熔断后多久进入半开探测（秒）
+    
+    # 缓存配置
+    CACHE_BACKEND: str = "memory"       # 一级缓存后端：memory（进程内）/ shm（共享内存，多worker共享）/ redis
+    CACHE_MEMORY_MAX_ENTRIES: int = 256  # 进程内缓存最大条目数（超出时淘汰最久未使用的条目）
+    CACHE_MEMORY_MAX_BYTES: int = 67108864  # 进程内缓存最大近似字节数（默认64MB）
+    CACHE_SHM_DIR: str = ""             # 共享内存段目录，默认 /dev/shm/goldmind_cache
+    CACHE_SHM_MAX_SEGMENTS: int = 512   # 共享内存段最大数量（超出时删除最久未写入的共享段）
+    CACHE_REDIS_URL: str = "redis://localhost:6379/0"  # redis 后端地址（需安装 redis 包）
+    CACHE_SERIALIZER: str = "orjson"    # 缓存编码：orjson / msgpack / json（未安装时回退为 json）
+    CACHE_COMPRESSION: str = "none"     # 缓存压缩：none / zstd（需安装 zstandard）
+    CACHE_HARD_TTL: int = 604800        # 缓存硬过期时间（秒）：超过软过期（ttl）仍返回旧数据并后台刷新，超过硬过期才视为未命中
+    CACHE_FAILURE_BACKOFF_BASE: int = 60  # 刷新失败后的初始退避时间（秒），连续失败时指数增长
+    CACHE_FAILURE_BACKOFF_MAX: int = 3600  # 刷新失败退避时间上限（秒）
+    LLM_CACHE_ENABLED: bool = True      # 输入（新闻、价格、上游分析结果）未变化时复用上次的LLM结果
+    LLM_CACHE_TTL: int = 86400          # LLM结果最长复用时间（秒），联网搜索结果需要定期更新
     
     class Config:
         env_file = ".env"
@@ -1,5 +1,6 @@
 """FastAPI 主应用入口"""
 import os
+import time
 import asyncio
 from datetime import datetime
 from contextlib import asynccontextmanager
@@ -11,49 +12,32 @@ from app.config import settings
 from app.database import engine, Base
 from app.routers import gold_prices, analysis, news, predictions
 from app.scheduler import init_scheduler, shutdown_scheduler
+from app.services.http_pool import close_async_client
+from app.services.quote_poller import quote_poller
+from app.services.quote_broadcaster import quote_broadcaster
 
 
 async def warmup_cache():
-    """启动时预热缓存（后台执行，不阻塞服务启动）"""
+    """启动时预热缓存（后台执行，不阻塞服务启动）
+
+    只计算缓存缺失或过期的AI分析及其下游任务，按依赖顺序执行：
+    看涨/看跌/机构预测并发执行，投资建议和市场总结等待其结果后再生成。
+    """
     await asyncio.sleep(5)  # 等待5秒让系统完全启动
     try:
-        from app.database import SessionLocal
-        from app.services.bullish_factor_service import BullishFactorService
-        from app.services.bearish_factor_service import BearishFactorService
-        from app.services.institution_prediction_service import InstitutionPredictionService
-        from app.services.investment_advice_service import InvestmentAdviceService
+        from app.services.analysis_pipeline import ANALYSIS_NODES, plan_warmup, run_warmup
+        from app.services.cache_manager import FALLBACK_FLAG
+        
+        keys = plan_warmup()
+        if not keys:
+            logger.info("[缓存预热] AI分析缓存均有效，无需预热")
+            return
         
-        db = SessionLocal()
-        try:
-            logger.info("[缓存预热] 开始后台预热Agent缓存...")
-            
-            # 预热看涨因子
-            bullish_service = BullishFactorService(db)
-            if not bullish_service.cache.exists():
-                logger.info("[缓存预热] 触发看涨因子分析...")
-                bullish_service._trigger_background_analysis()
-            
-            # 预热看跌因子
-            bearish_service = BearishFactorService(db)
-            if not bearish_service.cache.exists():
-                logger.info("[缓存预热] 触发看跌因子分析...")
-                bearish_service._trigger_background_analysis()
-            
-            # 预热机构预测
-            institution_service = InstitutionPredictionService(db)
-            if not institution_service.cache.exists():
-                logger.info("[缓存预热] 触发机构预测分析...")
-                institution_service._trigger_background_analysis()
-            
-            # 预热投资建议
-            advice_service = InvestmentAdviceService(db)
-            if not advice_service.cache.exists():
-                logger.info("[缓存预热] 触发投资建议分析...")
-                advice_service._trigger_background_analysis()
-            
-            logger.info("[缓存预热] 所有预热任务已启动")
-        finally:
-            db.close()
+        logger.info(f"[缓存预热] 开始后台预热: {', '.join(ANALYSIS_NODES[k].name for k in keys)}")
+        loop = asyncio.get_event_loop()
+        results = await loop.run_in_executor(None, run_warmup, keys)
+        succeeded = sum(1 for r in results.values() if r and not r.get(FALLBACK_FLAG))
+        logger.info(f"[缓存预热] 预热完成: {succeeded}/{len(keys)} 项成功")
     except Exception as e:
         logger.error(f"[缓存预热] 预热失败: {e}")
 
@@ -66,6 +50,10 @@ async def lifespan(app: FastAPI):
     Base.metadata.create_all(bind=engine)
     logger.info("数据库表创建完成")
     
+    # 启动后台行情轮询（请求处理直接读取最新行情快照）
+    if settings.QUOTE_POLLER_ENABLED:
+        quote_poller.start()
+    
     if settings.SCHEDULER_ENABLED:
         init_scheduler()
         logger.info("定时任务调度器已启动")
@@ -77,6 +65,8 @@ async def lifespan(app: FastAPI):
     
     logger.info("关闭黄金市场分析系统...")
     shutdown_scheduler()
+    await quote_poller.stop()
+    await close_async_client()
 
 
 app = FastAPI(
@@ -182,12 +172,8 @@ async def health_check():
     
     # 2. 检查腾讯财经API（轻量级）
     try:
-        import requests
-        response = requests.get(
-            "https://qt.gtimg.cn/q=hf_GC",
-            timeout=3,
-            headers={'User-Agent': 'Mozilla/5.0'}
-        )
+        from app.services.http_pool import provider_get
+        response = provider_get("tencent", "https://qt.gtimg.cn/q=hf_GC", timeout=3)
         health_status["services"]["tencent_api"] = {
             "status": "available" if response.status_code == 200 else "degraded",
             "response_code": response.status_code
@@ -198,13 +184,57 @@ async def health_check():
             "error": str(e)
         }
     
-    # 3. 检查缓存状态
+    # 3. 实时行情数据源统计（延迟分布与胜出率）
+    try:
+        from app.services.gold_price_service import gold_price_service
+        from app.services.http_pool import get_pool_stats
+        from app.services.circuit_breaker import get_breaker_states
+        breakers = get_breaker_states()
+        health_status["services"]["quote_sources"] = {
+            "status": "degraded" if any(b["state"] != "closed" for b in breakers.values()) else "ok",
+            "hedge_delay_ms": settings.QUOTE_HEDGE_DELAY_MS,
+            "sources": gold_price_service.get_source_stats(),
+            "circuit_breakers": breakers,
+            "connection_pool": get_pool_stats()
+        }
+    except Exception as e:
+        health_status["services"]["quote_sources"] = {
+            "status": "error",
+            "error": str(e)
+        }
+    
+    # 4. 后台行情轮询状态
+    try:
+        from app.services.quote_poller import get_quote_snapshot
+        snapshot = get_quote_snapshot()
+        health_status["services"]["quote_poller"] = {
+            "status": "running" if quote_poller.running else "stopped",
+            "interval_seconds": quote_poller.interval,
+            "snapshot_version": snapshot.version if snapshot else 0,
+            "gold_age_seconds": round(time.time() - snapshot.gold_at, 1) if snapshot and snapshot.gold else None,
+            "dollar_age_seconds": round(time.time() - snapshot.dollar_at, 1) if snapshot and snapshot.dollar else None,
+            "stream": quote_broadcaster.get_stats()
+        }
+    except Exception as e:
+        health_status["services"]["quote_poller"] = {
+            "status": "error",
+            "error": str(e)
+        }
+    
+    # 5. 检查缓存状态
     try:
         cache_dir = Path(__file__).parent.parent / "cache"
-        cache_files = list(cache_dir.glob("*.json"))
+        cache_files = list(cache_dir.glob("*.cache")) + list(cache_dir.glob("*.json"))
+        from app.services.cache_backends import get_backend
+        from app.services.cache_manager import get_cache_ages
+        from app.services.analysis_pipeline import get_warmup_progress
         health_status["services"]["cache"] = {
             "status": "ok",
+            "backend": get_backend().name,
             "files_count": len(cache_files),
+            "ages_seconds": get_cache_ages(),
+            "memory": {k: v for k, v in get_backend().stats().items() if k != "keys"},
+            "warmup": get_warmup_progress(),
             "cache_dir": str(cache_dir)
         }
     except Exception as e:
@@ -213,12 +243,14 @@ async def health_check():
             "error": str(e)
         }
     
-    # 4. 检查定时任务调度器
+    # 6. 检查定时任务调度器
     try:
         from app.scheduler import scheduler
+        from app.services.analysis_pipeline import get_refresh_progress
         health_status["services"]["scheduler"] = {
             "status": "running" if scheduler.running else "stopped",
-            "jobs_count": len(scheduler.get_jobs())
+            "jobs_count": len(scheduler.get_jobs()),
+            "ai_analysis": get_refresh_progress()
         }
     except Exception as e:
         health_status["services"]["scheduler"] = {
@@ -226,7 +258,7 @@ async def health_check():
             "error": str(e)
         }
     
-    # 5. 检查AI服务配置
+    # 7. 检查AI服务配置
     try:
         health_status["services"]["ai_config"] = {
             "status": "ok",
@@ -3,3 +3,4 @@ from app.database import Base
 from app.models.gold_price import GoldPrice, DollarIndex
 from app.models.news import GoldNews
 from app.models.analysis import MarketFactor, InstitutionView, Prediction
+from app.models.update_log import UpdateLog, UpdateStatus
@@ -1,5 +1,5 @@
 """数据更新日志模型"""
-from sqlalchemy import Column, Integer, String, DateTime, Text, Enum
+from sqlalchemy import Column, Integer, String, Float, DateTime, Text, Enum
 from sqlalchemy.sql import func
 from app.database import Base
 import enum
@@ -8,6 +8,7 @@ import enum
 class UpdateStatus(enum.Enum):
     SUCCESS = "success"
     FAILED = "failed"
+    SKIPPED_UNCHANGED = "skipped_unchanged"  # 输入无实质变化，跳过更新
 
 
 class UpdateLog(Base):
@@ -15,7 +16,8 @@ class UpdateLog(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     data_type = Column(String(50), nullable=False, index=True)
-    status = Column(Enum(UpdateStatus), nullable=False)
+    # 按枚举值（success / failed / skipped_unchanged）存储，与 schema.sql 中的 ENUM 定义一致
+    status = Column(Enum(UpdateStatus, values_callable=lambda e: [m.value for m in e]), nullable=False)
     records_affected = Column(Integer)
     error_message = Column(Text)
     duration_seconds = Column(Float)
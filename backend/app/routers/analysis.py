@@ -1,6 +1,9 @@
 """市场分析 API 路由"""
+import asyncio
+import json
 from typing import List, Optional, Dict, Any
 from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.schemas.analysis import FactorResponse, InstitutionResponse
@@ -8,6 +11,47 @@ from app.schemas.analysis import FactorResponse, InstitutionResponse
 router = APIRouter()
 
 
+def _factor_stream_response(side: str, reuse: bool = False) -> StreamingResponse:
+    """
+    将流式刷新事件转换为 Server-Sent Events
+
+    分析在线程池中执行，客户端断开后仍会完成并写入缓存；每15秒无事件时发送心跳注释保持连接。
+    """
+    from app.services.factor_stream_service import stream_factor_refresh
+
+    async def event_stream():
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+
+        def produce():
+            try:
+                for item in stream_factor_refresh(side, reuse):
+                    loop.call_soon_threadsafe(queue.put_nowait, item)
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, None)
+
+        loop.run_in_executor(None, produce)
+        while True:
+            try:
+                item = await asyncio.wait_for(queue.get(), timeout=15)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            if item is None:
+                break
+            event, data = item
+            yield f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"  # 禁止nginx缓冲推送内容
+        }
+    )
+
+
 @router.get("/factors", response_model=List[FactorResponse])
 async def get_market_factors(
     factor_type: Optional[str] = None,
@@ -167,6 +211,19 @@ async def refresh_bullish_factors(db: Session = Depends(get_db)):
     }
 
 
+@router.get("/bullish-factors-ai/stream")
+async def stream_bullish_factors(reuse: bool = False):
+    """
+    流式刷新看涨因子分析（Server-Sent Events）
+
+    - 逐段推送模型生成的文本（token 事件），每个因子生成完整时推送该因子（factor 事件）
+    - 完整结果校验通过后写入缓存，推送 done 事件（数据格式与 /bullish-factors-ai 相同）
+    - 失败时推送 error 事件，缓存保持不变
+    - 默认总是重新搜索；reuse=true 时输入未变化则回放上次的LLM结果
+    """
+    return _factor_stream_response("bullish", reuse)
+
+
 @router.get("/bearish-factors-ai", response_model=Dict[str, Any])
 async def get_bearish_factors_analysis(
     refresh: bool = False,
@@ -222,6 +279,19 @@ async def refresh_bearish_factors(db: Session = Depends(get_db)):
     }
 
 
+@router.get("/bearish-factors-ai/stream")
+async def stream_bearish_factors(reuse: bool = False):
+    """
+    流式刷新看空因子分析（Server-Sent Events）
+
+    - 逐段推送模型生成的文本（token 事件），每个因子生成完整时推送该因子（factor 事件）
+    - 完整结果校验通过后写入缓存，推送 done 事件（数据格式与 /bearish-factors-ai 相同）
+    - 失败时推送 error 事件，缓存保持不变
+    - 默认总是重新搜索；reuse=true 时输入未变化则回放上次的LLM结果
+    """
+    return _factor_stream_response("bearish", reuse)
+
+
 @router.get("/institution-predictions-ai", response_model=Dict[str, Any])
 async def get_institution_predictions_analysis(
     refresh: bool = False,
@@ -1,15 +1,24 @@
 """黄金价格 API 路由"""
+import asyncio
+import json
 from datetime import datetime, timedelta
 from typing import List, Optional
-from fastapi import APIRouter, Query, HTTPException
+from fastapi import APIRouter, Query, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
 from anyio import to_thread
 from app.database import get_db_context
 from app.schemas.gold_price import (
     DailyPriceResponse,
     CorrelationDataResponse,
-    GoldStatsResponse
+    GoldStatsResponse,
+    BarResponse
 )
 from app.services.gold_service import GoldService
+from app.services.batch_quote_service import QUOTE_SYMBOLS, resolve_symbols
+from app.services.quote_poller import get_latest_quotes, get_snapshot_dollar
+from app.services.query_cache import query_cache, PRICES_DAILY, PRICES_CORRELATION
+from app.services.quote_broadcaster import quote_broadcaster
+from app.services.tick_store import tick_store, BAR_INTERVALS, TICK_SYMBOLS
 from loguru import logger
 
 router = APIRouter()
@@ -25,8 +34,8 @@ async def get_daily_prices(
     """
     获取日线价格数据
     
-    - 历史数据使用当日收盘价
-    - 最后一个数据点使用实时价格（如果include_realtime=True）
+    - 历史数据使用当日收盘价（按日期区间缓存，价格更新任务写入后失效）
+    - 最后一个数据点使用实时价格（如果include_realtime=True，不缓存）
     """
     if start_date:
         start = datetime.strptime(start_date, "%Y-%m-%d")
@@ -53,16 +62,14 @@ async def get_daily_prices(
                 for p in prices
             ]
     
-    prices_data = await to_thread.run_sync(fetch_data)
+    # 缓存键使用规范化后的日期区间（未传参数时的默认值也归一到具体日期）
+    params = {"start": start.strftime("%Y-%m-%d"), "end": end.strftime("%Y-%m-%d")}
+    prices_data = await to_thread.run_sync(
+        lambda: query_cache.get_or_compute(PRICES_DAILY, params, fetch_data)
+    )
     
-    result = [
-        DailyPriceResponse(
-            date=p["date"],
-            price=p["price"],
-            volume=p["volume"]
-        )
-        for p in prices_data
-    ]
+    # 复制列表，替换实时数据点时不修改缓存中的结果（由 response_model 负责序列化）
+    result = list(prices_data)
     
     # 如果需要实时价格，将最后一个数据点替换为实时价格
     if include_realtime and result:
@@ -77,21 +84,13 @@ async def get_daily_prices(
             current_price = realtime_info.get("price", 0)
             
             # 检查最后一天是否是今天
-            last_date = result[-1].date
+            last_date = result[-1]["date"]
             if last_date == today:
                 # 更新今天的价格为实时价格
-                result[-1] = DailyPriceResponse(
-                    date=today,
-                    price=current_price,
-                    volume=0
-                )
+                result[-1] = {"date": today, "price": current_price, "volume": 0}
             else:
                 # 添加今天的实时价格
-                result.append(DailyPriceResponse(
-                    date=today,
-                    price=current_price,
-                    volume=0
-                ))
+                result.append({"date": today, "price": current_price, "volume": 0})
     
     return result
 
@@ -107,8 +106,8 @@ async def get_correlation_data(
     """
     获取黄金与美元指数相关性数据
     
-    - 历史数据使用当日收盘价
-    - 最后一个数据点使用实时价格（如果include_realtime=True）
+    - 历史数据使用当日收盘价（按limit缓存，金价/美元指数更新任务写入后失效）
+    - 最后一个数据点使用实时价格（如果include_realtime=True，不缓存）
     """
     # 在线程池中执行同步数据库操作
     def fetch_data():
@@ -116,29 +115,26 @@ async def get_correlation_data(
             service = GoldService(db)
             return service.get_correlation_data(limit)
     
-    correlation_data = await to_thread.run_sync(fetch_data)
+    correlation_data = await to_thread.run_sync(
+        lambda: query_cache.get_or_compute(PRICES_CORRELATION, {"limit": limit}, fetch_data)
+    )
     
-    result = [
-        CorrelationDataResponse(
-            date=item["date"],
-            gold_price=item["gold_price"],
-            dollar_index=item["dollar_index"]
-        )
-        for item in correlation_data
-    ]
+    # 复制列表，替换实时数据点时不修改缓存中的结果
+    result = list(correlation_data)
     
     # 如果需要实时价格，将最后一个数据点替换为实时价格
     if include_realtime and result:
-        def fetch_realtime():
-            with get_db_context() as db:
-                service = GoldService(db)
-                gold = service.get_realtime_price_info()
-                dollar = service.get_realtime_dollar_index()
-                logger.info(f"[Correlation] realtime gold: {gold}")
-                logger.info(f"[Correlation] realtime dollar: {dollar}")
-                return gold, dollar
+        # 金价与美元指数合并为一次批量请求（快照新鲜时不访问上游）
+        quotes = await get_latest_quotes(["gold", "dxy"])
+        realtime_info, dollar_realtime = quotes["gold"], quotes["dxy"]
 
-        realtime_info, dollar_realtime = await to_thread.run_sync(fetch_realtime)
+        if not realtime_info:
+            # 实时行情不可用时回退为数据库最新数据
+            def fetch_fallback():
+                with get_db_context() as db:
+                    return GoldService(db).get_realtime_price_info()
+
+            realtime_info = await to_thread.run_sync(fetch_fallback)
 
         logger.info(f"[Correlation] after fetch - realtime_info: {realtime_info}")
         logger.info(f"[Correlation] after fetch - dollar_realtime: {dollar_realtime}")
@@ -151,44 +147,72 @@ async def get_correlation_data(
                 current_dollar_index = dollar_realtime.get("price", 0)
                 logger.info(f"[Correlation] Using realtime dollar_index: {current_dollar_index}")
             else:
-                current_dollar_index = result[-1].dollar_index
+                current_dollar_index = result[-1]["dollar_index"]
                 logger.info(f"[Correlation] dollar_realtime is None, using historical: {current_dollar_index}")
 
             # 检查最后一天是否是今天
-            last_date = result[-1].date
+            last_date = result[-1]["date"]
             logger.info(f"[Correlation] last_date: {last_date}, today: {today}, equal: {last_date == today}")
 
             if last_date == today:
                 # 更新今天的价格为实时价格
                 logger.info(f"[Correlation] Updating today's data")
-                result[-1] = CorrelationDataResponse(
-                    date=today,
-                    gold_price=current_gold_price,
-                    dollar_index=current_dollar_index
-                )
+                result[-1] = {
+                    "date": today,
+                    "gold_price": current_gold_price,
+                    "dollar_index": current_dollar_index
+                }
             else:
                 # 添加今天的实时价格
                 logger.info(f"[Correlation] Appending new data for today")
-                result.append(CorrelationDataResponse(
-                    date=today,
-                    gold_price=current_gold_price,
-                    dollar_index=current_dollar_index
-                ))
+                result.append({
+                    "date": today,
+                    "gold_price": current_gold_price,
+                    "dollar_index": current_dollar_index
+                })
 
             logger.info(f"[Correlation] Final result last item: {result[-1]}")
     
     return result
 
 
+@router.get("/quotes")
+async def get_quotes(
+    symbols: str = Query(default="gold,dxy", description=f"品种列表，逗号分隔，可选: {','.join(QUOTE_SYMBOLS)}")
+):
+    """
+    批量获取多品种实时行情
+
+    同一数据源的品种合并为一次上游请求，各数据源并发请求；
+    后台轮询快照中未过期的品种直接返回，不访问上游。
+    """
+    try:
+        requested = resolve_symbols(symbols.split(","))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not requested:
+        raise HTTPException(status_code=400, detail="请至少指定一个品种")
+
+    quotes = await get_latest_quotes(requested)
+    if not any(quotes.values()):
+        raise HTTPException(status_code=503, detail="无法获取实时行情")
+
+    return {
+        "quotes": quotes,
+        "updated_at": datetime.now().isoformat()
+    }
+
+
 @router.get("/dollar-realtime")
 async def get_dollar_realtime():
-    """获取实时美元指数（直接调用东方财富API）"""
-    def fetch_realtime():
-        with get_db_context() as db:
-            service = GoldService(db)
-            return service.get_realtime_dollar_index()
+    """获取实时美元指数（优先读取后台轮询快照，快照过期时直接调用新浪财经API）"""
+    dollar_data = get_snapshot_dollar()
 
-    dollar_data = await to_thread.run_sync(fetch_realtime)
+    if not dollar_data:
+        def fetch_realtime():
+            return GoldService(None).get_realtime_dollar_index()
+
+        dollar_data = await to_thread.run_sync(fetch_realtime)
 
     if not dollar_data:
         raise HTTPException(status_code=503, detail="无法获取实时美元指数")
@@ -229,3 +253,105 @@ async def get_latest_price():
         "price": latest.close_price,
         "change": latest.change_percent
     }
+
+
+@router.get("/bars", response_model=List[BarResponse])
+async def get_intraday_bars(
+    symbol: str = Query(default="gold", description="品种：gold（黄金）/ dxy（美元指数）"),
+    interval: str = Query(default="1m", description="K线周期：1m / 5m / 1h"),
+    start: Optional[str] = Query(default=None, description="开始时间，如 2026-02-01 或 2026-02-01T09:30:00，默认当日0点"),
+    end: Optional[str] = Query(default=None, description="结束时间，默认当前时间")
+):
+    """
+    获取日内OHLC K线
+
+    - 数据来自后台行情轮询器记录的日内Tick，按周期增量聚合
+    - 查询范围最多31天
+    """
+    if symbol not in TICK_SYMBOLS:
+        raise HTTPException(status_code=400, detail=f"不支持的品种: {symbol}")
+    if interval not in BAR_INTERVALS:
+        raise HTTPException(status_code=400, detail=f"不支持的K线周期: {interval}")
+
+    try:
+        end_dt = datetime.fromisoformat(end) if end else datetime.now()
+        start_dt = datetime.fromisoformat(start) if start else end_dt.replace(hour=0, minute=0, second=0, microsecond=0)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="时间格式错误，请使用ISO格式，如 2026-02-01T09:30:00")
+
+    if start_dt > end_dt:
+        raise HTTPException(status_code=400, detail="开始时间不能晚于结束时间")
+    if end_dt - start_dt > timedelta(days=31):
+        raise HTTPException(status_code=400, detail="查询范围不能超过31天")
+
+    # 历史分段可能需要从磁盘加载，放到线程池执行
+    bars = await to_thread.run_sync(tick_store.get_bars, symbol, interval, start_dt, end_dt)
+    return [BarResponse(**bar) for bar in bars]
+
+
+@router.get("/stream")
+async def stream_quotes(request: Request):
+    """
+    实时行情推送（Server-Sent Events）
+
+    - 由后台行情轮询器统一获取行情，推送给所有连接的客户端
+    - 连接建立后立即推送最新一条行情，之后每次行情刷新推送一次
+    - 每15秒无新行情时发送心跳注释保持连接
+    """
+    queue = quote_broadcaster.subscribe()
+
+    async def event_stream():
+        try:
+            while True:
+                if await request.is_disconnected():
+                    break
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                data = json.dumps(message, ensure_ascii=False)
+                yield f"event: quote\nid: {message['version']}\ndata: {data}\n\n"
+        finally:
+            quote_broadcaster.unsubscribe(queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"  # 禁止nginx缓冲推送内容
+        }
+    )
+
+
+@router.websocket("/stream/ws")
+async def stream_quotes_ws(websocket: WebSocket):
+    """
+    实时行情推送（WebSocket），消息格式与SSE相同
+
+    同时等待客户端消息：无新行情（如休市）时也能及时发现断开并取消订阅。
+    """
+    await websocket.accept()
+    queue = quote_broadcaster.subscribe()
+    receive = asyncio.ensure_future(websocket.receive())
+    get = None
+    try:
+        while True:
+            get = asyncio.ensure_future(queue.get())
+            await asyncio.wait({receive, get}, return_when=asyncio.FIRST_COMPLETED)
+            if receive.done():
+                if receive.result()["type"] == "websocket.disconnect":
+                    break
+                receive = asyncio.ensure_future(websocket.receive())  # 忽略客户端发送的其他消息
+            if get.done():
+                await websocket.send_json(get.result())
+            else:
+                get.cancel()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        for task in (receive, get):
+            if task is not None and not task.done():
+                task.cancel()
+        quote_broadcaster.unsubscribe(queue)
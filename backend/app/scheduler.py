@@ -50,7 +50,7 @@ def init_scheduler():
             update_ai_analysis_job,
             CronTrigger.from_crontab(settings.UPDATE_AI_ANALYSIS_CRON),
             id='update_ai_analysis',
-            name='后台更新AI分析（看涨/看跌/机构/建议）',
+            name='后台更新AI分析（看涨/看跌/机构/建议/总结）',
             replace_existing=True
         )
         logger.info(f"[调度器] 已添加任务: update_ai_analysis ({settings.UPDATE_AI_ANALYSIS_CRON})")
@@ -174,13 +174,13 @@ async def update_prices_job():
     logger.info(f"开始更新黄金价格数据 - 交易日: {today}")
     
     try:
-        from app.services.gold_price_service import get_london_gold_price
+        from app.services.gold_price_service import get_london_gold_price_async
         from app.services.gold_service import GoldService
         from app.database import SessionLocal
         from app.models.gold_price import GoldPrice
         
-        # 2. 获取伦敦金实时价格（包含完整OHLC数据）
-        realtime_data = get_london_gold_price()
+        # 2. 获取伦敦金实时价格（包含完整OHLC数据，多数据源对冲获取）
+        realtime_data = await get_london_gold_price_async()
         
         if not realtime_data:
             logger.warning("未能获取实时金价，尝试使用备用数据源...")
@@ -236,6 +236,10 @@ async def update_prices_job():
             db.commit()
             logger.info(f"✅ 金价数据已成功保存到数据库: OHLC (${open_price:.2f}, ${high_price:.2f}, ${low_price:.2f}, ${price:.2f})")
             
+            # 日线数据已变化，使依赖价格的缓存失效（价格查询、期间统计、AI分析）
+            from app.services.cache_events import PRICES, fire_event
+            fire_event(PRICES)
+            
             # 5. 重新计算期间统计
             logger.info("开始计算期间统计信息...")
             stats = await calculate_period_statistics(db, today)
@@ -248,14 +252,10 @@ async def update_prices_job():
             logger.info(f"  波动区间: {stats['volatility_range']:.2f}%")
             logger.info("=" * 60)
             
-            # 保存统计信息到缓存文件，供前端使用
-            from pathlib import Path
-            import json
-            
-            cache_dir = Path(__file__).parent.parent / "cache"
-            cache_dir.mkdir(exist_ok=True)
-            stats_file = cache_dir / "period_statistics.json"
+            # 保存统计信息到缓存，供前端使用
+            from app.services.cache_manager import CacheManager
             
+            stats_cache = CacheManager("period_statistics")
             stats_data = {
                 'period_high': stats['period_high'],
                 'period_high_date': stats['period_high_date'].isoformat() if stats['period_high_date'] else None,
@@ -265,10 +265,9 @@ async def update_prices_job():
                 'updated_at': datetime.now().isoformat()
             }
             
-            with open(stats_file, 'w', encoding='utf-8') as f:
-                json.dump(stats_data, f, ensure_ascii=False, indent=2)
+            stats_cache.set(stats_data)
             
-            logger.info(f"✅ 期间统计信息已保存到缓存: {stats_file}")
+            logger.info(f"✅ 期间统计信息已保存到缓存: {stats_cache.file_path}")
             
         finally:
             db.close()
@@ -283,6 +282,8 @@ async def update_news_job():
     logger.info("开始更新新闻资讯...")
     try:
         from app.services.news_service import NewsService
+        from app.services.cache_events import NEWS, fire_event
+        from app.models.news import GoldNews
         from app.database import SessionLocal
         
         db = SessionLocal()
@@ -290,10 +291,16 @@ async def update_news_job():
             service = NewsService(db)
             news_list = service.fetch_all_rss_news()
             
+            before_count = db.query(GoldNews).count()
             for news in news_list:
                 service.save_news(news)
+            new_count = db.query(GoldNews).count() - before_count
+            
+            logger.info(f"新闻数据更新完成，共{len(news_list)}条，新增{new_count}条")
             
-            logger.info(f"新闻数据更新完成，共{len(news_list)}条")
+            # 有新增新闻时，使依赖新闻的AI分析缓存失效（下次访问时后台刷新）
+            if new_count > 0:
+                fire_event(NEWS)
         finally:
             db.close()
     except Exception as e:
@@ -301,7 +308,7 @@ async def update_news_job():
 
 
 async def update_ai_analysis_job():
-    """后台更新AI分析（看涨因子、看跌因子、机构预测、投资建议）- 异步执行不阻塞调度器"""
+    """后台更新AI分析（看涨因子、看跌因子、机构预测、投资建议、市场总结）- 异步执行不阻塞调度器"""
     logger.info("开始后台更新AI分析...")
     
     # 使用后台线程执行AI分析，不阻塞主调度器
@@ -316,47 +323,27 @@ async def update_ai_analysis_job():
         logger.error(f"提交AI分析任务失败: {e}")
 
 def _run_ai_analysis_sync():
-    """在线程池中同步执行AI分析（避免阻塞主事件循环）"""
+    """
+    在线程池中同步执行AI分析（避免阻塞主事件循环）
+
+    看涨因子、看跌因子、机构预测并发执行，投资建议和市场总结在三者完成后使用其结果执行，
+    总耗时取决于最长的依赖链而不是各项分析耗时之和。
+    输入（新闻、金价、上游分析）没有实质变化的分析跳过执行，结果记录在 update_logs。
+    """
     import threading
     logger.info(f"[AI分析线程] 启动，线程ID: {threading.current_thread().ident}")
     
     try:
-        from app.database import SessionLocal
-        from app.services.bullish_factor_service import BullishFactorService
-        from app.services.bearish_factor_service import BearishFactorService
-        from app.services.institution_prediction_service import InstitutionPredictionService
-        from app.services.investment_advice_service import InvestmentAdviceService
+        from app.services.analysis_pipeline import run_scheduled_refresh, get_refresh_progress
         
-        db = SessionLocal()
-        try:
-            # 1. 更新看涨因子
-            logger.info("[AI分析线程] 更新看涨因子...")
-            bullish_service = BullishFactorService(db)
-            bullish_service.refresh_analysis_sync()
-            logger.info("[AI分析线程] 看涨因子更新完成")
-            
-            # 2. 更新看跌因子
-            logger.info("[AI分析线程] 更新看跌因子...")
-            bearish_service = BearishFactorService(db)
-            bearish_service.refresh_analysis_sync()
-            logger.info("[AI分析线程] 看跌因子更新完成")
-            
-            # 3. 更新机构预测
-            logger.info("[AI分析线程] 更新机构预测...")
-            institution_service = InstitutionPredictionService(db)
-            institution_service.refresh_analysis_sync()
-            logger.info("[AI分析线程] 机构预测更新完成")
-            
-            # 4. 更新投资建议
-            logger.info("[AI分析线程] 更新投资建议...")
-            advice_service = InvestmentAdviceService(db)
-            advice_service.refresh_analysis_sync()
-            logger.info("[AI分析线程] 投资建议更新完成")
-            
-            logger.info("[AI分析线程] 全部AI分析更新完成")
-            
-        finally:
-            db.close()
+        run_scheduled_refresh()
+        progress = get_refresh_progress()
+        for key, task in progress["tasks"].items():
+            detail = task.get("error") or task.get("reason") or task.get("trigger") or ""
+            logger.info(f"[AI分析线程] {key}: {task['status']} "
+                        f"({task.get('duration_seconds', 0)}s) {detail}".rstrip())
+        logger.info(f"[AI分析线程] 全部AI分析更新完成: {progress['completed']}/{progress['total']}, "
+                    f"耗时 {progress['elapsed_seconds']}s（串行需 {progress['serial_seconds']}s）")
     except Exception as e:
         logger.error(f"[AI分析线程] 执行失败: {e}")
         import traceback
@@ -435,6 +422,10 @@ async def update_dollar_index_job():
             db.commit()
             logger.info(f"✅ 美元指数数据已成功保存到数据库: {price:.2f}")
             
+            # 美元指数已变化，使依赖美元指数的缓存失效（相关性查询）
+            from app.services.cache_events import DOLLAR, fire_event
+            fire_event(DOLLAR)
+            
         finally:
             db.close()
                 
@@ -44,3 +44,13 @@ class RealtimePriceResponse(BaseModel):
     previous_close: float
     change_percent: float
     updated_at: str
+
+
+class BarResponse(BaseModel):
+    time: str
+    timestamp: float
+    open: float
+    high: float
+    low: float
+    close: float
+    ticks: int
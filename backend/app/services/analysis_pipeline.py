@@ -0,0 +1,341 @@
+"""AI分析流水线 - 按依赖关系调度各项AI分析
+
+看涨因子、看跌因子、机构预测相互独立，可以并发执行；
+投资建议和市场总结依赖前三者的结果，在依赖完成后执行并直接使用其结果。
+依赖不在本次计划内时读取其缓存（允许软过期数据），依赖既无结果也无缓存时跳过下游任务，
+避免基于空数据调用LLM。
+
+每个任务使用独立的数据库会话，并通过 CacheManager.single_flight 与请求触发的后台刷新互斥。
+"""
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from app.config import settings
+from app.services.cache_manager import CacheManager, FALLBACK_FLAG
+
+
+@dataclass
+class AnalysisNode:
+    """流水线任务"""
+    key: str                      # 缓存键
+    name: str                     # 展示名称
+    run: Callable[..., Dict]      # (db, 依赖结果) -> 分析结果（负责写入缓存）
+    deps: tuple = ()              # 依赖的任务（缓存键）
+
+
+def _market_status(db) -> str:
+    """构建投资建议/市场总结使用的市场状态描述"""
+    from app.services.gold_service import GoldService
+    stats = GoldService(db).get_statistics() or {}
+    return f"当前金价: ${stats.get('current_price', 0):.2f}, " \
+           f"2025年至今涨幅: {stats.get('ytd_change', 0):+.2f}%, " \
+           f"波动区间: {stats.get('volatility_range', 0):.2f}%"
+
+
+def _run_bullish(db, inputs: Dict[str, Dict]) -> Dict:
+    from app.services.bullish_factor_service import BullishFactorService
+    return BullishFactorService(db).refresh_analysis_sync()
+
+
+def _run_bearish(db, inputs: Dict[str, Dict]) -> Dict:
+    from app.services.bearish_factor_service import BearishFactorService
+    return BearishFactorService(db).refresh_analysis_sync()
+
+
+def _run_institution(db, inputs: Dict[str, Dict]) -> Dict:
+    from app.services.institution_prediction_service import InstitutionPredictionService
+    return InstitutionPredictionService(db).refresh_analysis_sync()
+
+
+def _run_advice(db, inputs: Dict[str, Dict]) -> Dict:
+    from app.services.investment_advice_service import InvestmentAdviceService
+    return InvestmentAdviceService(db).refresh_analysis_sync(
+        _market_status(db),
+        inputs["bullish_factors"].get("bullish_factors", []),
+        inputs["bearish_factors"].get("bearish_factors", []),
+        inputs["institution_predictions"].get("institutions", [])
+    )
+
+
+def _run_summary(db, inputs: Dict[str, Dict]) -> Dict:
+    from app.services.market_summary_service import MarketSummaryService
+    return MarketSummaryService(db).refresh_analysis_sync(
+        _market_status(db),
+        inputs["bullish_factors"].get("bullish_factors", []),
+        inputs["bearish_factors"].get("bearish_factors", []),
+        inputs["institution_predictions"].get("institutions", [])
+    )
+
+
+# 变更检测判定输入无实质变化、跳过执行的任务状态（与 UpdateStatus.SKIPPED_UNCHANGED 一致）
+SKIPPED_UNCHANGED = "skipped_unchanged"
+
+FACTOR_KEYS = ("bullish_factors", "bearish_factors", "institution_predictions")
+
+# 任务定义（按依赖顺序排列）
+ANALYSIS_NODES: Dict[str, AnalysisNode] = {
+    node.key: node for node in [
+        AnalysisNode("bullish_factors", "看涨因子", _run_bullish),
+        AnalysisNode("bearish_factors", "看跌因子", _run_bearish),
+        AnalysisNode("institution_predictions", "机构预测", _run_institution),
+        AnalysisNode("investment_advice", "投资建议", _run_advice, deps=FACTOR_KEYS),
+        AnalysisNode("market_summary", "市场总结", _run_summary, deps=FACTOR_KEYS),
+    ]
+}
+
+
+def with_dependents(keys: Iterable[str]) -> List[str]:
+    """补充依赖这些任务的下游任务（上游重新计算后下游也需要更新），按依赖顺序返回"""
+    selected: Set[str] = set(keys)
+    changed = True
+    while changed:
+        changed = False
+        for node in ANALYSIS_NODES.values():
+            if node.key not in selected and selected.intersection(node.deps):
+                selected.add(node.key)
+                changed = True
+    return [key for key in ANALYSIS_NODES if key in selected]
+
+
+def plan_warmup() -> List[str]:
+    """预热计划：缓存缺失或已过期的任务及其下游任务，跳过处于失败退避期的任务"""
+    missing = []
+    for key in ANALYSIS_NODES:
+        cache = CacheManager(key)
+        if not cache.exists() and cache.backoff_remaining() <= 0:
+            missing.append(key)
+    return with_dependents(missing)
+
+
+class PipelineProgress:
+    """流水线执行进度（线程安全）"""
+
+    def __init__(self, name: str, keys: List[str]):
+        self.name = name
+        self.keys = keys
+        self.started_at = time.time()
+        self.finished_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._tasks: Dict[str, Dict[str, Any]] = {key: {"status": "pending"} for key in keys}
+
+    def update(self, key: str, status: str, **extra) -> None:
+        with self._lock:
+            task = self._tasks[key]
+            task["status"] = status
+            if status == "running":
+                task["started_at"] = time.time()
+            elif "started_at" in task:
+                task["duration_seconds"] = round(time.time() - task["started_at"], 1)
+            task.update(extra)
+            done = sum(1 for t in self._tasks.values() if t["status"] not in ("pending", "running"))
+        if status != "running":
+            print(f"[AnalysisPipeline] {self.name} ({done}/{len(self.keys)}) "
+                  f"{ANALYSIS_NODES[key].name}: {status}")
+
+    def finish(self) -> None:
+        self.finished_at = time.time()
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            tasks = {key: dict(task) for key, task in self._tasks.items()}
+        finished = sum(1 for t in tasks.values() if t["status"] not in ("pending", "running"))
+        return {
+            "name": self.name,
+            "state": "finished" if self.finished_at else "running",
+            "completed": finished,
+            "total": len(self.keys),
+            "elapsed_seconds": round((self.finished_at or time.time()) - self.started_at, 1),
+            # 各任务耗时之和，即串行执行所需时间
+            "serial_seconds": round(sum(t.get("duration_seconds", 0) for t in tasks.values()), 1),
+            "tasks": tasks,
+        }
+
+
+def _dependency_input(key: str, results: Dict[str, Optional[Dict]]) -> Optional[Dict]:
+    """依赖的输入：本次计算的有效结果，否则为缓存数据（允许软过期），都没有时返回None"""
+    result = results.get(key)
+    if result and not result.get(FALLBACK_FLAG):
+        return result
+    entry = CacheManager(key).get_entry()
+    return entry.data if entry else None
+
+
+def _execute_node(node: AnalysisNode, inputs: Dict[str, Dict]) -> Optional[Dict]:
+    """在独立的数据库会话中执行任务（单飞：已有同一缓存键的刷新进行中时等待其结果）"""
+    from app.database import SessionLocal
+    cache = CacheManager(node.key)
+    db = SessionLocal()
+    try:
+        result = cache.single_flight(lambda: node.run(db, inputs)).result()
+    finally:
+        db.close()
+    if result is None:
+        # 等待的是请求触发的后台刷新（无返回值），读取其写入的缓存
+        entry = cache.get_entry()
+        result = entry.data if entry else None
+    return result
+
+
+def run_pipeline(
+    keys: Iterable[str],
+    max_workers: Optional[int] = None,
+    progress: Optional[PipelineProgress] = None,
+    gate: Optional[Callable[[str, List[str]], Tuple[bool, str]]] = None
+) -> Dict[str, Optional[Dict]]:
+    """
+    按依赖关系执行任务，无依赖关系的任务并发执行（阻塞直到全部完成）
+
+    Args:
+        keys: 要执行的任务（缓存键）
+        max_workers: 最大并发数，默认 settings.AI_PIPELINE_CONCURRENCY
+        progress: 进度记录
+        gate: 变更检测 (缓存键, 本次已重新计算的依赖) -> (是否执行, 原因)，
+              不执行的任务标记为 skipped_unchanged，下游使用其缓存
+
+    Returns:
+        缓存键 -> 分析结果（失败或跳过时为None）
+    """
+    planned = [key for key in ANALYSIS_NODES if key in set(keys)]
+    progress = progress or PipelineProgress("AI分析", planned)
+    results: Dict[str, Optional[Dict]] = {}
+    refreshed: Set[str] = set()
+    pending = list(planned)
+    running: Dict[Future, str] = {}
+
+    with ThreadPoolExecutor(
+        max_workers=max_workers or settings.AI_PIPELINE_CONCURRENCY,
+        thread_name_prefix="analysis_pipeline"
+    ) as executor:
+        while pending or running:
+            # 提交依赖已全部完成的任务（依赖不在本次计划内的视为已完成）
+            for key in list(pending):
+                node = ANALYSIS_NODES[key]
+                if any(dep in pending or dep in running.values() for dep in node.deps):
+                    continue
+                pending.remove(key)
+                extra = {}
+                if gate:
+                    should_run, reason = gate(key, [dep for dep in node.deps if dep in refreshed])
+                    if not should_run:
+                        results[key] = None
+                        progress.update(key, SKIPPED_UNCHANGED, reason=reason)
+                        continue
+                    extra["trigger"] = reason
+                inputs = {dep: _dependency_input(dep, results) for dep in node.deps}
+                missing = [dep for dep, data in inputs.items() if data is None]
+                if missing:
+                    results[key] = None
+                    progress.update(key, "skipped", reason=f"缺少依赖数据: {', '.join(missing)}")
+                    continue
+                progress.update(key, "running", **extra)
+                running[executor.submit(_execute_node, node, inputs)] = key
+
+            if not running:
+                continue
+            done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for future in done:
+                key = running.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    results[key] = None
+                    progress.update(key, "failed", error=f"{type(e).__name__}: {e}")
+                    continue
+                results[key] = result
+                if result is None or result.get(FALLBACK_FLAG):
+                    progress.update(key, "failed", error=(result or {}).get("error", "无分析结果"))
+                else:
+                    refreshed.add(key)
+                    progress.update(key, "done")
+
+    progress.finish()
+    return results
+
+
+# 最近一次预热的进度（/health 展示）
+_warmup_progress: Optional[PipelineProgress] = None
+
+
+def run_warmup(keys: Optional[List[str]] = None) -> Dict[str, Optional[Dict]]:
+    """执行缓存预热（阻塞，由启动流程放入线程池执行）"""
+    global _warmup_progress
+    keys = plan_warmup() if keys is None else keys
+    _warmup_progress = PipelineProgress("缓存预热", keys)
+    return run_pipeline(keys, progress=_warmup_progress)
+
+
+def get_warmup_progress() -> Optional[Dict[str, Any]]:
+    """最近一次预热的进度，未执行过预热时返回None"""
+    return _warmup_progress.to_dict() if _warmup_progress else None
+
+
+# 最近一次定时更新的进度（/health 展示）
+_refresh_progress: Optional[PipelineProgress] = None
+
+
+def run_scheduled_refresh() -> Dict[str, Optional[Dict]]:
+    """
+    定时更新（阻塞，由调度器放入线程池执行）
+
+    运行前采集输入快照，输入没有实质变化的分析跳过执行（见 change_detection），
+    成功执行的分析记录本次快照，每项分析的结果写入更新日志。
+    """
+    global _refresh_progress
+    from app.database import SessionLocal
+    from app.services.change_detection import check_inputs, record_inputs, take_snapshot
+
+    db = SessionLocal()
+    try:
+        snapshot = take_snapshot(db)
+    finally:
+        db.close()
+
+    keys = list(ANALYSIS_NODES)
+    _refresh_progress = PipelineProgress("定时AI分析", keys)
+    results = run_pipeline(
+        keys,
+        progress=_refresh_progress,
+        gate=lambda key, refreshed_deps: check_inputs(key, snapshot, refreshed_deps)
+    )
+
+    tasks = _refresh_progress.to_dict()["tasks"]
+    for key, task in tasks.items():
+        if task["status"] == "done":
+            record_inputs(key, snapshot)
+    _write_update_logs(tasks)
+    return results
+
+
+def _write_update_logs(tasks: Dict[str, Dict[str, Any]]) -> None:
+    """将定时更新各项分析的结果写入 update_logs"""
+    from app.database import SessionLocal
+    from app.models.update_log import UpdateLog, UpdateStatus
+
+    statuses = {
+        "done": UpdateStatus.SUCCESS,
+        SKIPPED_UNCHANGED: UpdateStatus.SKIPPED_UNCHANGED,
+    }
+    db = SessionLocal()
+    try:
+        for key, task in tasks.items():
+            db.add(UpdateLog(
+                data_type=key,
+                status=statuses.get(task["status"], UpdateStatus.FAILED),
+                records_affected=1 if task["status"] == "done" else 0,
+                error_message=task.get("error") or task.get("reason"),
+                duration_seconds=task.get("duration_seconds", 0)
+            ))
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        print(f"[AnalysisPipeline] 写入更新日志失败: {e}")
+    finally:
+        db.close()
+
+
+def get_refresh_progress() -> Optional[Dict[str, Any]]:
+    """最近一次定时更新的进度，未执行过时返回None"""
+    return _refresh_progress.to_dict() if _refresh_progress else None
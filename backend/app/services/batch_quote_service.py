@@ -0,0 +1,160 @@
+"""多品种批量行情服务
+
+新浪（list=）和腾讯（q=）都支持逗号分隔的多代码查询。品种注册表记录每个品种所属的
+数据源和代码，查询N个品种时按数据源分组，每个数据源只发一次请求，各数据源并发请求，
+跨品种视图（金价+美元指数+白银）只需一次往返。
+"""
+import asyncio
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from app.services.circuit_breaker import get_breaker
+from app.services.http_pool import get_async_client, provider_get_async
+from app.services.quote_parser import parse_quotes
+
+# 各数据源的批量行情接口（代码以逗号分隔拼接在末尾）
+PROVIDER_BATCH_URLS = {
+    "tencent": "https://qt.gtimg.cn/q=",
+    "sina": "https://hq.sinajs.cn/list=",
+}
+
+# 品种注册表：品种 -> 数据源、代码、展示信息
+QUOTE_SYMBOLS: Dict[str, Dict] = {
+    "gold": {
+        "provider": "tencent",
+        "code": "hf_GC",
+        "name": "纽约黄金",
+        "unit": "美元/盎司",
+        "source": "腾讯财经-纽约黄金",
+        "decimals": 2,
+    },
+    "silver": {
+        "provider": "tencent",
+        "code": "hf_SI",
+        "name": "纽约白银",
+        "unit": "美元/盎司",
+        "source": "腾讯财经-纽约白银",
+        "decimals": 3,
+    },
+    "dxy": {
+        "provider": "sina",
+        "code": "DINIW",
+        "name": "ICE美元指数",
+        "unit": "点",
+        "source": "新浪财经-ICE美元指数(DXY)",
+        "decimals": 2,
+    },
+}
+
+
+def resolve_symbols(symbols: Iterable[str]) -> List[str]:
+    """规范化品种列表（去重、小写），包含未注册品种时抛出 ValueError"""
+    resolved: List[str] = []
+    for symbol in symbols:
+        symbol = symbol.strip().lower()
+        if not symbol or symbol in resolved:
+            continue
+        if symbol not in QUOTE_SYMBOLS:
+            raise ValueError(f"不支持的品种: {symbol}，可选: {', '.join(QUOTE_SYMBOLS)}")
+        resolved.append(symbol)
+    return resolved
+
+
+def _build_quote(symbol: str, record: Dict) -> Optional[Dict]:
+    """将解析后的原始记录转换为统一的行情格式"""
+    meta = QUOTE_SYMBOLS[symbol]
+    latest = record.get("price")
+    if not latest:
+        return None
+
+    digits = meta["decimals"]
+    quote = {
+        "symbol": symbol,
+        "code": meta["code"],
+        "name": meta["name"],
+        "price": round(latest, digits),
+        "unit": meta["unit"],
+        "updated_at": datetime.now().isoformat(),
+        "source": meta["source"],
+    }
+
+    prev_close = record.get("prev_close")
+    if prev_close:
+        quote["previous_close"] = round(prev_close, digits)
+        quote["change"] = round(latest - prev_close, digits)
+        quote["change_percent"] = round((latest - prev_close) / prev_close * 100, 2)
+    for field in ("open", "high", "low"):
+        if record.get(field):
+            quote[field] = round(record[field], digits)
+    if record.get("date"):
+        quote["date"] = record["date"]
+    return quote
+
+
+class BatchQuoteService:
+    """批量行情服务"""
+
+    def __init__(self):
+        self.upstream_requests = 0
+
+    async def _fetch_provider(self, provider: str, codes: List[str]) -> Dict[str, Dict]:
+        """向单个数据源发起一次批量请求，返回 代码 -> 原始记录（经过熔断器）"""
+        breaker = get_breaker(provider)
+        if not breaker.allow_request():
+            return {}
+
+        self.upstream_requests += 1
+        start = time.perf_counter()
+        try:
+            response = await provider_get_async(
+                get_async_client(),
+                provider,
+                PROVIDER_BATCH_URLS[provider] + ",".join(codes)
+            )
+            records = parse_quotes(response.content, provider) if response.status_code == 200 else {}
+        except asyncio.CancelledError:
+            breaker.release()
+            raise
+        except Exception as e:
+            print(f"[BatchQuoteService] {provider} 批量行情请求失败: {type(e).__name__}: {e}")
+            records = {}
+
+        elapsed = time.perf_counter() - start
+        if records:
+            breaker.record_success(elapsed)
+        else:
+            breaker.record_failure(elapsed)
+        return records
+
+    async def get_quotes(self, symbols: Iterable[str]) -> Dict[str, Optional[Dict]]:
+        """
+        批量获取行情（每个数据源一次请求，各数据源并发）
+
+        Args:
+            symbols: 品种列表（见 QUOTE_SYMBOLS）
+
+        Returns:
+            品种 -> 行情字典，获取失败的品种为None
+        """
+        resolved = resolve_symbols(symbols)
+        by_provider: Dict[str, List[str]] = {}
+        for symbol in resolved:
+            by_provider.setdefault(QUOTE_SYMBOLS[symbol]["provider"], []).append(symbol)
+
+        providers = list(by_provider)
+        results = await asyncio.gather(*[
+            self._fetch_provider(provider, [QUOTE_SYMBOLS[s]["code"] for s in by_provider[provider]])
+            for provider in providers
+        ])
+
+        quotes: Dict[str, Optional[Dict]] = {}
+        for provider, records in zip(providers, results):
+            for symbol in by_provider[provider]:
+                record = records.get(QUOTE_SYMBOLS[symbol]["code"])
+                quotes[symbol] = _build_quote(symbol, record) if record else None
+        return {symbol: quotes[symbol] for symbol in resolved}
+
+
+# 全局实例
+batch_quote_service = BatchQuoteService()
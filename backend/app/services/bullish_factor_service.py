@@ -5,13 +5,13 @@ from sqlalchemy.orm import Session
 from sqlalchemy import and_
 from concurrent.futures import ThreadPoolExecutor
 import asyncio
-from functools import partial
 
 from app.models.news import GoldNews
 from app.models.analysis import MarketFactor, FactorType, ImpactLevel
 from app.config import settings
-from app.services.cache_manager import CacheManager
+from app.services.cache_manager import CacheManager, FALLBACK_FLAG
 from app.services.zhipu_service import get_zhipu_service
+from app.services.llm_cache import llm_cache
 import json
 
 # 全局线程池（所有服务共享）
@@ -31,10 +31,54 @@ def _get_chat_openai():
 
 class BullishFactorAnalyzer:
     """使用智谱AI实时搜索分析黄金市场看涨因子"""
+
+    # 提示词模板版本（修改提示词后递增，使LLM缓存中的旧结果失效）
+    SEARCH_PROMPT_VERSION = "1"
+    PROMPT_VERSION = "1"
     
     def __init__(self):
         self._llm = None
         self.zhipu_service = get_zhipu_service()
+        # 智谱AI联网搜索提示词（流式刷新共用）
+        self.search_prompt = """请搜索并分析当前黄金市场的看涨因素。
+
+请搜索最新的黄金市场新闻和分析报告，识别出5个最重要的看涨因子：
+
+1. 美联储政策相关（降息预期、货币政策等）
+2. 全球央行购金动态（各国央行增持黄金情况）
+3. 美元信用/美债问题（美元走势、债务规模等）
+4. 地缘政治风险（地区冲突、贸易摩擦等）
+5. 供需基本面（矿产供应、投资需求等）
+
+请严格按照以下JSON格式返回：
+
+{
+    "bullish_factors": [
+        {
+            "id": "fed-policy",
+            "title": "美联储降息周期预期强化",
+            "subtitle": "市场押注宽松周期开启，实际利率下行",
+            "description": "详细描述该因素如何支撑金价上涨，基于最新新闻...",
+            "details": [
+                "具体要点1：基于最新数据",
+                "具体要点2：基于最新数据", 
+                "具体要点3：基于最新数据",
+                "具体要点4：基于最新数据"
+            ],
+            "impact": "high"
+        }
+    ],
+    "analysis_summary": "基于实时搜索的综合分析总结...",
+    "search_time": "2026-02-01"
+}
+
+注意事项：
+1. 必须返回有效的JSON格式
+2. 每个因子的id必须是：fed-policy, central-bank, dollar-credit, geopolitical, supply-demand
+3. impact只能是：high, medium, low
+4. description和details必须基于搜索到的最新新闻内容
+5. 确保5个因子都有数据
+"""
         self.prompt_template = """你是一位专业的黄金市场分析师，专注于分析影响黄金价格上涨的因素。
 
 当前金价数据：
@@ -205,12 +249,26 @@ class BullishFactorAnalyzer:
             "ytd_change": 15.0
         }
     
-    def analyze(self, db: Session) -> Dict[str, Any]:
-        """执行分析 - 使用智谱AI实时搜索"""
+    def analyze(self, db: Session, use_llm_cache: bool = True) -> Dict[str, Any]:
+        """
+        执行分析 - 使用智谱AI实时搜索
+
+        Args:
+            use_llm_cache: 输入未变化时是否复用上次的LLM结果（用户强制刷新时为False）
+        """
         # 使用智谱AI实时搜索获取最新看涨因素
         try:
             print("[BullishFactor] 使用智谱AI实时搜索看涨因素...")
-            search_result = self._search_bullish_factors()
+            search_result = llm_cache.get_or_call(
+                "bullish_factors.search",
+                model=settings.ZHIPU_MODEL,
+                temperature=0.3,
+                prompt_version=self.SEARCH_PROMPT_VERSION,
+                inputs=self._search_inputs(db),
+                call=self._search_bullish_factors,
+                is_valid=lambda result: bool(result.get("bullish_factors")),
+                reuse=use_llm_cache
+            )
             
             # 检查搜索结果是否有效
             if search_result.get("bullish_factors") and len(search_result["bullish_factors"]) > 0:
@@ -225,49 +283,17 @@ class BullishFactorAnalyzer:
             print(f"[BullishFactor] 智谱AI搜索失败: {e}")
         
         # 备用方案：使用传统方式分析
-        return self._analyze_with_traditional_llm(db)
+        return self._analyze_with_traditional_llm(db, use_llm_cache)
+    
+    def _search_inputs(self, db: Session) -> Dict[str, Any]:
+        """联网搜索的缓存输入：提示词固定，以本地24小时新闻和金价作为市场是否变化的依据"""
+        return {
+            "news": [news.id for news in self.fetch_recent_news(db, hours=24)],
+            "gold": self.get_current_gold_data(db)
+        }
     
     def _search_bullish_factors(self) -> Dict[str, Any]:
         """使用智谱AI搜索看涨因素"""
-        prompt = """请搜索并分析当前黄金市场的看涨因素。
-
-请搜索最新的黄金市场新闻和分析报告，识别出5个最重要的看涨因子：
-
-1. 美联储政策相关（降息预期、货币政策等）
-2. 全球央行购金动态（各国央行增持黄金情况）
-3. 美元信用/美债问题（美元走势、债务规模等）
-4. 地缘政治风险（地区冲突、贸易摩擦等）
-5. 供需基本面（矿产供应、投资需求等）
-
-请严格按照以下JSON格式返回：
-
-{
-    "bullish_factors": [
-        {
-            "id": "fed-policy",
-            "title": "美联储降息周期预期强化",
-            "subtitle": "市场押注宽松周期开启，实际利率下行",
-            "description": "详细描述该因素如何支撑金价上涨，基于最新新闻...",
-            "details": [
-                "具体要点1：基于最新数据",
-                "具体要点2：基于最新数据", 
-                "具体要点3：基于最新数据",
-                "具体要点4：基于最新数据"
-            ],
-            "impact": "high"
-        }
-    ],
-    "analysis_summary": "基于实时搜索的综合分析总结...",
-    "search_time": "2026-02-01"
-}
-
-注意事项：
-1. 必须返回有效的JSON格式
-2. 每个因子的id必须是：fed-policy, central-bank, dollar-credit, geopolitical, supply-demand
-3. impact只能是：high, medium, low
-4. description和details必须基于搜索到的最新新闻内容
-5. 确保5个因子都有数据
-"""
         
         try:
             from openai import OpenAI
@@ -281,7 +307,7 @@ class BullishFactorAnalyzer:
                 model=settings.ZHIPU_MODEL,
                 messages=[{
                     "role": "user",
-                    "content": prompt
+                    "content": self.search_prompt
                 }],
                 tools=[{
                     "type": "web_search",
@@ -330,7 +356,7 @@ class BullishFactorAnalyzer:
                 "analysis_summary": f"搜索失败: {str(e)}"
             }
     
-    def _analyze_with_traditional_llm(self, db: Session) -> Dict[str, Any]:
+    def _analyze_with_traditional_llm(self, db: Session, use_llm_cache: bool = True) -> Dict[str, Any]:
         """使用传统LLM分析（备用方案）"""
         # 1. 获取24小时内新闻
         news = self.fetch_recent_news(db, hours=24)
@@ -364,32 +390,43 @@ class BullishFactorAnalyzer:
             current_time=current_time
         )
         
-        # 4. 调用LLM
-        try:
-            response = self.llm.invoke(prompt)
-            
-            # 5. 解析JSON响应
+        # 4. 调用LLM（输入未变化时复用上次的结果）
+        def call_llm() -> Dict[str, Any]:
             try:
-                result = json.loads(response.content)
-            except json.JSONDecodeError:
-                # 尝试从文本中提取JSON
-                content = response.content
-                start = content.find('{')
-                end = content.rfind('}') + 1
-                if start != -1 and end > start:
-                    try:
-                        result = json.loads(content[start:end])
-                    except:
-                        result = self._get_default_factors()
-                else:
-                    result = self._get_default_factors()
+                response = self.llm.invoke(prompt)
             
-            return result
-        except Exception as e:
-            print(f"LLM调用失败: {e}")
-            return self._get_default_factors()
+                # 5. 解析JSON响应
+                try:
+                    result = json.loads(response.content)
+                except json.JSONDecodeError:
+                    # 尝试从文本中提取JSON
+                    content = response.content
+                    start = content.find('{')
+                    end = content.rfind('}') + 1
+                    if start != -1 and end > start:
+                        try:
+                            result = json.loads(content[start:end])
+                        except:
+                            result = self._get_default_factors("AI返回结果解析失败")
+                    else:
+                        result = self._get_default_factors("AI返回结果解析失败")
+            
+                return result
+            except Exception as e:
+                print(f"LLM调用失败: {e}")
+                return self._get_default_factors(f"{type(e).__name__}: {e}")
+        
+        return llm_cache.get_or_call(
+            "bullish_factors.llm",
+            model=settings.MODEL_NAME,
+            temperature=0.7,
+            prompt_version=self.PROMPT_VERSION,
+            inputs={"news": news_content, "gold": gold_data},
+            call=call_llm,
+            reuse=use_llm_cache
+        )
     
-    def _get_default_factors(self) -> Dict[str, Any]:
+    def _get_default_factors(self, error: Optional[str] = None) -> Dict[str, Any]:
         """获取默认看涨因子（当LLM调用失败时使用）"""
         return {
             "bullish_factors": [
@@ -460,7 +497,9 @@ class BullishFactorAnalyzer:
                 }
             ],
             "analysis_summary": "基于当前市场状况的综合分析",
-            "last_updated": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            "last_updated": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "fallback": True,
+            "error": error or "AI分析失败，返回默认数据"
         }
     
     def save_to_database(self, db: Session, analysis_result: Dict[str, Any]) -> None:
@@ -504,14 +543,14 @@ class BullishFactorService:
     def __init__(self, db: Session):
         self.db = db
         self.analyzer = BullishFactorAnalyzer()
-        self.cache = CacheManager("bullish_factors", ttl=7200)  # 2小时缓存
+        self.cache = CacheManager("bullish_factors")  # 过期策略见 CACHE_POLICIES
     
     def get_bullish_factors(self, use_cache: bool = True) -> Dict[str, Any]:
         """
         获取看涨因子 - 快速响应版本（<50ms）
         
         优化策略：
-        1. 优先从缓存读取（<10ms）
+        1. 优先从缓存读取（<10ms），超过软过期时返回旧数据并后台刷新
         2. 无缓存时直接返回默认数据（<10ms）
         3. 后台触发AI分析
         4. use_cache=False时直接执行实时搜索
@@ -526,9 +565,7 @@ class BullishFactorService:
         if not use_cache:
             print("[BullishFactor] 强制刷新，执行实时搜索...")
             try:
-                result = self.analyzer.analyze(self.db)
-                self.analyzer.save_to_database(self.db, result)
-                self.cache.set(result)
+                result = self._analyze_and_save(self.db, use_llm_cache=False)
                 result["metadata"] = {
                     "cached": False,
                     "cache_source": "realtime_search",
@@ -541,14 +578,20 @@ class BullishFactorService:
                 # 如果实时搜索失败，返回缓存数据
                 pass
         
-        # 1. 首先尝试缓存（支持多进程共享）
-        cached_data = self.cache.get()
-        if cached_data:
+        # 1. 首先尝试缓存（支持多进程共享；超过软过期时返回旧数据并后台刷新）
+        entry = self.cache.get_entry()
+        if entry:
+            if entry.stale:
+                self._trigger_background_analysis()
+            cached_data = entry.data
             cached_data["metadata"] = {
                 "cached": True,
                 "cache_source": "file",
-                "generated_at": datetime.now().isoformat()
+                "generated_at": datetime.now().isoformat(),
+                "stale": entry.stale,
+                "cache_age_seconds": int(entry.age)
             }
+            self.cache.apply_failure_metadata(cached_data["metadata"])
             return cached_data
         
         # 2. 无缓存时，直接返回默认数据并触发后台更新
@@ -557,6 +600,8 @@ class BullishFactorService:
         # 触发后台分析
         self._trigger_background_analysis()
         
+        self.cache.apply_failure_metadata(default_data["metadata"])
+        
         return default_data
     
     def _get_default_response(self) -> Dict[str, Any]:
@@ -575,8 +620,8 @@ class BullishFactorService:
     def _trigger_background_analysis(self) -> None:
         """触发后台分析（不阻塞）"""
         try:
-            # 提交到线程池执行
-            _executor.submit(self._background_analysis_task)
+            # 单飞提交到线程池：已有刷新进行中或处于失败退避期时不重复提交
+            self.cache.refresh_in_background(self._background_analysis_task, _executor)
         except Exception as e:
             print(f"[BullishFactor] 触发后台分析失败: {e}")
 
@@ -587,10 +632,8 @@ class BullishFactorService:
             from app.database import SessionLocal
             db = SessionLocal()
             try:
-                result = self.analyzer.analyze(db)
-                self.analyzer.save_to_database(db, result)
-                # 更新缓存
-                self.cache.set(result)
+                # 分析并更新缓存
+                self._analyze_and_save(db)
                 print(f"[BullishFactor] 后台分析完成，时间: {datetime.now()}")
             finally:
                 db.close()
@@ -603,32 +646,39 @@ class BullishFactorService:
 
         使用线程池执行AI分析，不阻塞主线程
         """
-        loop = asyncio.get_event_loop()
-
-        # 在线程池中执行分析
-        result = await loop.run_in_executor(
-            _executor,
-            partial(self._analyze_with_new_db)
-        )
-
-        return result
+        # 单飞执行：并发的刷新请求共享同一次分析结果
+        future = self.cache.single_flight(self._analyze_with_new_db, _executor)
+        return await asyncio.wrap_future(future)
 
     def _analyze_with_new_db(self) -> Dict[str, Any]:
         """使用新数据库会话执行分析"""
         from app.database import SessionLocal
         db = SessionLocal()
         try:
-            result = self.analyzer.analyze(db)
-            self.analyzer.save_to_database(db, result)
-            self.cache.set(result)
-            return result
+            return self._analyze_and_save(db, use_llm_cache=False)
         finally:
             db.close()
 
     def refresh_analysis_sync(self) -> Dict[str, Any]:
         """同步刷新分析（阻塞，仅用于定时任务）"""
-        result = self.analyzer.analyze(self.db)
-        self.analyzer.save_to_database(self.db, result)
+        return self._analyze_and_save(self.db)
+
+    def _analyze_and_save(self, db: Session, use_llm_cache: bool = True) -> Dict[str, Any]:
+        """
+        执行分析、保存因子并写入缓存
+
+        启用 AI_COMBINED_FACTORS 时改为多空合并分析（一次搜索同时更新看涨和看跌因子）。
+        用户强制刷新（use_llm_cache=False）时总是重新搜索，不复用LLM缓存。
+        """
+        if settings.AI_COMBINED_FACTORS:
+            from app.services.combined_factor_service import refresh_combined_factors
+            result = refresh_combined_factors(use_llm_cache).get("bullish")
+            if result is not None:
+                return result
+            return self.cache.get() or self.analyzer._get_default_factors("多空合并分析无结果")
+        result = self.analyzer.analyze(db, use_llm_cache)
+        if not result.get(FALLBACK_FLAG):  # 默认数据不写入因子表
+            self.analyzer.save_to_database(db, result)
         self.cache.set(result)
         return result
     
@@ -0,0 +1,460 @@
+"""缓存后端 - CacheManager 的一级缓存存储
+
+- memory：进程内有界 LRU（默认，按条目数和近似字节数淘汰），通过共享的代数表实现跨进程失效：
+  任一进程写入后，其他进程的内存副本立即失效（读取时只访问 mmap，不访问磁盘）
+- shm：基于 mmap 的共享内存段，同一主机的所有worker共享一份数据，
+  写入立即对其他进程可见；每个进程只在数据版本变化时重新解码
+- redis：Redis协议服务（可本地运行），需要安装 redis 包
+
+文件缓存（CACHE_DIR）始终作为持久化的二级缓存，由 CacheManager 负责。
+共享内存与Redis中的数据使用与文件缓存相同的二进制格式（见 cache_serializers）。
+"""
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.services.cache_serializers import get_serializer
+from app.services.lru_cache import BoundedLRU
+
+try:
+    import fcntl
+except ImportError:  # Windows 不支持 fcntl，共享内存后端退化为进程内互斥
+    fcntl = None
+
+# 跨进程代数表文件
+GENERATION_FILE = Path(__file__).parent.parent.parent / "cache" / ".generations"
+
+
+class CacheBackend(ABC):
+    """缓存后端接口：存储 (数据, 写入时间戳)"""
+
+    name = "base"
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        """读取缓存，返回 (数据, 写入时间戳)，不存在时返回None"""
+
+    @abstractmethod
+    def set(self, key: str, data: Any, timestamp: float) -> None:
+        """写入缓存"""
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """删除缓存"""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """清空所有缓存"""
+
+    @abstractmethod
+    def keys(self) -> List[str]:
+        """列出所有缓存键"""
+
+    def publish(self, key: Optional[str], timestamp: float) -> None:
+        """通知其他进程缓存键已在 timestamp 更新或删除（key为None表示全部），共享后端无需实现"""
+
+    def generation(self, key: str) -> float:
+        """缓存键最后一次通过 publish 失效的时间戳（共享后端直接删除数据，返回0）"""
+        return 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        """缓存统计（容量、命中率等），不支持统计的后端返回空字典"""
+        return {}
+
+
+class GenerationTable:
+    """跨进程缓存代数表
+
+    mmap 共享文件，每个槽位记录一组缓存键（按哈希分槽）的最后写入时间戳，0号槽位记录全局清空时间。
+    进程内缓存条目的写入时间早于槽位时间戳即视为失效。使用时间戳而非计数器作为代数，
+    其他进程在写入前读到的旧文件数据回填后仍会被判定为失效，不存在竞态窗口。
+    哈希冲突只会导致多一次文件读取，不影响正确性。
+    """
+
+    SLOT = struct.Struct("<d")
+
+    def __init__(self, path: Path, slots: int = 1024):
+        self.path = path
+        self.slots = slots
+        size = self.SLOT.size * slots
+        self.fd = os.open(str(path), os.O_RDWR | os.O_CREAT, 0o644)
+        self._lock_file()
+        try:
+            if os.fstat(self.fd).st_size < size:
+                os.ftruncate(self.fd, size)
+        finally:
+            self._unlock_file()
+        self.mm = mmap.mmap(self.fd, size)
+
+    def _lock_file(self) -> None:
+        if fcntl is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_EX)
+
+    def _unlock_file(self) -> None:
+        if fcntl is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+
+    def _index(self, key: str) -> int:
+        return 1 + zlib.crc32(key.encode('utf-8')) % (self.slots - 1)
+
+    def _read(self, index: int) -> float:
+        return self.SLOT.unpack_from(self.mm, index * self.SLOT.size)[0]
+
+    def get(self, key: str) -> float:
+        """缓存键的最后失效时间（槽位时间与全局清空时间取较大值）"""
+        return max(self._read(self._index(key)), self._read(0))
+
+    def bump(self, key: Optional[str], timestamp: float) -> None:
+        """记录缓存键在 timestamp 更新（key为None时记录全局清空）"""
+        index = 0 if key is None else self._index(key)
+        self._lock_file()
+        try:
+            if timestamp > self._read(index):
+                self.SLOT.pack_into(self.mm, index * self.SLOT.size, timestamp)
+        finally:
+            self._unlock_file()
+
+
+class MemoryBackend(CacheBackend):
+    """进程内有界 LRU 后端（可选代数表实现跨进程失效）"""
+
+    name = "memory"
+
+    def __init__(self, generations: Optional[GenerationTable] = None,
+                 max_entries: int = 256, max_bytes: int = 64 * 1024 * 1024):
+        self._lru = BoundedLRU(max_entries=max_entries, max_bytes=max_bytes)
+        self.generations = generations
+
+    def _is_current(self, key: str) -> Callable[[Tuple[Any, float]], bool]:
+        # 其他进程在该条目写入后更新或删除过该键时，丢弃本地副本
+        return lambda cached: cached[1] >= self.generations.get(key)
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        is_valid = self._is_current(key) if self.generations is not None else None
+        return self._lru.get(key, is_valid=is_valid)
+
+    def publish(self, key: Optional[str], timestamp: float) -> None:
+        if self.generations is not None:
+            self.generations.bump(key, timestamp)
+
+    def generation(self, key: str) -> float:
+        return self.generations.get(key) if self.generations is not None else 0.0
+
+    def set(self, key: str, data: Any, timestamp: float) -> None:
+        self._lru.set(key, (data, timestamp))
+
+    def delete(self, key: str) -> None:
+        self._lru.pop(key)
+
+    def clear(self) -> None:
+        self._lru.clear()
+
+    def keys(self) -> List[str]:
+        return self._lru.keys()
+
+    def stats(self) -> Dict[str, Any]:
+        return self._lru.stats()
+
+
+# 共享内存段头部：魔数、序列号（seqlock，写入中为奇数）、写入时间戳、数据长度
+_SEGMENT_MAGIC = b"GMSHM001"
+_SEGMENT_HEADER = struct.Struct("<8sQdQ")
+_SEGMENT_MIN_SIZE = 4096
+
+
+class _Segment:
+    """单个缓存键的共享内存段（文件映射，只增长不收缩）"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.fd = os.open(str(path), os.O_RDWR | os.O_CREAT, 0o600)
+        self.mm: Optional[mmap.mmap] = None
+        self.size = 0
+        # 本进程已解码的数据（序列号不变时直接复用）
+        self.decoded_seq = -1
+        self.decoded: Optional[Tuple[Any, float]] = None
+        self._remap()
+
+    def _remap(self) -> None:
+        size = os.fstat(self.fd).st_size
+        if size < _SEGMENT_MIN_SIZE:
+            self._lock_file()
+            try:
+                size = os.fstat(self.fd).st_size
+                if size < _SEGMENT_MIN_SIZE:
+                    os.ftruncate(self.fd, _SEGMENT_MIN_SIZE)
+                    size = _SEGMENT_MIN_SIZE
+            finally:
+                self._unlock_file()
+        if self.mm is not None:
+            self.mm.close()
+        self.mm = mmap.mmap(self.fd, size)
+        self.size = size
+
+    def _lock_file(self) -> None:
+        if fcntl is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_EX)
+
+    def _unlock_file(self) -> None:
+        if fcntl is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+
+    def is_unlinked(self) -> bool:
+        """共享段文件是否已被删除（其他进程删除缓存后需要重新打开）"""
+        return os.fstat(self.fd).st_nlink == 0
+
+    def close(self) -> None:
+        if self.mm is not None:
+            self.mm.close()
+            self.mm = None
+        os.close(self.fd)
+
+    def unlink(self) -> None:
+        """删除共享段：先写入空数据（已映射的进程读到空值），再删除文件"""
+        self._lock_file()
+        try:
+            if self.is_unlinked():
+                return
+            magic, seq, _, _ = self._header()
+            _SEGMENT_HEADER.pack_into(self.mm, 0, _SEGMENT_MAGIC, (seq if magic == _SEGMENT_MAGIC else 0) + 2, 0.0, 0)
+            try:
+                self.path.unlink()
+            except FileNotFoundError:
+                pass
+        finally:
+            self._unlock_file()
+
+    def _header(self) -> Tuple[bytes, int, float, int]:
+        return _SEGMENT_HEADER.unpack_from(self.mm, 0)
+
+    def read(self, retries: int = 100) -> Optional[Tuple[Any, float]]:
+        """无锁读取（seqlock：序列号前后一致且为偶数时数据有效）"""
+        for _ in range(retries):
+            magic, seq, timestamp, length = self._header()
+            if magic != _SEGMENT_MAGIC:
+                return None
+            if seq % 2:
+                time.sleep(0.0005)
+                continue
+            if seq == self.decoded_seq:
+                return self.decoded
+            if length == 0:
+                return None
+            if _SEGMENT_HEADER.size + length > self.size:
+                # 其他进程扩容了共享段，重新映射
+                self._remap()
+                continue
+            payload = self.mm[_SEGMENT_HEADER.size:_SEGMENT_HEADER.size + length]
+            if self._header()[1] != seq:
+                continue
+            try:
+                decoded = get_serializer().loads(payload)
+            except ValueError:
+                continue
+            self.decoded_seq, self.decoded = seq, decoded
+            return decoded
+        return None
+
+    def write(self, payload: bytes, timestamp: float) -> bool:
+        """加文件锁写入（序列号先置为奇数，写完再置为偶数）；文件已被删除时返回False"""
+        self._lock_file()
+        try:
+            if self.is_unlinked():
+                return False
+            required = _SEGMENT_HEADER.size + len(payload)
+            if required > os.fstat(self.fd).st_size:
+                capacity = _SEGMENT_MIN_SIZE
+                while capacity < required:
+                    capacity *= 2
+                os.ftruncate(self.fd, capacity)
+            if required > self.size or os.fstat(self.fd).st_size != self.size:
+                self.mm.close()
+                self.size = os.fstat(self.fd).st_size
+                self.mm = mmap.mmap(self.fd, self.size)
+
+            magic, seq, _, _ = self._header()
+            seq = seq if magic == _SEGMENT_MAGIC else 0
+            _SEGMENT_HEADER.pack_into(self.mm, 0, _SEGMENT_MAGIC, seq + 1, 0.0, 0)
+            self.mm[_SEGMENT_HEADER.size:required] = payload
+            _SEGMENT_HEADER.pack_into(self.mm, 0, _SEGMENT_MAGIC, seq + 2, timestamp, len(payload))
+            os.utime(self.fd)  # 修改时间用于按最近写入淘汰
+            return True
+        finally:
+            self._unlock_file()
+
+
+class SharedMemoryBackend(CacheBackend):
+    """mmap 共享内存后端（同一主机多worker共享）
+
+    每个缓存键一个共享段文件（默认位于 /dev/shm）。删除缓存时先写入空数据再删除文件，
+    其他进程发现已映射的文件被删除后重新打开。共享段数量超过 max_segments 时
+    删除最久未写入的共享段（查询缓存、LLM缓存等键的数量随参数增长）。
+    """
+
+    name = "shm"
+
+    def __init__(self, directory: Optional[str] = None, max_segments: int = 512):
+        if directory:
+            self.directory = Path(directory)
+        elif Path("/dev/shm").is_dir():
+            self.directory = Path("/dev/shm") / "goldmind_cache"
+        else:
+            self.directory = Path(__file__).parent.parent.parent / "cache" / "shm"
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_segments = max_segments
+        self._segments: Dict[str, _Segment] = {}
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.seg"
+
+    def _drop(self, key: str) -> None:
+        segment = self._segments.pop(key, None)
+        if segment is not None:
+            segment.close()
+
+    def _segment(self, key: str, create: bool) -> Optional[_Segment]:
+        segment = self._segments.get(key)
+        if segment is not None and segment.is_unlinked():
+            self._drop(key)
+            segment = None
+        if segment is None:
+            path = self._path(key)
+            if not path.exists():
+                if not create:
+                    return None
+                self._evict()
+            segment = _Segment(path)
+            self._segments[key] = segment
+        return segment
+
+    def _evict(self) -> None:
+        """共享段数量达到上限时删除最久未写入的共享段（一次删除约10%）"""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".seg"):
+                try:
+                    entries.append((entry.stat().st_mtime, entry.name[:-4]))
+                except FileNotFoundError:
+                    continue
+        excess = len(entries) - self.max_segments + 1
+        if excess <= 0:
+            return
+        entries.sort()
+        for _, key in entries[:max(excess, self.max_segments // 10)]:
+            self._unlink(key)
+
+    def _unlink(self, key: str) -> None:
+        segment = self._segment(key, create=False)
+        if segment is not None:
+            segment.unlink()
+            self._drop(key)
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        with self._lock:
+            segment = self._segment(key, create=False)
+            return segment.read() if segment else None
+
+    def set(self, key: str, data: Any, timestamp: float) -> None:
+        payload = get_serializer().dumps(data, timestamp)
+        with self._lock:
+            # 打开后、写入前文件被其他进程删除时重新创建
+            while not self._segment(key, create=True).write(payload, timestamp):
+                self._drop(key)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._unlink(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            for path in self.directory.glob("*.seg"):
+                self._unlink(path.stem)
+
+    def keys(self) -> List[str]:
+        with self._lock:
+            keys = []
+            for path in self.directory.glob("*.seg"):
+                segment = self._segment(path.stem, create=False)
+                if segment and segment.read() is not None:
+                    keys.append(path.stem)
+            return keys
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "segments": sum(1 for _ in self.directory.glob("*.seg")),
+                "max_segments": self.max_segments,
+            }
+
+
+class RedisBackend(CacheBackend):
+    """Redis后端（可连接本地 Redis 协议服务）"""
+
+    name = "redis"
+
+    def __init__(self, url: str, prefix: str = "goldmind:cache:"):
+        import redis  # 可选依赖，仅在启用 redis 后端时需要
+        self.client = redis.Redis.from_url(url, socket_timeout=1, socket_connect_timeout=1)
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        raw = self.client.get(self.prefix + key)
+        if not raw:
+            return None
+        return get_serializer().loads(raw)
+
+    def set(self, key: str, data: Any, timestamp: float) -> None:
+        self.client.set(self.prefix + key, get_serializer().dumps(data, timestamp))
+
+    def delete(self, key: str) -> None:
+        self.client.delete(self.prefix + key)
+
+    def clear(self) -> None:
+        keys = list(self.client.scan_iter(match=self.prefix + "*"))
+        if keys:
+            self.client.delete(*keys)
+
+    def keys(self) -> List[str]:
+        return [
+            key.decode('utf-8')[len(self.prefix):]
+            for key in self.client.scan_iter(match=self.prefix + "*")
+        ]
+
+
+_backend: Optional[CacheBackend] = None
+_backend_lock = threading.Lock()
+
+
+def create_backend(name: str) -> CacheBackend:
+    """按名称创建缓存后端（无法创建时回退为进程内后端）"""
+    try:
+        if name == "shm":
+            return SharedMemoryBackend(settings.CACHE_SHM_DIR or None, settings.CACHE_SHM_MAX_SEGMENTS)
+        if name == "redis":
+            return RedisBackend(settings.CACHE_REDIS_URL)
+    except Exception as e:
+        print(f"[CacheBackend] 初始化 {name} 后端失败，回退为进程内缓存: {e}")
+    try:
+        generations = GenerationTable(GENERATION_FILE)
+    except Exception as e:
+        print(f"[CacheBackend] 初始化跨进程代数表失败，进程内缓存仅按TTL过期: {e}")
+        generations = None
+    return MemoryBackend(generations, settings.CACHE_MEMORY_MAX_ENTRIES, settings.CACHE_MEMORY_MAX_BYTES)
+
+
+def get_backend() -> CacheBackend:
+    """获取全局缓存后端（按 settings.CACHE_BACKEND 懒加载）"""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = create_backend(settings.CACHE_BACKEND)
+    return _backend
@@ -0,0 +1,69 @@
+"""缓存事件 - 源数据更新后按标签使依赖的缓存失效
+
+定时任务在提交数据库事务后触发事件（事件名即源数据标签），只有依赖该数据的缓存失效：
+- CacheManager 缓存：CACHE_POLICIES 中 tags 包含该标签的缓存键被标记失效，
+  下一次读取返回旧数据并触发后台刷新（单飞），未被访问的缓存不会被重复计算
+- 查询结果缓存：QUERY_NAMESPACES 中对应的命名空间全部失效
+- 订阅者：通过 subscribe 注册的回调（如需要立即重算的缓存）
+
+缓存写入新数据时也可以触发事件（CACHE_POLICIES 的 emits），
+例如看涨/看跌因子更新后，依赖因子的投资建议和市场总结随之失效。
+"""
+from typing import Callable, Dict, List, Optional
+
+from app.services.cache_manager import CACHE_POLICIES, CacheManager
+from app.services.query_cache import query_cache, PRICES_DAILY, PRICES_CORRELATION
+
+# 事件（源数据标签）
+PRICES = "prices"      # 黄金日线价格
+DOLLAR = "dollar"      # 美元指数日线
+NEWS = "news"          # 新闻资讯
+FACTORS = "factors"    # AI因子分析（看涨/看跌/机构预测）
+
+# 标签 -> 依赖该数据的查询缓存命名空间
+QUERY_NAMESPACES: Dict[str, tuple] = {
+    PRICES: (PRICES_DAILY, PRICES_CORRELATION),
+    DOLLAR: (PRICES_CORRELATION,),
+}
+
+# 标签 -> 订阅回调 (标签, 失效的缓存键列表)
+_subscribers: Dict[str, List[Callable[[str, List[str]], None]]] = {}
+
+
+def subscribe(tag: str, handler: Callable[[str, List[str]], None]) -> None:
+    """订阅数据更新事件"""
+    _subscribers.setdefault(tag, []).append(handler)
+
+
+def keys_for_tag(tag: str) -> List[str]:
+    """依赖指定标签的缓存键"""
+    return [key for key, policy in CACHE_POLICIES.items() if tag in policy.get("tags", ())]
+
+
+def fire_event(tag: str, source: Optional[str] = None) -> List[str]:
+    """
+    触发数据更新事件，使依赖该数据的缓存失效
+
+    Args:
+        tag: 源数据标签
+        source: 触发来源（用于日志）
+
+    Returns:
+        被标记失效的缓存键
+    """
+    keys = [key for key in keys_for_tag(tag) if key != source]
+    for key in keys:
+        CacheManager(key).invalidate()
+
+    namespaces = QUERY_NAMESPACES.get(tag)
+    if namespaces:
+        query_cache.invalidate(*namespaces)
+
+    for handler in _subscribers.get(tag, []):
+        try:
+            handler(tag, keys)
+        except Exception as e:
+            print(f"[CacheEvents] 事件 {tag} 回调执行失败: {e}")
+
+    print(f"[CacheEvents] {source or tag} 数据已更新，失效缓存: {keys + [f'query:{n}' for n in namespaces or ()]}")
+    return keys
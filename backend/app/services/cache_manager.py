@@ -1,139 +1,527 @@
 """缓存管理器 - 支持多进程共享
 
-使用文件缓存实现多进程间的缓存共享
+一级缓存由可插拔的缓存后端提供（进程内 / 共享内存 / Redis，见 cache_backends），
+文件缓存作为持久化的二级缓存，实现多进程间及重启后的缓存共享。
+文件使用带定长头部的二进制格式（见 cache_serializers），旧版 .json 缓存仍可读取。
+缓存重新计算支持单飞（single-flight）：同一缓存键同时只有一个刷新任务，
+进程内通过共享 Future 合并，跨进程通过锁文件互斥。
+
+过期分为两级：
+- 软过期（ttl）：数据仍可返回（stale-while-revalidate），同时触发后台刷新
+- 硬过期（hard_ttl）：数据不再返回，视为未命中
+
+各缓存键的过期时间和是否持久化由 CACHE_POLICIES 统一配置，
+实时行情等短期数据只保存在一级缓存（内存/共享内存），不写文件。
+缓存键可以带标签（依赖的源数据），源数据更新后通过 cache_events 使对应的缓存失效：
+失效的缓存按软过期处理（仍返回旧数据并后台刷新），而不是等待固定的 TTL。
+
+刷新失败（计算抛出异常或返回标记为 fallback 的降级结果）时记录负缓存：
+降级结果不覆盖已有缓存，后台刷新按指数退避暂停，上游故障期间每个退避窗口只尝试一次。
 """
 import json
 import os
 import threading
 import time
-from datetime import datetime
-from typing import Any, Dict, Optional
+from concurrent.futures import Executor, Future
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
 from pathlib import Path
 
+from app.config import settings
+from app.services.cache_backends import get_backend
+from app.services.cache_serializers import get_serializer, read_timestamp
+
 # 缓存目录
 CACHE_DIR = Path(__file__).parent.parent.parent / "cache"
 CACHE_DIR.mkdir(exist_ok=True)
 
-# 内存缓存（进程内）
-_memory_cache = {}
-_memory_cache_lock = threading.Lock()
+# 缓存键策略：ttl 软过期（秒）、hard_ttl 硬过期（秒，None表示 settings.CACHE_HARD_TTL）、
+# persist 是否写入文件缓存（持久化、重启后可用）、
+# tags 依赖的源数据标签（对应标签的数据更新事件使该缓存失效，见 cache_events）、
+# emits 写入新数据时触发的事件（依赖本缓存的其他缓存随之失效）
+DEFAULT_CACHE_POLICY: Dict[str, Any] = {"ttl": 7200, "hard_ttl": None, "persist": True, "tags": (), "emits": None}
+CACHE_POLICIES: Dict[str, Dict[str, Any]] = {
+    # AI分析结果：软过期或源数据更新后返回旧数据并后台刷新
+    "bullish_factors": {"ttl": 7200, "tags": ("news", "prices"), "emits": "factors"},
+    "bearish_factors": {"ttl": 7200, "tags": ("news", "prices"), "emits": "factors"},
+    "institution_predictions": {"ttl": 3600, "tags": ("news",), "emits": "factors"},  # 实时数据更频繁更新
+    "investment_advice": {"ttl": 7200, "tags": ("news", "prices", "factors")},
+    "market_summary": {"ttl": 7200, "tags": ("factors",)},
+    # 期间统计：每日价格更新后重新计算
+    "period_statistics": {"ttl": 86400, "tags": ("prices",)},
+    # 实时行情：过期即失效，不返回旧价格，只保存在一级缓存
+    "realtime_price": {"ttl": 300, "hard_ttl": 300, "persist": False},
+    "london_gold_realtime": {"ttl": 30, "hard_ttl": 30, "persist": False},
+}
+
+# 失效标记的缓存键后缀
+INVALIDATION_SUFFIX = "#invalidated"
+# 负缓存（刷新失败记录）的缓存键后缀
+FAILURE_SUFFIX = ".failure"
+# 降级结果标记：数据中该字段为真时视为刷新失败，不写入缓存
+FALLBACK_FLAG = "fallback"
+
+# 进程内正在进行的刷新任务（缓存键 -> Future）
+_inflight: Dict[str, Future] = {}
+_inflight_lock = threading.Lock()
+
+# 锁文件超过该时间视为持有进程已崩溃（秒），需大于最长的AI分析耗时
+LOCK_STALE_SECONDS = 600
+# 等待其他进程刷新时的轮询间隔（秒）
+LOCK_POLL_INTERVAL = 1.0
+
+
+def _backend_call(method: str, *args) -> Any:
+    """调用缓存后端（后端异常时记录并返回None，由文件缓存兜底）"""
+    try:
+        return getattr(get_backend(), method)(*args)
+    except Exception as e:
+        print(f"[CacheManager] 缓存后端 {method} 失败: {e}")
+        return None
+
+
+def mark_invalidated(key: str, timestamp: Optional[float] = None) -> None:
+    """记录缓存键（或查询缓存命名空间）在 timestamp 失效，早于该时间写入的数据视为过期
+
+    失效时间保存在缓存后端（共享后端直接可见），同时通过 publish 通知使用进程内后端的其他进程。
+    """
+    timestamp = time.time() if timestamp is None else timestamp
+    marker = key + INVALIDATION_SUFFIX
+    _backend_call("set", marker, timestamp, timestamp)
+    _backend_call("publish", marker, timestamp)
+
+
+def invalidated_at(key: str) -> float:
+    """缓存键最后一次失效的时间戳（从未失效时返回0）"""
+    marker = key + INVALIDATION_SUFFIX
+    cached = _backend_call("get", marker)
+    return max(cached[1] if cached else 0.0, _backend_call("generation", marker) or 0.0)
+
+
+@dataclass
+class CacheEntry:
+    """缓存条目"""
+    data: Any
+    timestamp: float  # 写入时间戳
+    age: float        # 已缓存时长（秒）
+    stale: bool       # 是否已超过软过期时间
 
 
 class CacheManager:
     """缓存管理器"""
     
-    def __init__(self, cache_key: str, ttl: int = 7200):
+    def __init__(self, cache_key: str, ttl: Optional[int] = None, hard_ttl: Optional[int] = None,
+                 persist: Optional[bool] = None):
         """
         Args:
             cache_key: 缓存键
-            ttl: 缓存过期时间（秒），默认2小时
+            ttl: 软过期时间（秒），超过后返回旧数据并后台刷新
+            hard_ttl: 硬过期时间（秒），超过后视为未命中
+            persist: 是否写入文件缓存
+
+        未指定的参数使用 CACHE_POLICIES 中该缓存键的策略（默认软过期2小时、
+        硬过期 settings.CACHE_HARD_TTL、持久化）。
         """
+        policy = {**DEFAULT_CACHE_POLICY, **CACHE_POLICIES.get(cache_key, {})}
+        ttl = policy["ttl"] if ttl is None else ttl
+        if hard_ttl is None:
+            hard_ttl = policy["hard_ttl"]
         self.cache_key = cache_key
         self.ttl = ttl
-        self.file_path = CACHE_DIR / f"{cache_key}.json"
+        self.hard_ttl = max(ttl, settings.CACHE_HARD_TTL if hard_ttl is None else hard_ttl)
+        self.persist = policy["persist"] if persist is None else persist
+        self.tags = tuple(policy["tags"])
+        self.emits = policy["emits"]
+        self._failures: Optional["CacheManager"] = None
+        self.file_path = CACHE_DIR / f"{cache_key}.cache"
+        self.legacy_path = CACHE_DIR / f"{cache_key}.json"  # 旧版JSON格式缓存（只读）
+        self.lock_path = CACHE_DIR / f"{cache_key}.lock"
     
-    def get(self) -> Optional[Dict[str, Any]]:
-        """获取缓存数据（先查内存，再查文件）"""
-        # 1. 检查内存缓存
-        with _memory_cache_lock:
-            if self.cache_key in _memory_cache:
-                data, timestamp = _memory_cache[self.cache_key]
-                if time.time() - timestamp < self.ttl:
-                    return data
+    def get_entry(self) -> Optional[CacheEntry]:
+        """获取缓存条目（先查缓存后端，再查文件），超过软过期仍返回（stale=True），超过硬过期返回None"""
+        now = time.time()
+        
+        # 1. 检查一级缓存（缓存后端）
+        cached = _backend_call("get", self.cache_key)
+        if cached is not None:
+            data, timestamp = cached
+            if now - timestamp < self.hard_ttl:
+                return self._make_entry(data, timestamp, now)
+        if not self.persist:
+            return None
         
-        # 2. 检查文件缓存
+        # 2. 检查文件缓存（先读头部时间戳，硬过期的文件不解析数据体）
         try:
-            if self.file_path.exists():
-                with open(self.file_path, 'r', encoding='utf-8') as f:
-                    cached = json.load(f)
-                    timestamp = cached.get('_timestamp', 0)
-                    if time.time() - timestamp < self.ttl:
-                        data = cached.get('data')
-                        # 更新内存缓存
-                        with _memory_cache_lock:
-                            _memory_cache[self.cache_key] = (data, timestamp)
-                        return data
+            cached = self._read_file(now)
+            if cached is not None:
+                data, timestamp = cached
+                # 回填一级缓存
+                _backend_call("set", self.cache_key, data, timestamp)
+                return self._make_entry(data, timestamp, now)
         except Exception as e:
             print(f"[CacheManager] 读取文件缓存失败: {e}")
         
         return None
     
+    def _read_file(self, now: float) -> Optional[Tuple[Any, float]]:
+        """读取文件缓存，返回 (数据, 写入时间戳)；不存在或已硬过期时返回None"""
+        timestamp = read_timestamp(self.file_path)
+        if timestamp is not None:
+            if now - timestamp >= self.hard_ttl:
+                return None
+            with open(self.file_path, 'rb') as f:
+                return get_serializer().loads(f.read())
+        
+        # 兼容旧版JSON格式缓存
+        if self.legacy_path.exists():
+            with open(self.legacy_path, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+            timestamp = cached.get('_timestamp', 0)
+            if now - timestamp < self.hard_ttl:
+                return cached.get('data'), timestamp
+        return None
+    
+    def _make_entry(self, data: Any, timestamp: float, now: float) -> CacheEntry:
+        age = now - timestamp
+        stale = age >= self.ttl or (bool(self.tags) and timestamp < invalidated_at(self.cache_key))
+        return CacheEntry(data=data, timestamp=timestamp, age=age, stale=stale)
+    
+    def get(self) -> Optional[Dict[str, Any]]:
+        """获取未过期的缓存数据（超过软过期时间返回None）"""
+        entry = self.get_entry()
+        if entry is None or entry.stale:
+            return None
+        return entry.data
+    
     def set(self, data: Dict[str, Any]) -> None:
-        """设置缓存数据（同时更新内存和文件，使用原子写入保证一致性）"""
+        """设置缓存数据（同时更新缓存后端和文件，使用原子写入保证一致性）
+
+        标记为降级结果（data["fallback"] 为真）的数据不覆盖缓存，只记录一次刷新失败。
+        """
+        if isinstance(data, dict) and data.get(FALLBACK_FLAG):
+            self.record_failure(data.get("error") or "返回降级结果")
+            return
+        self.clear_failure()
         timestamp = time.time()
         
-        # 1. 更新内存缓存
-        with _memory_cache_lock:
-            _memory_cache[self.cache_key] = (data, timestamp)
+        # 1. 更新一级缓存
+        _backend_call("set", self.cache_key, data, timestamp)
+        if not self.persist:
+            _backend_call("publish", self.cache_key, timestamp)
+            self._emit()
+            return
         
-        # 2. 更新文件缓存（使用原子写入避免并发冲突和文件损坏）
+        # 2. 更新文件缓存（二进制格式，使用原子写入避免并发冲突和文件损坏）
+        temp_file = self.file_path.with_suffix('.tmp')
         try:
-            cache_data = {
-                'data': data,
-                '_timestamp': timestamp,
-                '_created_at': datetime.now().isoformat()
-            }
+            payload = get_serializer().dumps(data, timestamp)
             
             # 使用临时文件+原子重命名，避免写入中断导致文件损坏
-            temp_file = self.file_path.with_suffix('.tmp')
-            with open(temp_file, 'w', encoding='utf-8') as f:
-                json.dump(cache_data, f, ensure_ascii=False, indent=2)
+            with open(temp_file, 'wb') as f:
+                f.write(payload)
+            # 文件修改时间设为写入时间戳，新鲜度检查只需一次 stat()
+            os.utime(temp_file, (timestamp, timestamp))
             
             # 原子重命名（Windows/Linux都安全，保证文件完整性）
             temp_file.replace(self.file_path)
             
+            # 文件已替换，通知其他进程丢弃内存中的旧副本
+            _backend_call("publish", self.cache_key, timestamp)
+            
+            # 新格式写入成功后移除旧版JSON缓存
+            if self.legacy_path.exists():
+                self.legacy_path.unlink()
+            
+            self._emit()
+            
         except Exception as e:
             print(f"[CacheManager] 写入文件缓存失败: {e}")
             # 清理临时文件（如果存在）
             try:
-                temp_file = self.file_path.with_suffix('.tmp')
                 if temp_file.exists():
                     temp_file.unlink()
             except:
                 pass
     
+    def _emit(self) -> None:
+        """写入新数据后触发策略中配置的事件，使依赖本缓存的其他缓存失效"""
+        if self.emits:
+            from app.services.cache_events import fire_event  # 延迟导入避免循环依赖
+            fire_event(self.emits, source=self.cache_key)
+    
+    def invalidate(self) -> None:
+        """标记缓存失效：数据保留，按软过期处理（返回旧数据并触发后台刷新）"""
+        mark_invalidated(self.cache_key)
+    
     def delete(self) -> None:
         """删除缓存"""
-        # 删除内存缓存
-        with _memory_cache_lock:
-            if self.cache_key in _memory_cache:
-                del _memory_cache[self.cache_key]
+        # 删除一级缓存（并通知其他进程）
+        _backend_call("delete", self.cache_key)
+        _backend_call("publish", self.cache_key, time.time())
         
         # 删除文件缓存
+        if not self.persist:
+            return
         try:
-            if self.file_path.exists():
-                self.file_path.unlink()
+            for path in (self.file_path, self.legacy_path):
+                if path.exists():
+                    path.unlink()
         except Exception as e:
             print(f"[CacheManager] 删除文件缓存失败: {e}")
     
+    def age(self) -> Optional[float]:
+        """缓存已存在时长（秒），由文件修改时间得到（一次 stat()，不读取内容）；无缓存时返回None"""
+        if not self.persist:
+            entry = self.get_entry()
+            return entry.age if entry else None
+        try:
+            return time.time() - self.file_path.stat().st_mtime
+        except FileNotFoundError:
+            pass
+        # 旧版JSON缓存或文件写入失败时，回退为读取完整条目
+        entry = self.get_entry()
+        return entry.age if entry else None
+    
     def exists(self) -> bool:
-        """检查缓存是否存在且有效"""
-        return self.get() is not None
+        """检查缓存是否存在且未过软过期时间（且源数据更新后未失效）"""
+        age = self.age()
+        if age is None or age >= self.ttl:
+            return False
+        return not self.tags or time.time() - age >= invalidated_at(self.cache_key)
+
+    def _failure_store(self) -> "CacheManager":
+        """负缓存存储（独立缓存键，超过最大退避时间的两倍后自动过期）
+
+        与本缓存相同的持久化策略：不写文件的实时缓存，失败记录也只保存在缓存后端，
+        每次写入时检查失败记录不访问磁盘。
+        """
+        if self._failures is None:
+            window = settings.CACHE_FAILURE_BACKOFF_MAX * 2
+            self._failures = CacheManager(self.cache_key + FAILURE_SUFFIX, ttl=window, hard_ttl=window,
+                                          persist=self.persist)
+        return self._failures
+
+    def failure_state(self) -> Optional[Dict[str, Any]]:
+        """最近的刷新失败记录（连续失败次数、最后错误、下次允许重试时间），无失败时返回None"""
+        return self._failure_store().get()
+
+    def record_failure(self, error: Any) -> Dict[str, Any]:
+        """记录一次刷新失败，退避时间按连续失败次数指数增长（不超过 CACHE_FAILURE_BACKOFF_MAX）"""
+        previous = self.failure_state() or {}
+        failures = previous.get("failures", 0) + 1
+        backoff = min(
+            settings.CACHE_FAILURE_BACKOFF_BASE * 2 ** (failures - 1),
+            settings.CACHE_FAILURE_BACKOFF_MAX
+        )
+        now = time.time()
+        state = {
+            "failures": failures,
+            "last_error": str(error)[:200],
+            "failed_at": now,
+            "retry_at": now + backoff,
+            "backoff_seconds": backoff,
+        }
+        self._failure_store().set(state)
+        print(f"[CacheManager] {self.cache_key} 刷新失败（连续{failures}次），{backoff}秒内不再重试: {state['last_error']}")
+        return state
+
+    def clear_failure(self) -> None:
+        """刷新成功后清除失败记录"""
+        if self.cache_key.endswith(FAILURE_SUFFIX):  # 负缓存自身不记录失败
+            return
+        store = self._failure_store()
+        if store.get_entry() is not None:  # 大多数写入没有失败记录，只需一次查询
+            store.delete()
+
+    def backoff_remaining(self) -> float:
+        """距离允许下一次刷新的剩余秒数（不在退避期时为0）"""
+        state = self.failure_state()
+        if not state:
+            return 0.0
+        return max(0.0, state["retry_at"] - time.time())
+
+    def failure_metadata(self) -> Dict[str, Any]:
+        """用于响应 metadata 的失败信息（无失败记录时为空字典）"""
+        state = self.failure_state()
+        if not state:
+            return {}
+        return {
+            "refresh_failures": state["failures"],
+            "last_error": state["last_error"],
+            "retry_after_seconds": int(max(0.0, state["retry_at"] - time.time())),
+        }
+
+    def apply_failure_metadata(self, metadata: Dict[str, Any]) -> Dict[str, Any]:
+        """在响应 metadata 中附加失败信息；无缓存且处于退避期时，状态由分析中改为等待重试"""
+        failure = self.failure_metadata()
+        if failure:
+            metadata.update(failure)
+            if metadata.get("status") == "analyzing" and failure["retry_after_seconds"] > 0:
+                metadata["status"] = "retry_backoff"
+                metadata["message"] = f"AI分析暂时失败，{failure['retry_after_seconds']}秒后自动重试"
+        return metadata
+
+    def _try_acquire_lock(self) -> bool:
+        """尝试获取跨进程刷新锁（O_CREAT|O_EXCL 创建锁文件，超时的锁视为失效）"""
+        for _ in range(2):
+            try:
+                fd = os.open(str(self.lock_path), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                try:
+                    if time.time() - self.lock_path.stat().st_mtime < LOCK_STALE_SECONDS:
+                        return False
+                    # 持有进程已崩溃，清理失效锁后重试一次
+                    self.lock_path.unlink()
+                except FileNotFoundError:
+                    pass
+                continue
+            with os.fdopen(fd, 'w') as f:
+                f.write(f"{os.getpid()} {time.time()}")
+            return True
+        return False
+
+    def _release_lock(self) -> None:
+        try:
+            self.lock_path.unlink()
+        except FileNotFoundError:
+            pass
+
+    def _wait_for_lock(self) -> None:
+        """等待其他进程完成刷新（锁文件消失或失效）"""
+        while self.lock_path.exists():
+            try:
+                if time.time() - self.lock_path.stat().st_mtime >= LOCK_STALE_SECONDS:
+                    return
+            except FileNotFoundError:
+                return
+            time.sleep(LOCK_POLL_INTERVAL)
+
+    def _stored_timestamp(self) -> float:
+        """读取缓存的写入时间戳（不存在时返回0），不持久化的缓存读取一级缓存"""
+        if not self.persist:
+            cached = _backend_call("get", self.cache_key)
+            return cached[1] if cached else 0
+        timestamp = read_timestamp(self.file_path)
+        return timestamp if timestamp is not None else 0
+
+    def _refresh_with_lock(self, compute: Callable[[], Any], requested_at: float) -> Any:
+        """持有跨进程锁执行刷新；其他进程正在刷新时等待其完成并读取结果"""
+        if not self._try_acquire_lock():
+            print(f"[CacheManager] {self.cache_key} 正在由其他进程刷新，等待结果")
+            self._wait_for_lock()
+            return self.get()
+        try:
+            # 其他进程在本次请求之后已完成刷新，直接使用其结果
+            if self._stored_timestamp() >= requested_at:
+                return self.get()
+            return compute()
+        finally:
+            self._release_lock()
+
+    def single_flight(self, compute: Callable[[], Any], executor: Optional[Executor] = None) -> Future:
+        """
+        单飞刷新：同一缓存键同时只执行一个刷新任务
+
+        进程内的并发调用共享同一个 Future；跨进程通过锁文件互斥，
+        未抢到锁的进程等待持锁进程完成后直接读取其写入的缓存。
+
+        Args:
+            compute: 刷新函数（负责写入缓存），返回值作为 Future 的结果
+            executor: 执行刷新的线程池，为None时在当前线程同步执行
+
+        Returns:
+            刷新任务的 Future（已有刷新进行中时返回同一个 Future）
+        """
+        with _inflight_lock:
+            future = _inflight.get(self.cache_key)
+            if future is not None:
+                return future
+            future = Future()
+            _inflight[self.cache_key] = future
+        requested_at = time.time()
+
+        def run():
+            try:
+                future.set_result(self._refresh_with_lock(compute, requested_at))
+            except BaseException as e:
+                self.record_failure(f"{type(e).__name__}: {e}")
+                future.set_exception(e)
+            finally:
+                with _inflight_lock:
+                    _inflight.pop(self.cache_key, None)
+
+        if executor is None:
+            run()
+        else:
+            try:
+                executor.submit(run)
+            except Exception as e:
+                with _inflight_lock:
+                    _inflight.pop(self.cache_key, None)
+                future.set_exception(e)
+        return future
+
+    def refresh_in_background(self, compute: Callable[[], Any], executor: Optional[Executor] = None) -> Optional[Future]:
+        """
+        后台刷新（单飞 + 失败退避）：处于退避期时不提交刷新，返回None
+
+        用于读取缓存时触发的自动刷新；用户主动的强制刷新直接使用 single_flight。
+        """
+        remaining = self.backoff_remaining()
+        if remaining > 0:
+            print(f"[CacheManager] {self.cache_key} 处于失败退避期，{int(remaining)}秒后再刷新")
+            return None
+        return self.single_flight(compute, executor)
+
+    def is_refreshing(self) -> bool:
+        """是否有刷新任务正在进行（本进程或其他进程）"""
+        with _inflight_lock:
+            if self.cache_key in _inflight:
+                return True
+        return self.lock_path.exists()
 
 
 def clear_all_cache():
     """清除所有缓存"""
-    global _memory_cache
-    with _memory_cache_lock:
-        _memory_cache.clear()
+    _backend_call("clear")
+    _backend_call("publish", None, time.time())
     
     # 清除文件缓存
     try:
-        for f in CACHE_DIR.glob("*.json"):
-            f.unlink()
+        for pattern in ("*.cache", "*.json"):
+            for f in CACHE_DIR.glob(pattern):
+                f.unlink()
     except Exception as e:
         print(f"[CacheManager] 清除文件缓存失败: {e}")
 
 
+def get_cache_ages() -> Dict[str, float]:
+    """获取所有文件缓存的已存在时长（秒），每个文件一次 stat()"""
+    now = time.time()
+    ages = {}
+    for f in CACHE_DIR.glob("*.cache"):
+        try:
+            ages[f.stem] = round(now - f.stat().st_mtime, 1)
+        except FileNotFoundError:
+            continue
+    return ages
+
+
 def get_cache_status():
     """获取缓存状态"""
-    with _memory_cache_lock:
-        memory_keys = list(_memory_cache.keys())
+    memory_keys = _backend_call("keys") or []
+    
+    file_keys = sorted({f.stem for pattern in ("*.cache", "*.json") for f in CACHE_DIR.glob(pattern)})
     
-    file_keys = [f.stem for f in CACHE_DIR.glob("*.json")]
+    with _inflight_lock:
+        refreshing_keys = list(_inflight.keys())
     
     return {
+        "backend": get_backend().name,
         "memory_cache_keys": memory_keys,
+        "memory_cache_stats": _backend_call("stats") or {},
         "file_cache_keys": file_keys,
+        "file_cache_ages": get_cache_ages(),
+        "refreshing_keys": refreshing_keys,
         "cache_dir": str(CACHE_DIR)
     }
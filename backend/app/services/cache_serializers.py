@@ -0,0 +1,147 @@
+"""缓存序列化 - 带定长头部的二进制缓存格式
+
+文件格式：
+    [20字节头部][数据体]
+    头部: 魔数(4) | 格式版本(1) | 编码(1) | 压缩(1) | 保留(1) | 写入时间戳(float64) | 数据体长度(uint32)
+
+- 编码：orjson（默认）/ msgpack / json，按头部记录的编码解码，不同配置写入的文件可以互相读取
+- 压缩：none / zstd（需安装 zstandard）
+- 新鲜度检查只需读取头部，不需要解析整个数据体
+"""
+import json
+import struct
+from typing import Any, Optional, Tuple
+
+from app.config import settings
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+MAGIC = b"GMC1"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sBBBxdI")
+
+CODEC_JSON = 0
+CODEC_ORJSON = 1
+CODEC_MSGPACK = 2
+CODECS = {"json": CODEC_JSON, "orjson": CODEC_ORJSON, "msgpack": CODEC_MSGPACK}
+
+COMPRESSION_NONE = 0
+COMPRESSION_ZSTD = 1
+COMPRESSIONS = {"none": COMPRESSION_NONE, "zstd": COMPRESSION_ZSTD}
+
+
+class CacheFormatError(ValueError):
+    """缓存数据格式无效（魔数/版本不匹配、数据不完整或编码不可用）"""
+
+
+def _available_codec(codec: int) -> int:
+    """配置的编码库未安装时回退为标准库 json"""
+    if codec == CODEC_ORJSON and orjson is None:
+        return CODEC_JSON
+    if codec == CODEC_MSGPACK and msgpack is None:
+        return CODEC_JSON
+    return codec
+
+
+def _encode_body(data: Any, codec: int) -> bytes:
+    if codec == CODEC_ORJSON:
+        return orjson.dumps(data)
+    if codec == CODEC_MSGPACK:
+        return msgpack.packb(data, use_bin_type=True)
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def _decode_body(body: bytes, codec: int) -> Any:
+    if codec == CODEC_ORJSON:
+        if orjson is None:
+            return json.loads(body.decode('utf-8'))
+        return orjson.loads(body)
+    if codec == CODEC_MSGPACK:
+        if msgpack is None:
+            raise CacheFormatError("缓存使用 msgpack 编码，但未安装 msgpack")
+        return msgpack.unpackb(body, raw=False)
+    if codec == CODEC_JSON:
+        return json.loads(body.decode('utf-8'))
+    raise CacheFormatError(f"未知的缓存编码: {codec}")
+
+
+class CacheSerializer:
+    """缓存序列化器"""
+
+    def __init__(self, codec: str = "orjson", compression: str = "none", level: int = 3):
+        """
+        Args:
+            codec: 编码方式（orjson / msgpack / json），未安装时回退为 json
+            compression: 压缩方式（none / zstd），未安装 zstandard 时不压缩
+            level: zstd 压缩级别
+        """
+        self.codec = _available_codec(CODECS.get(codec, CODEC_ORJSON))
+        self.compression = COMPRESSIONS.get(compression, COMPRESSION_NONE)
+        if self.compression == COMPRESSION_ZSTD and zstandard is None:
+            print("[CacheSerializer] 未安装 zstandard，缓存不压缩")
+            self.compression = COMPRESSION_NONE
+        self.level = level
+
+    def dumps(self, data: Any, timestamp: float) -> bytes:
+        """序列化为 头部 + 数据体"""
+        body = _encode_body(data, self.codec)
+        if self.compression == COMPRESSION_ZSTD:
+            body = zstandard.ZstdCompressor(level=self.level).compress(body)
+        return HEADER.pack(MAGIC, FORMAT_VERSION, self.codec, self.compression, timestamp, len(body)) + body
+
+    def loads(self, raw: bytes) -> Tuple[Any, float]:
+        """反序列化，返回 (数据, 写入时间戳)"""
+        codec, compression, timestamp, length = parse_header(raw[:HEADER.size])
+        body = raw[HEADER.size:HEADER.size + length]
+        if len(body) != length:
+            raise CacheFormatError("缓存数据不完整")
+        if compression == COMPRESSION_ZSTD:
+            if zstandard is None:
+                raise CacheFormatError("缓存使用 zstd 压缩，但未安装 zstandard")
+            body = zstandard.ZstdDecompressor().decompress(body)
+        elif compression != COMPRESSION_NONE:
+            raise CacheFormatError(f"未知的压缩方式: {compression}")
+        return _decode_body(body, codec), timestamp
+
+
+def parse_header(header: bytes) -> Tuple[int, int, float, int]:
+    """解析头部，返回 (编码, 压缩方式, 写入时间戳, 数据体长度)"""
+    if len(header) < HEADER.size:
+        raise CacheFormatError("缓存头部不完整")
+    magic, version, codec, compression, timestamp, length = HEADER.unpack(header[:HEADER.size])
+    if magic != MAGIC or version != FORMAT_VERSION:
+        raise CacheFormatError("缓存格式不匹配")
+    return codec, compression, timestamp, length
+
+
+def read_timestamp(path) -> Optional[float]:
+    """只读取文件头部获取写入时间戳（不解析数据体），文件不存在或格式无效时返回None"""
+    try:
+        with open(path, 'rb') as f:
+            return parse_header(f.read(HEADER.size))[2]
+    except (OSError, CacheFormatError):
+        return None
+
+
+_serializer: Optional[CacheSerializer] = None
+
+
+def get_serializer() -> CacheSerializer:
+    """获取全局序列化器（按配置懒加载）"""
+    global _serializer
+    if _serializer is None:
+        _serializer = CacheSerializer(settings.CACHE_SERIALIZER, settings.CACHE_COMPRESSION)
+    return _serializer
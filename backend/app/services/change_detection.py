@@ -0,0 +1,99 @@
+"""AI分析变更检测 - 输入没有实质变化时跳过定时刷新
+
+定时任务每两小时触发一次，夜间、周末等时段新闻和价格往往没有变化，重复调用LLM没有意义。
+每次定时刷新前采集一次输入快照（最新新闻ID、当前金价、采集时间），
+与各分析上次成功运行时记录的快照比较，按缓存键的标签（见 CACHE_POLICIES）判断是否需要重新计算：
+
+- news: 有新增新闻（新闻ID大于上次记录的最大ID）
+- prices: 金价变动超过 settings.ANALYSIS_PRICE_CHANGE_THRESHOLD（%）
+- factors: 本次运行中上游分析已重新计算
+
+缓存缺失、没有上次运行记录或距上次运行超过 settings.ANALYSIS_MAX_STALENESS 时总是重新计算。
+"""
+import time
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from app.config import settings
+from app.services.cache_manager import CacheManager
+
+# 上次运行快照的缓存键后缀
+INPUTS_SUFFIX = ".inputs"
+
+
+def take_snapshot(db) -> Dict[str, Any]:
+    """采集当前输入快照"""
+    from sqlalchemy import func
+    from app.models.news import GoldNews
+    from app.services.gold_service import GoldService
+
+    snapshot: Dict[str, Any] = {"news_id": 0, "price": None, "at": time.time()}
+    try:
+        snapshot["news_id"] = db.query(func.max(GoldNews.id)).scalar() or 0
+    except Exception as e:
+        print(f"[ChangeDetection] 查询最新新闻失败: {e}")
+    try:
+        price_info = GoldService(db).get_realtime_price_info()
+        if price_info:
+            snapshot["price"] = price_info["price"]
+    except Exception as e:
+        print(f"[ChangeDetection] 获取当前金价失败: {e}")
+    return snapshot
+
+
+def _inputs_store(key: str) -> CacheManager:
+    ttl = settings.CACHE_HARD_TTL
+    return CacheManager(key + INPUTS_SUFFIX, ttl=ttl, hard_ttl=ttl)
+
+
+def last_inputs(key: str) -> Optional[Dict[str, Any]]:
+    """上次成功运行时记录的输入快照"""
+    entry = _inputs_store(key).get_entry()
+    return entry.data if entry else None
+
+
+def record_inputs(key: str, snapshot: Dict[str, Any]) -> None:
+    """记录本次成功运行使用的输入快照（运行前采集，运行期间的新数据留给下次检测）"""
+    _inputs_store(key).set(snapshot)
+
+
+def check_inputs(key: str, snapshot: Dict[str, Any], refreshed_deps: Iterable[str] = ()) -> Tuple[bool, str]:
+    """
+    判断分析是否需要重新计算
+
+    Args:
+        key: 分析的缓存键
+        snapshot: 本次输入快照
+        refreshed_deps: 本次运行中已重新计算的上游分析
+
+    Returns:
+        (是否需要重新计算, 原因)
+    """
+    if not settings.ANALYSIS_CHANGE_DETECTION:
+        return True, "变更检测已关闭"
+
+    cache = CacheManager(key)
+    if cache.get_entry() is None:
+        return True, "无缓存"
+
+    last = last_inputs(key)
+    if not last:
+        return True, "无上次运行记录"
+
+    elapsed = snapshot["at"] - last.get("at", 0)
+    if elapsed >= settings.ANALYSIS_MAX_STALENESS:
+        return True, f"距上次运行 {elapsed / 3600:.1f} 小时，超过最长间隔"
+
+    if "news" in cache.tags and snapshot["news_id"] > last.get("news_id", 0):
+        return True, "有新增新闻"
+
+    last_price = last.get("price")
+    if "prices" in cache.tags and snapshot["price"] and last_price:
+        change = (snapshot["price"] - last_price) / last_price * 100
+        if abs(change) >= settings.ANALYSIS_PRICE_CHANGE_THRESHOLD:
+            return True, f"金价变动 {change:+.2f}%"
+
+    refreshed = list(refreshed_deps)
+    if "factors" in cache.tags and refreshed:
+        return True, f"上游分析已更新: {', '.join(refreshed)}"
+
+    return False, "输入无实质变化"
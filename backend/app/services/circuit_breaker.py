@@ -0,0 +1,209 @@
+"""行情数据源熔断器与健康评分
+
+每个数据源一个熔断器，基于滚动时间窗口内的错误率和延迟：
+- closed（关闭）：正常放行请求，错误率超过阈值时打开
+- open（打开）：直接拒绝请求，冷却时间结束后进入半开
+- half_open（半开）：只放行少量探测请求，成功则关闭，失败则重新打开
+
+健康评分综合错误率与平均延迟，用于对备选数据源自动排序。
+"""
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence, Tuple, TypeVar
+
+from app.config import settings
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+T = TypeVar("T")
+
+
+class CircuitBreaker:
+    """单个数据源的熔断器（线程安全）"""
+
+    def __init__(
+        self,
+        name: str,
+        window_seconds: float = 60,
+        min_requests: int = 5,
+        error_threshold: float = 0.5,
+        open_seconds: float = 30,
+        half_open_max_calls: int = 1
+    ):
+        """
+        Args:
+            name: 数据源名称
+            window_seconds: 滚动统计窗口（秒）
+            min_requests: 窗口内至少有多少次请求才计算错误率
+            error_threshold: 错误率阈值（0-1），超过则打开熔断
+            open_seconds: 熔断打开后的冷却时间（秒）
+            half_open_max_calls: 半开状态允许同时进行的探测请求数
+        """
+        self.name = name
+        self.window_seconds = window_seconds
+        self.min_requests = min_requests
+        self.error_threshold = error_threshold
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = half_open_max_calls
+
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.open_count = 0
+        self.rejected = 0
+        self._half_open_inflight = 0
+        self._events: Deque[Tuple[float, bool, float]] = deque()  # (时间戳, 是否成功, 延迟)
+        self._lock = threading.Lock()
+
+    def _trim(self, now: float) -> None:
+        cutoff = now - self.window_seconds
+        while self._events and self._events[0][0] < cutoff:
+            self._events.popleft()
+
+    def _window_stats(self, now: float) -> Tuple[int, float, float]:
+        """返回 (请求数, 错误率, 平均延迟)"""
+        self._trim(now)
+        total = len(self._events)
+        if not total:
+            return 0, 0.0, 0.0
+        failures = sum(1 for _, ok, _ in self._events if not ok)
+        avg_latency = sum(latency for _, _, latency in self._events) / total
+        return total, failures / total, avg_latency
+
+    def _open(self, now: float) -> None:
+        self.state = OPEN
+        self.opened_at = now
+        self.open_count += 1
+        self._half_open_inflight = 0
+        print(f"[CircuitBreaker] 数据源 {self.name} 熔断打开，{self.open_seconds}s 后尝试恢复")
+
+    def allow_request(self) -> bool:
+        """是否允许发起请求（半开状态下会占用一个探测名额）"""
+        with self._lock:
+            now = time.time()
+            if self.state == OPEN:
+                if now - self.opened_at < self.open_seconds:
+                    self.rejected += 1
+                    return False
+                self.state = HALF_OPEN
+                self._half_open_inflight = 0
+
+            if self.state == HALF_OPEN:
+                if self._half_open_inflight >= self.half_open_max_calls:
+                    self.rejected += 1
+                    return False
+                self._half_open_inflight += 1
+            return True
+
+    def record_success(self, latency: float) -> None:
+        """记录一次成功请求"""
+        with self._lock:
+            now = time.time()
+            if self.state == HALF_OPEN:
+                # 探测成功，关闭熔断并重新统计
+                self.state = CLOSED
+                self._half_open_inflight = 0
+                self._events.clear()
+                print(f"[CircuitBreaker] 数据源 {self.name} 已恢复")
+            self._events.append((now, True, latency))
+            self._trim(now)
+
+    def record_failure(self, latency: float) -> None:
+        """记录一次失败请求"""
+        with self._lock:
+            now = time.time()
+            self._events.append((now, False, latency))
+            if self.state == HALF_OPEN:
+                self._open(now)
+                return
+            if self.state == CLOSED:
+                total, error_rate, _ = self._window_stats(now)
+                if total >= self.min_requests and error_rate >= self.error_threshold:
+                    self._open(now)
+
+    def release(self) -> None:
+        """请求被取消（未得到结果），归还半开探测名额"""
+        with self._lock:
+            if self.state == HALF_OPEN and self._half_open_inflight > 0:
+                self._half_open_inflight -= 1
+
+    def health_score(self) -> float:
+        """健康评分（0-1）：熔断打开为0，半开为0.1，关闭时综合成功率与平均延迟"""
+        with self._lock:
+            now = time.time()
+            if self.state == OPEN and now - self.opened_at < self.open_seconds:
+                return 0.0
+            if self.state != CLOSED:
+                return 0.1
+            total, error_rate, avg_latency = self._window_stats(now)
+            if not total:
+                return 1.0
+            # 平均延迟1秒时评分减半
+            return (1 - error_rate) / (1 + avg_latency)
+
+    def call(self, fn: Callable[..., Optional[T]], *args, **kwargs) -> Optional[T]:
+        """通过熔断器调用数据源（返回空结果或抛出异常均视为失败；熔断时直接返回None）"""
+        if not self.allow_request():
+            return None
+        start = time.perf_counter()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            self.record_failure(time.perf_counter() - start)
+            raise
+        if result:
+            self.record_success(time.perf_counter() - start)
+        else:
+            self.record_failure(time.perf_counter() - start)
+        return result
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            total, error_rate, avg_latency = self._window_stats(time.time())
+            state = self.state
+        return {
+            "state": state,
+            "health_score": round(self.health_score(), 3),
+            "window_requests": total,
+            "error_rate": round(error_rate, 3),
+            "avg_latency_ms": round(avg_latency * 1000, 1),
+            "open_count": self.open_count,
+            "rejected": self.rejected,
+        }
+
+
+# 全局熔断器注册表
+_breakers: Dict[str, CircuitBreaker] = {}
+_registry_lock = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """获取数据源熔断器（不存在则按配置创建）"""
+    breaker = _breakers.get(name)
+    if breaker is None:
+        with _registry_lock:
+            breaker = _breakers.get(name)
+            if breaker is None:
+                breaker = CircuitBreaker(
+                    name,
+                    window_seconds=settings.CIRCUIT_WINDOW_SECONDS,
+                    min_requests=settings.CIRCUIT_MIN_REQUESTS,
+                    error_threshold=settings.CIRCUIT_ERROR_THRESHOLD,
+                    open_seconds=settings.CIRCUIT_OPEN_SECONDS
+                )
+                _breakers[name] = breaker
+    return breaker
+
+
+def order_by_health(sources: Sequence[Tuple[str, Any]]) -> List[Tuple[str, Any]]:
+    """按健康评分对 (数据源名称, ...) 列表降序排序（评分相同时保持原优先级）"""
+    return sorted(sources, key=lambda source: -get_breaker(source[0]).health_score())
+
+
+def get_breaker_states() -> Dict[str, Dict[str, Any]]:
+    """获取所有熔断器状态"""
+    with _registry_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.to_dict() for breaker in breakers}
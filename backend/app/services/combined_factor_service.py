@@ -0,0 +1,230 @@
+"""多空因子合并分析服务 - 一次联网搜索同时分析看涨和看跌因子
+
+看涨、看跌因子分析使用相同的新闻窗口，分别搜索时每个周期需要两次联网搜索。
+启用 settings.AI_COMBINED_FACTORS 后，两个因子服务的刷新都改为调用 refresh_combined_factors：
+一次搜索返回两侧因子，拆分后分别写入原有的 bullish_factors / bearish_factors 缓存和 MarketFactor 表，
+接口和返回格式不变。某一侧搜索结果为空时，该侧使用原分析器的传统LLM分析作为备用方案。
+"""
+import json
+from datetime import datetime
+from typing import Any, Dict
+
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.services.bearish_factor_service import BearishFactorAnalyzer
+from app.services.bullish_factor_service import BullishFactorAnalyzer
+from app.services.cache_manager import CacheManager, FALLBACK_FLAG
+from app.services.llm_cache import llm_cache
+
+# 合并结果的缓存键（用于单飞和跨进程复用，两侧结果另外写入各自的缓存）
+COMBINED_CACHE_KEY = "combined_factors"
+
+SIDE_NAMES = {"bullish": "看涨", "bearish": "看跌"}
+SIDES = tuple(SIDE_NAMES)
+
+
+def split_result(search_result: Dict[str, Any], side: str) -> Dict[str, Any]:
+    """从合并搜索结果中拆分出一侧的结果（格式与单独分析的结果相同）"""
+    return {
+        f"{side}_factors": search_result[f"{side}_factors"],
+        "analysis_summary": search_result.get(f"{side}_summary") or search_result.get("analysis_summary", ""),
+        "last_updated": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "data_source": "智谱AI实时搜索（多空合并）",
+    }
+
+
+class CombinedFactorAnalyzer:
+    """使用一次智谱AI实时搜索同时分析看涨和看跌因子"""
+
+    SEARCH_PROMPT_VERSION = "1"  # 提示词模板版本（见 llm_cache）
+
+    def __init__(self):
+        self.analyzers = {
+            "bullish": BullishFactorAnalyzer(),
+            "bearish": BearishFactorAnalyzer(),
+        }
+        # 智谱AI联网搜索提示词（流式刷新共用）
+        self.search_prompt = """请搜索并分析当前黄金市场的看涨因素和看跌因素。
+
+请搜索最新的黄金市场新闻和分析报告，分别识别出5个最重要的看涨因子和5个最重要的看跌因子。
+
+看涨因子：
+1. 美联储政策相关（降息预期、货币政策等）
+2. 全球央行购金动态（各国央行增持黄金情况）
+3. 美元信用/美债问题（美元走势、债务规模等）
+4. 地缘政治风险（地区冲突、贸易摩擦等）
+5. 供需基本面（矿产供应、投资需求等）
+
+看跌因子：
+1. 美联储政策相关（升息预期、推迟降息等）
+2. 技术性回调/获利了结压力
+3. 地缘政治风险缓和
+4. 美元走强因素
+5. 全球经济改善/避险需求减弱
+
+请严格按照以下JSON格式返回：
+
+{
+    "bullish_factors": [
+        {
+            "id": "fed-policy",
+            "title": "美联储降息周期预期强化",
+            "subtitle": "市场押注宽松周期开启，实际利率下行",
+            "description": "详细描述该因素如何支撑金价上涨，基于最新新闻...",
+            "details": ["具体要点1", "具体要点2", "具体要点3", "具体要点4"],
+            "impact": "high"
+        }
+    ],
+    "bearish_factors": [
+        {
+            "id": "rate-hike",
+            "title": "美联储升息预期",
+            "subtitle": "降息时点可能推迟",
+            "description": "详细描述该因素如何压制金价，基于最新新闻...",
+            "details": ["具体要点1", "具体要点2", "具体要点3", "具体要点4"],
+            "impact": "medium"
+        }
+    ],
+    "bullish_summary": "看涨因素的综合分析总结...",
+    "bearish_summary": "看跌因素的综合分析总结...",
+    "search_time": "2026-02-01"
+}
+
+注意事项：
+1. 必须返回有效的JSON格式
+2. 看涨因子的id必须是：fed-policy, central-bank, dollar-credit, geopolitical, supply-demand
+3. 看跌因子的id必须是：rate-hike, profit-taking, geopolitical-ease, dollar-strength, economic-growth
+4. impact只能是：high, medium, low
+5. description和details必须基于搜索到的最新新闻内容
+6. 确保看涨、看跌各5个因子都有数据
+"""
+
+    def analyze(self, db: Session, use_llm_cache: bool = True) -> Dict[str, Dict[str, Any]]:
+        """执行分析，返回 {"bullish": 看涨因子结果, "bearish": 看跌因子结果}"""
+        search_result: Dict[str, Any] = {}
+        try:
+            print("[CombinedFactor] 使用智谱AI实时搜索多空因素...")
+            search_result = llm_cache.get_or_call(
+                "combined_factors.search",
+                model=settings.ZHIPU_MODEL,
+                temperature=0.3,
+                prompt_version=self.SEARCH_PROMPT_VERSION,
+                inputs=self.analyzers["bullish"]._search_inputs(db),
+                call=self._search_combined_factors,
+                is_valid=lambda result: all(result.get(f"{side}_factors") for side in SIDES),
+                reuse=use_llm_cache
+            )
+        except Exception as e:
+            print(f"[CombinedFactor] 智谱AI搜索失败: {e}")
+
+        results = {}
+        for side, analyzer in self.analyzers.items():
+            factors = search_result.get(f"{side}_factors")
+            if factors:
+                print(f"[CombinedFactor] 成功获取 {len(factors)} 个{SIDE_NAMES[side]}因素")
+                results[side] = split_result(search_result, side)
+            else:
+                # 备用方案：该侧使用传统方式分析
+                print(f"[CombinedFactor] {SIDE_NAMES[side]}因素搜索结果为空，使用备用方案")
+                results[side] = analyzer._analyze_with_traditional_llm(db, use_llm_cache)
+        return results
+
+    def _search_combined_factors(self) -> Dict[str, Any]:
+        """使用智谱AI搜索多空因素"""
+        try:
+            from openai import OpenAI
+
+            client = OpenAI(
+                api_key=settings.ZHIPU_API_KEY,
+                base_url=settings.ZHIPU_BASE_URL
+            )
+
+            response = client.chat.completions.create(
+                model=settings.ZHIPU_MODEL,
+                messages=[{
+                    "role": "user",
+                    "content": self.search_prompt
+                }],
+                tools=[{
+                    "type": "web_search",
+                    "web_search": {
+                        "enable": True,
+                        "search_result": True
+                    }
+                }],
+                temperature=0.3,
+                max_tokens=8192
+            )
+
+            return self._parse_json(response.choices[0].message.content)
+
+        except Exception as e:
+            print(f"[CombinedFactor] 搜索多空因素失败: {e}")
+            return {
+                "bullish_factors": [],
+                "bearish_factors": [],
+                "analysis_summary": f"搜索失败: {str(e)}"
+            }
+
+    def _parse_json(self, content: str) -> Dict[str, Any]:
+        """解析模型返回的JSON（兼容markdown代码块和前后附加文本）"""
+        try:
+            if "```json" in content:
+                content = content.split("```json")[1].split("```")[0]
+            elif "```" in content:
+                content = content.split("```")[1].split("```")[0]
+            return json.loads(content.strip())
+        except (json.JSONDecodeError, IndexError):
+            start = content.find('{')
+            end = content.rfind('}') + 1
+            if start != -1 and end > start:
+                try:
+                    return json.loads(content[start:end])
+                except json.JSONDecodeError:
+                    pass
+            return {
+                "bullish_factors": [],
+                "bearish_factors": [],
+                "analysis_summary": "解析失败",
+                "raw_content": content
+            }
+
+    def save_to_database(self, db: Session, results: Dict[str, Dict[str, Any]]) -> None:
+        """两侧结果分别保存到 MarketFactor 表（降级为默认数据的一侧不保存）"""
+        for side, analyzer in self.analyzers.items():
+            if not results[side].get(FALLBACK_FLAG):
+                analyzer.save_to_database(db, results[side])
+
+
+def _refresh(use_llm_cache: bool = True) -> Dict[str, Dict[str, Any]]:
+    """执行合并分析并写入两侧缓存"""
+    from app.database import SessionLocal
+    analyzer = CombinedFactorAnalyzer()
+    db = SessionLocal()
+    try:
+        results = analyzer.analyze(db, use_llm_cache)
+        analyzer.save_to_database(db, results)
+    finally:
+        db.close()
+    for side in SIDES:
+        CacheManager(f"{side}_factors").set(results[side])  # 降级结果只记录失败，不覆盖缓存
+    if not any(results[side].get(FALLBACK_FLAG) for side in SIDES):
+        CacheManager(COMBINED_CACHE_KEY).set(results)
+    print(f"[CombinedFactor] 多空因子合并分析完成，时间: {datetime.now()}")
+    return results
+
+
+def refresh_combined_factors(use_llm_cache: bool = True) -> Dict[str, Dict[str, Any]]:
+    """
+    刷新看涨和看跌因子（阻塞）
+
+    单飞执行：看涨、看跌服务同时触发刷新时共享同一次搜索。
+
+    Args:
+        use_llm_cache: 输入未变化时是否复用上次的LLM结果（用户强制刷新时为False）
+
+    Returns:
+        {"bullish": 看涨因子结果, "bearish": 看跌因子结果}
+    """
+    return CacheManager(COMBINED_CACHE_KEY).single_flight(lambda: _refresh(use_llm_cache)).result() or {}
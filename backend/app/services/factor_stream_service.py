@@ -0,0 +1,286 @@
+"""因子分析流式刷新 - 边生成边推送，完整结果校验通过后才写入缓存
+
+强制刷新需要等待完整的联网搜索（数十秒）才有返回。流式刷新以 stream=True 调用模型，
+逐段推送生成的文本，并在 <side>_factors 数组中每个因子生成完整时立即推送该因子，
+用户在一秒左右即可看到内容。
+
+事件（由路由转换为 Server-Sent Events）：
+- start: 开始分析
+- token: 模型生成的文本片段 {"text": ...}
+- factor: 已生成完整的因子
+- done: 完整结果（已校验并写入缓存，格式与 /bullish-factors-ai 相同）
+- error: 失败原因（缓存保持不变）
+
+默认总是重新搜索；reuse=True 时输入与上次相同则直接回放LLM缓存中的结果（见 llm_cache）。
+启用 settings.AI_COMBINED_FACTORS 时使用多空合并搜索，校验通过的两侧结果都会写入。
+最终的数据库和缓存写入在该缓存键的单飞锁内执行，不与同时进行的后台刷新交错。
+"""
+import json
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from app.config import settings
+from app.services.llm_cache import llm_cache
+
+SEARCH_TEMPERATURE = 0.3
+VALID_IMPACTS = ("high", "medium", "low")
+
+
+class FactorArrayParser:
+    """增量解析流式输出中指定数组的元素，每个元素（JSON对象）生成完整时返回"""
+
+    def __init__(self, array_key: str):
+        self.marker = f'"{array_key}"'
+        self.buffer = ""
+        self.pos = -1          # 数组内的扫描位置，-1 表示尚未找到数组
+        self.finished = False
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.item_start = 0
+
+    def _find_array(self) -> None:
+        marker_at = self.buffer.find(self.marker)
+        if marker_at == -1:
+            return
+        bracket_at = self.buffer.find("[", marker_at + len(self.marker))
+        if bracket_at != -1:
+            self.pos = bracket_at + 1
+
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        """追加文本，返回新生成完整的元素"""
+        self.buffer += text
+        if self.finished:
+            return []
+        if self.pos == -1:
+            self._find_array()
+            if self.pos == -1:
+                return []
+
+        items = []
+        buffer = self.buffer
+        while self.pos < len(buffer):
+            char = buffer[self.pos]
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif char == "\\":
+                    self.escape = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char in "{[":
+                if self.depth == 0:
+                    self.item_start = self.pos
+                self.depth += 1
+            elif char in "}]":
+                if self.depth == 0:  # 数组结束
+                    self.finished = True
+                    self.pos += 1
+                    break
+                self.depth -= 1
+                if self.depth == 0:
+                    try:
+                        item = json.loads(buffer[self.item_start:self.pos + 1])
+                        if isinstance(item, dict):
+                            items.append(item)
+                    except json.JSONDecodeError:
+                        pass
+            self.pos += 1
+        return items
+
+
+def parse_json_content(content: str) -> Optional[Dict[str, Any]]:
+    """解析模型返回的完整JSON（兼容markdown代码块和前后附加文本），失败时返回None"""
+    start = content.find("{")
+    end = content.rfind("}") + 1
+    if start == -1 or end <= start:
+        return None
+    try:
+        result = json.loads(content[start:end])
+    except json.JSONDecodeError:
+        return None
+    return result if isinstance(result, dict) else None
+
+
+def validate_factors(result: Optional[Dict[str, Any]], array_key: str) -> Optional[str]:
+    """校验完整结果，通过时返回None，否则返回错误原因"""
+    if result is None:
+        return "AI返回结果解析失败"
+    factors = result.get(array_key)
+    if not isinstance(factors, list) or not factors:
+        return "AI返回结果中没有因子数据"
+    for factor in factors:
+        if not isinstance(factor, dict) or not factor.get("id") or not factor.get("title"):
+            return "因子缺少 id 或 title"
+        if factor.get("impact", "medium") not in VALID_IMPACTS:
+            return f"因子 {factor['id']} 的 impact 无效: {factor.get('impact')}"
+    return None
+
+
+def _stream_completion(prompt: str, max_tokens: int = 4096) -> Iterator[str]:
+    """以流式方式调用智谱AI联网搜索，逐段返回生成的文本"""
+    from openai import OpenAI
+
+    client = OpenAI(
+        api_key=settings.ZHIPU_API_KEY,
+        base_url=settings.ZHIPU_BASE_URL
+    )
+    stream = client.chat.completions.create(
+        model=settings.ZHIPU_MODEL,
+        messages=[{
+            "role": "user",
+            "content": prompt
+        }],
+        tools=[{
+            "type": "web_search",
+            "web_search": {
+                "enable": True,
+                "search_result": True
+            }
+        }],
+        temperature=SEARCH_TEMPERATURE,
+        max_tokens=max_tokens,
+        stream=True
+    )
+    for chunk in stream:
+        if not chunk.choices:
+            continue
+        text = chunk.choices[0].delta.content
+        if text:
+            yield text
+
+
+def _get_service(side: str, db):
+    if side == "bullish":
+        from app.services.bullish_factor_service import BullishFactorService
+        return BullishFactorService(db)
+    if side == "bearish":
+        from app.services.bearish_factor_service import BearishFactorService
+        return BearishFactorService(db)
+    raise ValueError(f"不支持的因子类型: {side}")
+
+
+def _commit(cache, write) -> bool:
+    """
+    在缓存键的单飞锁内写入结果
+
+    该键已有刷新进行中时先等待其完成，再写入本次结果（更新）；返回是否已写入。
+    """
+    committed = []
+
+    def run():
+        write()
+        committed.append(True)
+        return True
+
+    for _ in range(2):
+        cache.single_flight(run).result()
+        if committed:
+            return True
+    return False
+
+
+def stream_factor_refresh(side: str, reuse: bool = False) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    流式刷新因子分析（同步生成器，由路由放入线程池执行）
+
+    Args:
+        side: bullish / bearish
+        reuse: 输入未变化时是否回放上次的LLM结果（默认总是重新搜索）
+
+    Yields:
+        (事件名, 事件数据)
+    """
+    from app.database import SessionLocal
+    from app.services.cache_manager import CacheManager
+    from app.services.combined_factor_service import (
+        COMBINED_CACHE_KEY, SIDES, CombinedFactorAnalyzer, split_result
+    )
+
+    array_key = f"{side}_factors"
+    db = SessionLocal()
+    try:
+        service = _get_service(side, db)
+        combined = settings.AI_COMBINED_FACTORS
+        if combined:
+            analyzer = CombinedFactorAnalyzer()
+            llm_name = "combined_factors.search"
+            inputs = analyzer.analyzers["bullish"]._search_inputs(db)
+        else:
+            analyzer = service.analyzer
+            llm_name = f"{array_key}.search"
+            inputs = analyzer._search_inputs(db)
+        yield "start", {"key": array_key, "started_at": datetime.now().isoformat()}
+
+        llm_key = llm_cache.make_key(
+            llm_name,
+            settings.ZHIPU_MODEL,
+            SEARCH_TEMPERATURE,
+            analyzer.SEARCH_PROMPT_VERSION,
+            inputs
+        )
+        result = llm_cache.get(llm_key) if reuse and settings.LLM_CACHE_ENABLED else None
+        if result is not None:
+            cache_source = "llm_cache"
+            for factor in result.get(array_key, []):
+                yield "factor", factor
+        else:
+            cache_source = "realtime_search"
+            parser = FactorArrayParser(array_key)
+            chunks = []
+            for text in _stream_completion(analyzer.search_prompt, 8192 if combined else 4096):
+                chunks.append(text)
+                yield "token", {"text": text}
+                for factor in parser.feed(text):
+                    yield "factor", factor
+
+            result = parse_json_content("".join(chunks))
+            error = validate_factors(result, array_key)
+            if error:
+                print(f"[FactorStream] {array_key} 流式结果校验失败: {error}")
+                yield "error", {"error": error}
+                return
+            if not combined or all(validate_factors(result, f"{s}_factors") is None for s in SIDES):
+                llm_cache.set(llm_key, result)
+
+        # 校验通过后才写入数据库和缓存
+        if combined:
+            # 另一侧校验未通过时只写入请求的一侧
+            side_results = {
+                s: split_result(result, s) for s in SIDES
+                if validate_factors(result, f"{s}_factors") is None
+            }
+
+            def write():
+                for s, side_result in side_results.items():
+                    analyzer.analyzers[s].save_to_database(db, side_result)
+                    CacheManager(f"{s}_factors").set(side_result)
+                if len(side_results) == len(SIDES):
+                    CacheManager(COMBINED_CACHE_KEY).set(side_results)
+
+            _commit(CacheManager(COMBINED_CACHE_KEY), write)
+            result = dict(side_results[side])
+        else:
+            result["last_updated"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            result["data_source"] = "智谱AI实时搜索"
+
+            def write():
+                analyzer.save_to_database(db, result)
+                service.cache.set(result)
+
+            _commit(service.cache, write)
+        result["metadata"] = {
+            "cached": False,
+            "cache_source": cache_source,
+            "generated_at": datetime.now().isoformat(),
+            "message": "基于智谱AI实时搜索的最新数据"
+        }
+        print(f"[FactorStream] {array_key} 流式刷新完成")
+        yield "done", result
+    except Exception as e:
+        print(f"[FactorStream] {array_key} 流式刷新失败: {e}")
+        yield "error", {"error": f"{type(e).__name__}: {e}"}
+    finally:
+        db.close()
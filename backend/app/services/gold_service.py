@@ -1,63 +1,18 @@
 """黄金价格服务 - 优化版（添加缓存和异步处理）"""
-import re
 import requests
-import threading
-import json
 from datetime import datetime, date
 from typing import List, Dict, Optional, Tuple
-from pathlib import Path
 from sqlalchemy.orm import Session
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
 from app.models.gold_price import GoldPrice, DollarIndex
+from app.services.cache_events import DOLLAR, PRICES, fire_event
+from app.services.cache_manager import CacheManager
+from app.services.circuit_breaker import get_breaker
+from app.services.http_pool import provider_get
+from app.services.quote_parser import parse_quotes
+from app.services.quote_poller import get_snapshot_dollar, get_snapshot_gold
 
-# 缓存目录
-CACHE_DIR = Path(__file__).parent.parent.parent / "cache"
-CACHE_DIR.mkdir(exist_ok=True)
-
-# 内存缓存（进程内）
-_price_cache = {}
-_cache_lock = threading.Lock()
-_cache_ttl = 300  # 5分钟缓存
-
-# 创建带重试机制的HTTP Session（提升API稳定性）
-def create_retry_session(
-    retries=3,
-    backoff_factor=0.5,
-    status_forcelist=(429, 500, 502, 503, 504),
-    pool_connections=10,
-    pool_maxsize=10
-):
-    """创建带重试机制的requests session"""
-    session = requests.Session()
-    retry_strategy = Retry(
-        total=retries,
-        backoff_factor=backoff_factor,
-        status_forcelist=status_forcelist,
-        allowed_methods=["GET", "POST"]  # 允许重试的方法
-    )
-    adapter = HTTPAdapter(
-        max_retries=retry_strategy,
-        pool_connections=pool_connections,
-        pool_maxsize=pool_maxsize
-    )
-    session.mount("http://", adapter)
-    session.mount("https://", adapter)
-    return session
-
-# 全局session实例（线程安全）
-_http_session = None
-_session_lock = threading.Lock()
-
-def get_http_session():
-    """获取带重试的HTTP session（懒加载）"""
-    global _http_session
-    if _http_session is None:
-        with _session_lock:
-            if _http_session is None:
-                _http_session = create_retry_session()
-    return _http_session
-
+# 实时价格缓存（5分钟，只保存在一级缓存，过期策略见 CACHE_POLICIES）
+_price_cache = CacheManager("realtime_price")
 
 class GoldService:
     """黄金价格服务 - 优化版"""
@@ -66,83 +21,42 @@ class GoldService:
         self.db = db
     
     def _get_cached_price(self) -> Optional[Dict]:
-        """从缓存获取价格（先查内存，再查文件）"""
-        # 1. 检查内存缓存
-        with _cache_lock:
-            if 'realtime_price' in _price_cache:
-                cached_data, timestamp = _price_cache['realtime_price']
-                if datetime.now().timestamp() - timestamp < _cache_ttl:
-                    return cached_data
-        
-        # 2. 检查文件缓存
-        try:
-            cache_file = CACHE_DIR / "realtime_price.json"
-            if cache_file.exists():
-                with open(cache_file, 'r', encoding='utf-8') as f:
-                    cached = json.load(f)
-                    timestamp = cached.get('_timestamp', 0)
-                    if datetime.now().timestamp() - timestamp < _cache_ttl:
-                        data = cached.get('data')
-                        # 更新内存缓存
-                        with _cache_lock:
-                            _price_cache['realtime_price'] = (data, timestamp)
-                        return data
-        except Exception as e:
-            print(f"[GoldService] 读取文件缓存失败: {e}")
-        
-        return None
+        """从缓存获取价格"""
+        return _price_cache.get()
     
     def _set_cached_price(self, data: Dict) -> None:
-        """设置价格缓存（同时更新内存和文件）"""
-        timestamp = datetime.now().timestamp()
-        
-        # 1. 更新内存缓存
-        with _cache_lock:
-            _price_cache['realtime_price'] = (data, timestamp)
-        
-        # 2. 更新文件缓存
-        try:
-            cache_file = CACHE_DIR / "realtime_price.json"
-            cache_data = {
-                'data': data,
-                '_timestamp': timestamp,
-                '_created_at': datetime.now().isoformat()
-            }
-            with open(cache_file, 'w', encoding='utf-8') as f:
-                json.dump(cache_data, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            print(f"[GoldService] 写入文件缓存失败: {e}")
+        """设置价格缓存"""
+        _price_cache.set(data)
     
     def get_realtime_price_from_tencent(self) -> Optional[Dict]:
-        """从腾讯财经获取实时金价 - 实时获取，不缓存（带重试机制）"""
+        """从腾讯财经获取实时金价（经过熔断器，数据源熔断时直接返回None）"""
+        return get_breaker("tencent").call(self._fetch_tencent_gold)
+
+    def _fetch_tencent_gold(self) -> Optional[Dict]:
+        """从腾讯财经获取实时金价 - 实时获取，不缓存（共享连接池）"""
         # 实时获取最新价格，不使用缓存
         try:
             url = "https://qt.gtimg.cn/q=hf_GC"
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            }
-            # 使用带重试的session，设置较短的超时时间
-            session = get_http_session()
-            response = session.get(url, headers=headers, timeout=3)
+            # 使用共享长连接池，设置较短的超时时间
+            response = provider_get("tencent", url, timeout=3)
             
             if response.status_code == 200:
-                # 解析数据
-                match = re.search(r'v_hf_GC="([^"]+)"', response.text)
-                if match:
-                    data = match.group(1).split(',')
-                    latest = float(data[0])
-                    prev_close = float(data[7])
+                # 直接从字节解析
+                quote = parse_quotes(response.content, "tencent").get("hf_GC")
+                if quote and quote["price"] and quote["prev_close"]:
+                    latest = quote["price"]
+                    prev_close = quote["prev_close"]
                     change_pct = (latest - prev_close) / prev_close * 100
                     
                     result = {
                         "price": latest,
                         "previous_close": prev_close,
                         "change_percent": round(change_pct, 2),
-                        "open": float(data[2]),
-                        "high": float(data[3]),
-                        "low": float(data[4]),
+                        "open": quote["open"],
+                        "high": quote["high"],
+                        "low": quote["low"],
                         "updated_at": datetime.now().isoformat(),
-                        "date": data[12],
+                        "date": quote["date"],
                         "source": "腾讯财经-纽约黄金"
                     }
                     # 不缓存，直接返回实时数据
@@ -155,44 +69,34 @@ class GoldService:
         return None
     
     def get_realtime_dollar_index(self) -> Optional[Dict]:
-        """从新浪财经获取实时美元指数(DXY/DINIW) - 带超时和重试机制"""
+        """从新浪财经获取实时美元指数(DXY/DINIW)（经过熔断器，数据源熔断时直接返回None）"""
+        return get_breaker("sina").call(self._fetch_sina_dollar)
+
+    def _fetch_sina_dollar(self) -> Optional[Dict]:
+        """从新浪财经获取实时美元指数(DXY/DINIW) - 带超时（共享连接池）"""
         try:
             # 使用新浪财经的DINIW接口（ICE美元指数）
             url = "https://hq.sinajs.cn/list=DINIW"
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-                'Referer': 'https://finance.sina.com.cn',
-                'Cache-Control': 'no-cache, no-store, must-revalidate',
-                'Pragma': 'no-cache',
-                'Expires': '0'
-            }
-            # 每次都创建新的session，避免连接复用导致的缓存问题
-            session = requests.Session()
-            response = session.get(url, headers=headers, timeout=3)
-            session.close()  # 立即关闭session
+            # 复用共享长连接池，防缓存由请求头（Cache-Control/Pragma）保证
+            response = provider_get("sina", url, timeout=3)
 
             if response.status_code == 200:
                 # 解析新浪返回的数据格式: var hq_str_DINIW="时间,最新价,..."
-                text = response.text
-                match = re.search(r'var hq_str_DINIW="([^"]*)"', text)
-                if match and match.group(1):
-                    values = match.group(1).split(',')
-                    if len(values) >= 10:
-                        # 解析字段
-                        # 0:时间, 1:最新价, 2:买价, 3:卖价, 4:成交量, 5:开盘价, 6:最高价, 7:最低价, 8:昨收, 9:名称
-                        latest = float(values[1])  # 最新价
-                        prev_close = float(values[8])  # 昨收
-                        change_pct = round((latest - prev_close) / prev_close * 100, 2)  # 涨跌幅
+                quote = parse_quotes(response.content, "sina").get("DINIW")
+                if quote and quote["price"] and quote["prev_close"]:
+                    latest = quote["price"]  # 最新价
+                    prev_close = quote["prev_close"]  # 昨收
+                    change_pct = round((latest - prev_close) / prev_close * 100, 2)  # 涨跌幅
 
-                        result = {
-                            "price": round(latest, 2),
-                            "previous_close": round(prev_close, 2),
-                            "change_percent": change_pct,
-                            "updated_at": datetime.now().isoformat(),
-                            "source": "新浪财经-ICE美元指数(DXY)"
-                        }
-                        print(f"[GoldService] 获取实时美元指数成功: {result}")
-                        return result
+                    result = {
+                        "price": round(latest, 2),
+                        "previous_close": round(prev_close, 2),
+                        "change_percent": change_pct,
+                        "updated_at": datetime.now().isoformat(),
+                        "source": "新浪财经-ICE美元指数(DXY)"
+                    }
+                    print(f"[GoldService] 获取实时美元指数成功: {result}")
+                    return result
         except requests.exceptions.Timeout:
             print("[GoldService] 美元指数API超时")
         except Exception as e:
@@ -285,9 +189,21 @@ class GoldService:
             GoldPrice.date.desc()
         ).first()
     
+    def get_dollar_index_info(self) -> Optional[Dict]:
+        """获取当前美元指数（优先读取后台轮询快照，快照过期时直接请求）"""
+        snapshot = get_snapshot_dollar()
+        if snapshot:
+            return snapshot
+        return self.get_realtime_dollar_index()
+
     def get_realtime_price_info(self) -> Optional[Dict]:
-        """获取当前金价信息（优先使用腾讯财经实时数据，带缓存）"""
-        # 首先尝试获取腾讯财经实时数据（带缓存）
+        """获取当前金价信息（优先读取后台轮询快照，其次腾讯财经实时数据）"""
+        # 1. 后台轮询快照（O(1)，不访问上游）
+        snapshot = get_snapshot_gold()
+        if snapshot:
+            return snapshot
+
+        # 2. 快照不可用时直接请求腾讯财经
         tencent_data = self.get_realtime_price_from_tencent()
         if tencent_data:
             return tencent_data
@@ -456,6 +372,7 @@ class GoldService:
                 self.db.add(price)
             
             self.db.commit()
+            fire_event(PRICES)
             print(f"[GoldService] 成功保存历史价格数据")
         except Exception as e:
             print(f"[GoldService] 获取历史价格失败: {e}")
@@ -484,6 +401,7 @@ class GoldService:
                 self.db.add(dollar)
             
             self.db.commit()
+            fire_event(DOLLAR)
         except Exception as e:
             print(f"[GoldService] 获取美元指数失败: {e}")
     
@@ -522,6 +440,7 @@ class GoldService:
                 self.db.add(price)
             
             self.db.commit()
+            fire_event(PRICES)
             print(f"[GoldService] 实时金价已保存: ${realtime_data['price']}")
             
         except Exception as e:
@@ -0,0 +1,156 @@
+"""对冲请求行情获取器 - 多数据源竞速
+
+主数据源超过对冲延迟仍未返回时并发启动备用数据源，取最先返回的有效报价，
+避免单个慢数据源拖慢整体响应（p99延迟受最快的健康数据源约束）。
+同时记录每个数据源的延迟分布和胜出率，便于观察数据源健康状况。
+每次获取前按熔断器健康评分重新排序数据源，并跳过熔断打开的数据源。
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+import httpx
+
+from app.services.circuit_breaker import get_breaker, order_by_health
+
+# 数据源获取函数：接收共享的异步HTTP客户端，返回报价字典或None
+SourceFetcher = Callable[[httpx.AsyncClient], Awaitable[Optional[Dict]]]
+
+
+class SourceStats:
+    """单个数据源的统计信息（滚动窗口）"""
+
+    def __init__(self, window: int = 200):
+        self.latencies: Deque[float] = deque(maxlen=window)
+        self.attempts = 0
+        self.successes = 0
+        self.failures = 0
+        self.wins = 0
+        self.cancelled = 0
+
+    def _percentile(self, samples: List[float], pct: float) -> float:
+        if not samples:
+            return 0.0
+        index = min(len(samples) - 1, int(round(pct / 100 * (len(samples) - 1))))
+        return samples[index]
+
+    def to_dict(self) -> Dict:
+        samples = sorted(self.latencies)
+        return {
+            "attempts": self.attempts,
+            "successes": self.successes,
+            "failures": self.failures,
+            "cancelled": self.cancelled,
+            "wins": self.wins,
+            "win_rate": round(self.wins / self.attempts, 3) if self.attempts else 0.0,
+            "avg_ms": round(sum(samples) / len(samples) * 1000, 1) if samples else 0.0,
+            "p50_ms": round(self._percentile(samples, 50) * 1000, 1),
+            "p99_ms": round(self._percentile(samples, 99) * 1000, 1),
+        }
+
+
+class HedgedQuoteFetcher:
+    """对冲请求获取器
+
+    按健康评分顺序启动数据源：第一个数据源立即发出，之后每经过 hedge_delay 秒仍无有效结果
+    （或在途请求全部失败）时启动下一个数据源，返回最先得到的有效报价。
+    """
+
+    def __init__(
+        self,
+        sources: List[Tuple[str, SourceFetcher]],
+        hedge_delay: float = 0.3,
+        timeout: float = 5.0
+    ):
+        """
+        Args:
+            sources: (数据源名称, 获取函数) 列表，按优先级排序（健康评分相同时使用）
+            hedge_delay: 对冲延迟（秒），主数据源超过该时间未返回则启动备用源
+            timeout: 单个数据源的请求超时（秒）
+        """
+        self.sources = sources
+        self.hedge_delay = hedge_delay
+        self.timeout = timeout
+        self._stats: Dict[str, SourceStats] = {name: SourceStats() for name, _ in sources}
+        self._stats_lock = threading.Lock()
+
+    async def _run_source(self, name: str, fetcher: SourceFetcher, client: httpx.AsyncClient) -> Optional[Dict]:
+        """执行单个数据源请求并记录延迟（异常视为失败，返回None）"""
+        breaker = get_breaker(name)
+        start = time.perf_counter()
+        with self._stats_lock:
+            self._stats[name].attempts += 1
+        try:
+            result = await asyncio.wait_for(fetcher(client), timeout=self.timeout)
+        except asyncio.CancelledError:
+            # 对冲落败被取消，不计入失败
+            with self._stats_lock:
+                self._stats[name].cancelled += 1
+            breaker.release()
+            raise
+        except Exception as e:
+            print(f"[HedgedFetcher] 数据源 {name} 请求失败: {type(e).__name__}: {e}")
+            result = None
+
+        elapsed = time.perf_counter() - start
+        with self._stats_lock:
+            stats = self._stats[name]
+            stats.latencies.append(elapsed)
+            if result:
+                stats.successes += 1
+            else:
+                stats.failures += 1
+        if result:
+            breaker.record_success(elapsed)
+        else:
+            breaker.record_failure(elapsed)
+        return result
+
+    async def fetch(self, client: httpx.AsyncClient) -> Optional[Dict]:
+        """竞速获取报价，返回最先到达的有效结果；全部失败时返回None"""
+        queue = order_by_health(self.sources)
+        pending: Dict[asyncio.Task, str] = {}
+
+        def launch_next() -> None:
+            # 跳过熔断打开的数据源，不在已知宕机的数据源上排队
+            while queue:
+                name, fetcher = queue.pop(0)
+                if get_breaker(name).allow_request():
+                    task = asyncio.ensure_future(self._run_source(name, fetcher, client))
+                    pending[task] = name
+                    return
+
+        launch_next()
+        try:
+            while pending:
+                # 还有备用源时只等待对冲延迟，否则等待在途请求完成
+                wait_timeout = self.hedge_delay if queue else None
+                done, _ = await asyncio.wait(
+                    list(pending.keys()),
+                    timeout=wait_timeout,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+
+                for task in done:
+                    name = pending.pop(task)
+                    result = task.result()
+                    if result:
+                        with self._stats_lock:
+                            self._stats[name].wins += 1
+                        return result
+
+                # 超过对冲延迟，或在途请求全部失败：立即启动下一个数据源
+                if queue and (not done or not pending):
+                    launch_next()
+        finally:
+            for task in pending:
+                task.cancel()
+
+        return None
+
+    def get_stats(self) -> Dict[str, Dict]:
+        """获取各数据源的延迟与胜出率统计"""
+        with self._stats_lock:
+            return {name: stats.to_dict() for name, stats in self._stats.items()}
@@ -0,0 +1,178 @@
+"""行情数据源共享HTTP连接池
+
+所有行情数据源（腾讯财经、新浪财经、东方财富）共用长连接池，避免每次请求重新
+进行TCP+TLS握手。防缓存通过请求头实现，而不是关闭连接。
+同时统计每个主机的请求数与新建连接数，用于观察连接复用情况。
+"""
+import asyncio
+import threading
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from app.config import settings
+
+_BROWSER_UA = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+# 防止中间代理/CDN返回缓存的旧行情
+NO_CACHE_HEADERS = {
+    'Cache-Control': 'no-cache, no-store, must-revalidate',
+    'Pragma': 'no-cache',
+    'Expires': '0'
+}
+
+# 各数据源的请求头
+PROVIDER_HEADERS = {
+    'tencent': {
+        'User-Agent': _BROWSER_UA,
+    },
+    'sina': {
+        'User-Agent': _BROWSER_UA,
+        'Referer': 'https://finance.sina.com.cn',
+    },
+    'eastmoney': {
+        'User-Agent': _BROWSER_UA,
+    },
+}
+
+
+def build_headers(provider: str) -> Dict[str, str]:
+    """构建数据源请求头（数据源专用头 + 防缓存头）"""
+    headers = dict(PROVIDER_HEADERS.get(provider, {'User-Agent': _BROWSER_UA}))
+    headers.update(NO_CACHE_HEADERS)
+    return headers
+
+
+# 创建带重试机制的HTTP Session（提升API稳定性）
+def create_retry_session(
+    retries=3,
+    backoff_factor=0.5,
+    status_forcelist=(429, 500, 502, 503, 504),
+    pool_connections=10,
+    pool_maxsize=20
+):
+    """创建带重试机制和连接池的requests session"""
+    session = requests.Session()
+    retry_strategy = Retry(
+        total=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=status_forcelist,
+        allowed_methods=["GET", "POST"]  # 允许重试的方法
+    )
+    adapter = HTTPAdapter(
+        max_retries=retry_strategy,
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+# 全局session实例（线程安全）
+_http_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def get_http_session() -> requests.Session:
+    """获取共享的长连接HTTP session（懒加载）"""
+    global _http_session
+    if _http_session is None:
+        with _session_lock:
+            if _http_session is None:
+                # 行情请求只做一次快速重试：故障数据源由熔断器隔离，
+                # 多次退避重试只会让请求在已宕机的数据源后面排队
+                _http_session = create_retry_session(retries=1, backoff_factor=0.1)
+    return _http_session
+
+
+def provider_get(provider: str, url: str, timeout: float = 3, **kwargs) -> requests.Response:
+    """通过共享连接池向行情数据源发起GET请求（同步）"""
+    return get_http_session().get(url, headers=build_headers(provider), timeout=timeout, **kwargs)
+
+
+# 异步客户端（绑定到创建时的事件循环）
+_async_client: Optional[httpx.AsyncClient] = None
+_async_client_loop: Optional[asyncio.AbstractEventLoop] = None
+_async_stats: Dict[str, Dict[str, int]] = {}
+_async_stats_lock = threading.Lock()
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """获取共享的异步HTTP客户端（每个事件循环一个实例）"""
+    global _async_client, _async_client_loop
+    loop = asyncio.get_running_loop()
+    if _async_client is None or _async_client.is_closed or _async_client_loop is not loop:
+        _async_client = httpx.AsyncClient(
+            timeout=settings.QUOTE_FETCH_TIMEOUT,
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=60)
+        )
+        _async_client_loop = loop
+    return _async_client
+
+
+async def close_async_client() -> None:
+    """关闭共享的异步HTTP客户端（应用关闭时调用）"""
+    global _async_client, _async_client_loop
+    if _async_client is not None and not _async_client.is_closed:
+        await _async_client.aclose()
+    _async_client = None
+    _async_client_loop = None
+
+
+def _record_async(host: str, field: str) -> None:
+    with _async_stats_lock:
+        stats = _async_stats.setdefault(host, {"requests": 0, "new_connections": 0})
+        stats[field] += 1
+
+
+async def provider_get_async(
+    client: httpx.AsyncClient,
+    provider: str,
+    url: str,
+    **kwargs
+) -> httpx.Response:
+    """通过共享连接池向行情数据源发起GET请求（异步），并统计连接复用"""
+    host = urlsplit(url).netloc
+
+    async def trace(event_name: str, info: Dict) -> None:
+        # 只有新建连接时才会触发TCP连接事件
+        if event_name == "connection.connect_tcp.started":
+            _record_async(host, "new_connections")
+
+    _record_async(host, "requests")
+    return await client.get(url, headers=build_headers(provider), extensions={"trace": trace}, **kwargs)
+
+
+def _with_reuse(requests_count: int, connections: int) -> Dict[str, int]:
+    return {
+        "requests": requests_count,
+        "new_connections": connections,
+        "reused": max(0, requests_count - connections),
+    }
+
+
+def get_pool_stats() -> Dict[str, Dict]:
+    """获取连接池统计（每个主机的请求数、新建连接数、复用次数）"""
+    sync_stats = {}
+    session = _http_session
+    if session is not None:
+        adapter = session.get_adapter("https://")
+        pools = adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            sync_stats[pool.host] = _with_reuse(pool.num_requests, pool.num_connections)
+
+    with _async_stats_lock:
+        async_stats = {
+            host: _with_reuse(stats["requests"], stats["new_connections"])
+            for host, stats in _async_stats.items()
+        }
+
+    return {"sync": sync_stats, "async": async_stats}
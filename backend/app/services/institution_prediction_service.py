@@ -1,5 +1,5 @@
 """机构预测分析服务"""
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
 from sqlalchemy import and_
@@ -246,16 +246,16 @@ class InstitutionPredictionAnalyzer:
                     try:
                         result = json.loads(content[start:end])
                     except:
-                        result = self._get_default_predictions()
+                        result = self._get_default_predictions("AI返回结果解析失败")
                 else:
-                    result = self._get_default_predictions()
+                    result = self._get_default_predictions("AI返回结果解析失败")
 
             return result
         except Exception as e:
             print(f"LLM调用失败: {e}")
-            return self._get_default_predictions()
+            return self._get_default_predictions(f"{type(e).__name__}: {e}")
 
-    def _get_default_predictions(self) -> Dict[str, Any]:
+    def _get_default_predictions(self, error: Optional[str] = None) -> Dict[str, Any]:
         """获取默认机构预测（当LLM调用失败时使用）"""
         return {
             "institutions": [
@@ -317,7 +317,9 @@ class InstitutionPredictionAnalyzer:
                 }
             ],
             "analysis_summary": "基于当前市场状况的机构预测汇总",
-            "last_updated": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            "last_updated": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "fallback": True,
+            "error": error or "AI分析失败，返回默认数据"
         }
 
     def save_to_database(self, db: Session, analysis_result: Dict[str, Any]) -> None:
@@ -360,7 +362,7 @@ class InstitutionPredictionService:
     def __init__(self, db: Session):
         self.db = db
         self.analyzer = InstitutionPredictionAnalyzer()
-        self.cache = CacheManager("institution_predictions", ttl=3600)  # 1小时缓存（实时数据更频繁更新）
+        self.cache = CacheManager("institution_predictions")  # 过期策略见 CACHE_POLICIES
         self.zhipu_service = get_zhipu_service()
 
     def get_institution_predictions(self, use_cache: bool = True) -> Dict[str, Any]:
@@ -398,14 +400,20 @@ class InstitutionPredictionService:
                 # 如果实时搜索失败，返回缓存数据
                 pass
         
-        # 1. 首先尝试文件缓存（最快，支持多进程共享）
-        cached_data = self.cache.get()
-        if cached_data:
+        # 1. 首先尝试文件缓存（最快，支持多进程共享；超过软过期时返回旧数据并后台刷新）
+        entry = self.cache.get_entry()
+        if entry:
+            if entry.stale:
+                self._trigger_background_analysis()
+            cached_data = entry.data
             cached_data["metadata"] = {
                 "cached": True,
                 "cache_source": "file",
-                "generated_at": datetime.now().isoformat()
+                "generated_at": datetime.now().isoformat(),
+                "stale": entry.stale,
+                "cache_age_seconds": int(entry.age)
             }
+            self.cache.apply_failure_metadata(cached_data["metadata"])
             return cached_data
 
         # 2. 检查数据库中是否有最近2小时内的数据
@@ -444,6 +452,7 @@ class InstitutionPredictionService:
         # 3. 无缓存时，返回默认数据并触发后台更新
         default_data = self._get_default_response()
         self._trigger_background_analysis()
+        self.cache.apply_failure_metadata(default_data["metadata"])
         return default_data
 
     def _get_default_response(self) -> Dict[str, Any]:
@@ -499,7 +508,8 @@ class InstitutionPredictionService:
     def _trigger_background_analysis(self) -> None:
         """触发后台分析（不阻塞）"""
         try:
-            _executor.submit(self._background_analysis_task)
+            # 单飞提交到线程池：已有刷新进行中或处于失败退避期时不重复提交
+            self.cache.refresh_in_background(self._background_analysis_task, _executor)
         except Exception as e:
             print(f"[InstitutionPrediction] 触发后台分析失败: {e}")
 
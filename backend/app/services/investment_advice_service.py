@@ -3,12 +3,14 @@ from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
 from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 import asyncio
 
 from app.models.news import GoldNews
 from app.models.gold_price import GoldPrice
 from app.config import settings
 from app.services.cache_manager import CacheManager
+from app.services.llm_cache import llm_cache
 import json
 import logging
 
@@ -32,6 +34,8 @@ _executor = ThreadPoolExecutor(max_workers=2)
 class InvestmentAdviceAnalyzer:
     """使用LangChain Agent分析市场数据，生成个性化投资建议"""
 
+    PROMPT_VERSION = "1"  # 提示词模板版本（见 llm_cache）
+
     def __init__(self):
         self._llm = None
 
@@ -133,9 +137,10 @@ class InvestmentAdviceAnalyzer:
         market_status: str,
         bullish_factors: List[Dict],
         bearish_factors: List[Dict],
-        institution_predictions: List[Dict]
+        institution_predictions: List[Dict],
+        use_llm_cache: bool = True
     ) -> Dict[str, Any]:
-        """分析市场数据并生成投资建议"""
+        """分析市场数据并生成投资建议（use_llm_cache=False 时不复用上次的LLM结果）"""
         try:
             recent_news = self._fetch_recent_news(db)
             ytd_data = self._fetch_ytd_data(db)
@@ -295,29 +300,49 @@ class InvestmentAdviceAnalyzer:
 4. 必须明确止损和止盈设置
 5. 风险提示要充分且具体"""
             
-            response = self.llm.invoke(prompt_template)
-            
-            try:
-                content = response.content
-                if "```json" in content:
-                    json_str = content.split("```json")[1].split("```")[0].strip()
-                elif "```" in content:
-                    json_str = content.split("```")[1].split("```")[0].strip()
-                else:
-                    json_str = content.strip()
+            def call_llm() -> Dict[str, Any]:
+                response = self.llm.invoke(prompt_template)
                 
-                result = json.loads(json_str)
-                return result
-                
-            except json.JSONDecodeError as e:
-                logger.error(f"JSON解析错误: {e}")
-                return self._get_default_advice()
+                try:
+                    content = response.content
+                    if "```json" in content:
+                        json_str = content.split("```json")[1].split("```")[0].strip()
+                    elif "```" in content:
+                        json_str = content.split("```")[1].split("```")[0].strip()
+                    else:
+                        json_str = content.strip()
+                    
+                    result = json.loads(json_str)
+                    return result
+                    
+                except json.JSONDecodeError as e:
+                    logger.error(f"JSON解析错误: {e}")
+                    return self._get_default_advice("AI返回结果解析失败")
+            
+            # 市场数据、上游分析结果和新闻都未变化时复用上次的结果
+            return llm_cache.get_or_call(
+                "investment_advice",
+                model=settings.MODEL_NAME,
+                temperature=0.7,
+                prompt_version=self.PROMPT_VERSION,
+                inputs={
+                    "market_status": market_status,
+                    "ytd": ytd_data,
+                    "prices": prices_content,
+                    "bullish": bullish_content,
+                    "bearish": bearish_content,
+                    "institutions": institution_content,
+                    "news": news_content,
+                },
+                call=call_llm,
+                reuse=use_llm_cache
+            )
                 
         except Exception as e:
             logger.error(f"投资建议分析失败: {e}")
-            return self._get_default_advice()
+            return self._get_default_advice(f"{type(e).__name__}: {e}")
 
-    def _get_default_advice(self) -> Dict[str, Any]:
+    def _get_default_advice(self, error: Optional[str] = None) -> Dict[str, Any]:
         """获取默认投资建议"""
         return {
             "market_assessment": {
@@ -404,7 +429,9 @@ class InvestmentAdviceAnalyzer:
                 {"title": "长期视角", "description": "黄金适合长期配置，避免频繁交易"}
             ],
             "risk_warning": "黄金市场波动较大，投资有风险，入市需谨慎。以上建议仅供参考，不构成投资建议。",
-            "disclaimer": "投资者应根据自身风险承受能力、投资目标和财务状况做出独立判断。过往表现不代表未来收益。"
+            "disclaimer": "投资者应根据自身风险承受能力、投资目标和财务状况做出独立判断。过往表现不代表未来收益。",
+            "fallback": True,
+            "error": error or "AI分析失败，返回默认数据"
         }
 
 
@@ -414,7 +441,7 @@ class InvestmentAdviceService:
     def __init__(self, db: Session):
         self.db = db
         self.analyzer = InvestmentAdviceAnalyzer()
-        self.cache = CacheManager("investment_advice", ttl=7200)  # 2小时缓存
+        self.cache = CacheManager("investment_advice")  # 过期策略见 CACHE_POLICIES
 
     def get_investment_advice(
         self,
@@ -451,7 +478,8 @@ class InvestmentAdviceService:
                     market_status,
                     bullish_factors or [],
                     bearish_factors or [],
-                    institution_predictions or []
+                    institution_predictions or [],
+                    use_llm_cache=False
                 )
                 self.cache.set(result)
                 result["metadata"] = {
@@ -467,16 +495,27 @@ class InvestmentAdviceService:
                 # 如果分析失败，返回缓存数据
                 pass
         
-        # 1. 首先尝试文件缓存（最快，支持多进程共享）
-        cached_data = self.cache.get()
-        if cached_data:
+        # 1. 首先尝试文件缓存（最快，支持多进程共享；超过软过期时返回旧数据并后台刷新）
+        entry = self.cache.get_entry()
+        if entry:
+            if entry.stale:
+                self._trigger_background_analysis(
+                    market_status,
+                    bullish_factors or [],
+                    bearish_factors or [],
+                    institution_predictions or []
+                )
+            cached_data = entry.data
             cached_data["metadata"] = {
                 "cached": True,
                 "cache_source": "file",
                 "generated_at": datetime.now().isoformat(),
+                "stale": entry.stale,
+                "cache_age_seconds": int(entry.age),
                 "data_sources": ["实时金价数据", "市场因子分析", "机构预测", "24小时新闻"],
                 "analysis_method": "LangChain Agent + DeepSeek LLM"
             }
+            self.cache.apply_failure_metadata(cached_data["metadata"])
             return cached_data
 
         # 2. 无缓存时，返回默认数据并触发后台更新
@@ -490,6 +529,8 @@ class InvestmentAdviceService:
             institution_predictions or []
         )
         
+        self.cache.apply_failure_metadata(default_data["metadata"])
+        
         return default_data
 
     def _get_default_response(self) -> Dict[str, Any]:
@@ -541,12 +582,16 @@ class InvestmentAdviceService:
     ) -> None:
         """触发后台分析（不阻塞）"""
         try:
-            _executor.submit(
-                self._background_analysis_task,
-                market_status,
-                bullish_factors,
-                bearish_factors,
-                institution_predictions
+            # 单飞提交到线程池：已有刷新进行中或处于失败退避期时不重复提交
+            self.cache.refresh_in_background(
+                partial(
+                    self._background_analysis_task,
+                    market_status,
+                    bullish_factors,
+                    bearish_factors,
+                    institution_predictions
+                ),
+                _executor
             )
         except Exception as e:
             print(f"[InvestmentAdvice] 触发后台分析失败: {e}")
@@ -583,15 +628,17 @@ class InvestmentAdviceService:
         market_status: str = "",
         bullish_factors: List[Dict] = None,
         bearish_factors: List[Dict] = None,
-        institution_predictions: List[Dict] = None
+        institution_predictions: List[Dict] = None,
+        use_llm_cache: bool = True
     ) -> Dict[str, Any]:
-        """同步刷新分析（阻塞，仅用于手动刷新）"""
+        """同步刷新分析（阻塞，用于预热、定时任务和手动刷新）"""
         result = self.analyzer.analyze(
             self.db,
             market_status,
             bullish_factors or [],
             bearish_factors or [],
-            institution_predictions or []
+            institution_predictions or [],
+            use_llm_cache
         )
         self.cache.set(result)
         return result
@@ -607,9 +654,12 @@ class InvestmentAdviceService:
         loop = asyncio.get_event_loop()
         return await loop.run_in_executor(
             _executor,
-            self.refresh_analysis_sync,
-            market_status,
-            bullish_factors,
-            bearish_factors,
-            institution_predictions
+            partial(
+                self.refresh_analysis_sync,
+                market_status,
+                bullish_factors,
+                bearish_factors,
+                institution_predictions,
+                use_llm_cache=False
+            )
         )
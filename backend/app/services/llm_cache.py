@@ -0,0 +1,131 @@
+"""LLM响应缓存 - 按模型参数和输入内容寻址
+
+夜间、周末等新闻和价格都没有变化的时段，定时刷新会用相同的输入重复调用LLM。
+缓存键为 llm:<名称>:<摘要>，摘要由模型、温度、提示词模板版本和规范化后的输入数据计算，
+输入相同时直接返回上次的解析结果，跳过LLM调用。
+
+- 修改提示词模板时需要递增调用方的模板版本号，使旧结果不再命中
+- 只缓存有效结果（降级结果、未通过 is_valid 校验的结果不缓存）
+- 只有预热、定时任务和请求触发的后台刷新复用缓存；用户强制刷新（refresh=true、POST .../refresh）
+  总是调用LLM，新结果写入缓存
+- 联网搜索的结果还取决于网络上的最新内容，因此缓存有最长有效期 settings.LLM_CACHE_TTL
+- 结果保存在一级缓存后端（不写文件），进程内后端按LRU淘汰
+"""
+import copy
+import hashlib
+import json
+import time
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Optional
+
+from app.config import settings
+from app.services.cache_backends import get_backend
+from app.services.cache_manager import FALLBACK_FLAG
+
+LLM_CACHE_PREFIX = "llm:"
+
+
+def normalize_inputs(value: Any) -> Any:
+    """规范化输入数据：字典按键排序，字符串合并空白，浮点数保留4位小数，日期转为ISO格式"""
+    if isinstance(value, dict):
+        return {str(k): normalize_inputs(value[k]) for k in sorted(value, key=str)}
+    if isinstance(value, (list, tuple)):
+        return [normalize_inputs(item) for item in value]
+    if isinstance(value, str):
+        return " ".join(value.split())
+    if isinstance(value, float):
+        return round(value, 4)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+class LLMResponseCache:
+    """LLM响应缓存"""
+
+    def __init__(self, ttl: Optional[float] = None):
+        self._ttl = ttl
+
+    @property
+    def ttl(self) -> float:
+        return settings.LLM_CACHE_TTL if self._ttl is None else self._ttl
+
+    @staticmethod
+    def make_key(name: str, model: str, temperature: float, prompt_version: str, inputs: Any) -> str:
+        """按模型、温度、模板版本和规范化输入生成缓存键"""
+        payload = json.dumps(
+            {
+                "model": model,
+                "temperature": temperature,
+                "prompt_version": prompt_version,
+                "inputs": normalize_inputs(inputs),
+            },
+            ensure_ascii=False,
+            sort_keys=True,
+            separators=(",", ":"),
+            default=str
+        )
+        digest = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+        return f"{LLM_CACHE_PREFIX}{name}:{digest}"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """读取缓存结果（返回副本），不存在或已过期时返回None"""
+        try:
+            cached = get_backend().get(key)
+            if cached is None:
+                return None
+            data, timestamp = cached
+            if time.time() - timestamp >= self.ttl:
+                return None
+            return copy.deepcopy(data)
+        except Exception as e:
+            print(f"[LLMCache] 读取LLM缓存失败: {e}")
+            return None
+
+    def set(self, key: str, data: Dict[str, Any]) -> None:
+        try:
+            get_backend().set(key, copy.deepcopy(data), time.time())
+        except Exception as e:
+            print(f"[LLMCache] 写入LLM缓存失败: {e}")
+
+    def get_or_call(
+        self,
+        name: str,
+        model: str,
+        temperature: float,
+        prompt_version: str,
+        inputs: Any,
+        call: Callable[[], Dict[str, Any]],
+        is_valid: Optional[Callable[[Dict[str, Any]], bool]] = None,
+        reuse: bool = True
+    ) -> Dict[str, Any]:
+        """
+        读取相同输入的LLM结果，未命中时执行 call 并缓存有效结果
+
+        Args:
+            name: 调用名称（如 bullish_factors.search）
+            model: 模型名称
+            temperature: 采样温度
+            prompt_version: 提示词模板版本
+            inputs: 影响提示词内容的输入数据（不含时间戳等每次都变化的内容）
+            call: 实际调用LLM并解析结果的函数
+            is_valid: 结果校验，返回False的结果不缓存
+            reuse: 是否复用已缓存的结果；用户强制刷新时为False（总是调用LLM，新结果仍写入缓存）
+        """
+        if not settings.LLM_CACHE_ENABLED:
+            return call()
+
+        key = self.make_key(name, model, temperature, prompt_version, inputs)
+        cached = self.get(key) if reuse else None
+        if cached is not None:
+            print(f"[LLMCache] {name} 输入未变化，复用上次的LLM结果")
+            return cached
+
+        result = call()
+        if isinstance(result, dict) and not result.get(FALLBACK_FLAG) and (is_valid is None or is_valid(result)):
+            self.set(key, result)
+        return result
+
+
+# 全局实例
+llm_cache = LLMResponseCache()
@@ -0,0 +1,182 @@
+"""有界 LRU 缓存 - 进程内缓存的容量控制
+
+按条目数和近似字节数双重限制容量，超出时淘汰最久未使用的条目；
+可选 TTL，过期条目在读取时移除。记录全局及每个缓存键的命中/未命中/淘汰次数，
+用于 /health 和缓存状态接口观察缓存效果。
+"""
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+# 估算对象大小时最多遍历的对象数（大对象只做近似估算，避免写入时开销过大）
+SIZE_ESTIMATE_MAX_OBJECTS = 10000
+
+
+def estimate_size(obj: Any) -> int:
+    """估算对象占用的内存字节数（递归累加容器及其元素的 sys.getsizeof）"""
+    size = 0
+    seen = set()
+    stack = [obj]
+    visited = 0
+    while stack and visited < SIZE_ESTIMATE_MAX_OBJECTS:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        visited += 1
+        size += sys.getsizeof(item)
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            stack.extend(item)
+    return size
+
+
+class _Entry:
+    __slots__ = ("value", "size", "expires_at")
+
+    def __init__(self, value: Any, size: int, expires_at: Optional[float]):
+        self.value = value
+        self.size = size
+        self.expires_at = expires_at
+
+
+class BoundedLRU:
+    """按条目数和字节数限制容量的线程安全 LRU 缓存"""
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 64 * 1024 * 1024,
+                 ttl: Optional[float] = None):
+        """
+        Args:
+            max_entries: 最大条目数
+            max_bytes: 最大近似字节数（单个条目超过该值时不缓存）
+            ttl: 条目有效期（秒），为None时只按容量淘汰
+        """
+        self.max_entries = max(1, max_entries)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # 每个缓存键的统计（命中、未命中、淘汰），条目数有上限，超出时丢弃最久未更新的键
+        self._key_stats: "OrderedDict[Hashable, Dict[str, int]]" = OrderedDict()
+        self._max_key_stats = self.max_entries * 4
+
+    def _stat(self, key: Hashable, field: str) -> None:
+        stats = self._key_stats.get(key)
+        if stats is None:
+            stats = {"hits": 0, "misses": 0, "evictions": 0}
+            self._key_stats[key] = stats
+            if len(self._key_stats) > self._max_key_stats:
+                self._key_stats.popitem(last=False)
+        else:
+            self._key_stats.move_to_end(key)
+        stats[field] += 1
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._data.pop(key)
+        self._bytes -= entry.size
+
+    def get(self, key: Hashable, default: Any = None,
+            is_valid: Optional[Callable[[Any], bool]] = None) -> Any:
+        """
+        读取缓存
+
+        Args:
+            key: 缓存键
+            default: 未命中时的返回值
+            is_valid: 额外的有效性检查，返回False时移除条目并计为未命中
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expired = entry.expires_at is not None and time.time() >= entry.expires_at
+                if expired or (is_valid is not None and not is_valid(entry.value)):
+                    self._remove(key)
+                    entry = None
+            if entry is None:
+                self.misses += 1
+                self._stat(key, "misses")
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            self._stat(key, "hits")
+            return entry.value
+
+    def set(self, key: Hashable, value: Any, size: Optional[int] = None) -> None:
+        """写入缓存（size为None时自动估算），超出容量时淘汰最久未使用的条目"""
+        if size is None:
+            size = estimate_size(value)
+        expires_at = time.time() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            if size > self.max_bytes:
+                return
+            self._data[key] = _Entry(value, size, expires_at)
+            self._bytes += size
+            while len(self._data) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._data))
+                self._remove(oldest)
+                self.evictions += 1
+                self._stat(oldest, "evictions")
+
+    def pop(self, key: Hashable) -> None:
+        """删除缓存条目"""
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+
+    def clear(self) -> None:
+        """清空缓存（保留统计）"""
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def keys(self) -> List[Hashable]:
+        """按最近使用顺序（从旧到新）列出缓存键"""
+        with self._lock:
+            return list(self._data.keys())
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        """缓存统计：容量、占用、命中率及每个缓存键的大小和命中率"""
+        with self._lock:
+            total = self.hits + self.misses
+            keys = {}
+            for key, stats in self._key_stats.items():
+                lookups = stats["hits"] + stats["misses"]
+                entry = self._data.get(key)
+                keys[str(key)] = {
+                    "bytes": entry.size if entry else 0,
+                    "cached": entry is not None,
+                    "hits": stats["hits"],
+                    "misses": stats["misses"],
+                    "evictions": stats["evictions"],
+                    "hit_rate": round(stats["hits"] / lookups, 4) if lookups else None,
+                }
+            for key, entry in self._data.items():
+                if str(key) not in keys:
+                    keys[str(key)] = {
+                        "bytes": entry.size, "cached": True, "hits": 0, "misses": 0,
+                        "evictions": 0, "hit_rate": None,
+                    }
+            return {
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / total, 4) if total else None,
+                "keys": keys,
+            }
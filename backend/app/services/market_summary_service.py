@@ -9,6 +9,7 @@ import logging
 
 from app.config import settings
 from app.services.cache_manager import CacheManager
+from app.services.llm_cache import llm_cache
 
 logger = logging.getLogger(__name__)
 
@@ -30,6 +31,8 @@ _executor = ThreadPoolExecutor(max_workers=2)
 class MarketSummaryAnalyzer:
     """使用DeepSeek分析所有市场数据，生成综合市场总结"""
 
+    PROMPT_VERSION = "1"  # 提示词模板版本（见 llm_cache）
+
     def __init__(self):
         self._llm = None
 
@@ -54,7 +57,8 @@ class MarketSummaryAnalyzer:
         bullish_factors: List[Dict],
         bearish_factors: List[Dict],
         institution_predictions: List[Dict],
-        recent_news: List[Dict] = None
+        recent_news: List[Dict] = None,
+        use_llm_cache: bool = True
     ) -> Dict[str, Any]:
         """
         分析所有市场数据，生成综合总结
@@ -66,6 +70,7 @@ class MarketSummaryAnalyzer:
             bearish_factors: 看跌因子列表
             institution_predictions: 机构预测列表
             recent_news: 最近新闻列表（可选）
+            use_llm_cache: 输入未变化时是否复用上次的LLM结果（用户强制刷新时为False）
 
         Returns:
             综合市场分析结果
@@ -79,19 +84,36 @@ class MarketSummaryAnalyzer:
             recent_news
         )
 
-        try:
+        def call_llm() -> Dict[str, Any]:
             # 调用DeepSeek进行分析
             response = self.llm.invoke(prompt)
             analysis_text = response.content
 
             # 解析分析结果
-            result = self._parse_analysis_result(analysis_text)
-            return result
+            return self._parse_analysis_result(analysis_text)
+
+        try:
+            # 提示词完全由输入数据生成，输入未变化时复用上次的结果
+            return llm_cache.get_or_call(
+                "market_summary",
+                model=settings.MODEL_NAME,
+                temperature=0.7,
+                prompt_version=self.PROMPT_VERSION,
+                inputs={
+                    "market_status": market_status,
+                    "bullish": bullish_factors[:8],
+                    "bearish": bearish_factors[:8],
+                    "institutions": institution_predictions[:6],
+                    "news": (recent_news or [])[:10],
+                },
+                call=call_llm,
+                reuse=use_llm_cache
+            )
 
         except Exception as e:
             logger.error(f"DeepSeek分析失败: {e}")
             # 返回默认结构
-            return self._get_default_analysis()
+            return self._get_default_analysis(f"{type(e).__name__}: {e}")
 
     def _build_analysis_prompt(
         self,
@@ -223,12 +245,12 @@ class MarketSummaryAnalyzer:
 
         except json.JSONDecodeError as e:
             logger.error(f"JSON解析错误: {e}")
-            return self._get_default_analysis()
+            return self._get_default_analysis("AI返回结果解析失败")
         except Exception as e:
             logger.error(f"解析分析结果失败: {e}")
-            return self._get_default_analysis()
+            return self._get_default_analysis(f"{type(e).__name__}: {e}")
 
-    def _get_default_analysis(self) -> Dict[str, Any]:
+    def _get_default_analysis(self, error: Optional[str] = None) -> Dict[str, Any]:
         """获取默认分析结果"""
         return {
             "core_bullish_logic": [
@@ -265,7 +287,9 @@ class MarketSummaryAnalyzer:
             "core_view": "黄金处于长期牛市通道，2026年大概率维持高位震荡偏强格局。",
             "investment_recommendation": "建议投资者根据自身风险偏好，适度配置黄金资产。",
             "confidence_level": "中",
-            "time_horizon": "中期"
+            "time_horizon": "中期",
+            "fallback": True,
+            "error": error or "AI分析失败，返回默认数据"
         }
 
 
@@ -275,7 +299,7 @@ class MarketSummaryService:
     def __init__(self, db: Session):
         self.db = db
         self.analyzer = MarketSummaryAnalyzer()
-        self.cache = CacheManager("market_summary", ttl=7200)  # 2小时
+        self.cache = CacheManager("market_summary")  # 过期策略见 CACHE_POLICIES
 
     def _get_realtime_price(self) -> float:
         """获取实时金价"""
@@ -325,7 +349,8 @@ class MarketSummaryService:
                     bullish_factors or [],
                     bearish_factors or [],
                     institution_predictions or [],
-                    recent_news or []
+                    recent_news or [],
+                    use_llm_cache=False
                 )
                 # 用实时价格覆盖AI生成的价格
                 result["current_price"] = realtime_price
@@ -342,18 +367,30 @@ class MarketSummaryService:
                 print(f"[MarketSummary] DeepSeek分析失败: {e}")
                 pass
 
-        # 1. 首先尝试文件缓存
-        cached_data = self.cache.get()
-        if cached_data:
+        # 1. 首先尝试文件缓存（超过软过期时返回旧数据并后台刷新）
+        entry = self.cache.get_entry()
+        if entry:
+            if entry.stale:
+                self._trigger_background_analysis(
+                    market_status,
+                    bullish_factors or [],
+                    bearish_factors or [],
+                    institution_predictions or [],
+                    recent_news or []
+                )
+            cached_data = entry.data
             # 用实时价格覆盖缓存中的价格
             cached_data["current_price"] = realtime_price
             cached_data["metadata"] = {
                 "cached": True,
                 "cache_source": "file",
                 "generated_at": datetime.now().isoformat(),
+                "stale": entry.stale,
+                "cache_age_seconds": int(entry.age),
                 "data_sources": ["实时金价数据", "看涨因子", "看跌因子", "机构预测", "24小时新闻"],
                 "analysis_method": "DeepSeek LLM 综合分析"
             }
+            self.cache.apply_failure_metadata(cached_data["metadata"])
             return cached_data
 
         # 2. 无缓存时，返回默认数据并触发后台分析
@@ -370,6 +407,8 @@ class MarketSummaryService:
             recent_news or []
         )
 
+        self.cache.apply_failure_metadata(default_data["metadata"])
+
         return default_data
 
     def _get_default_response(self) -> Dict[str, Any]:
@@ -442,5 +481,27 @@ class MarketSummaryService:
             except Exception as e:
                 print(f"[MarketSummary] 后台分析失败: {e}")
 
-        # 在线程池中执行
-        _executor.submit(analyze_in_background)
+        # 单飞提交到线程池：已有刷新进行中或处于失败退避期时不重复提交
+        self.cache.refresh_in_background(analyze_in_background, _executor)
+
+    def refresh_analysis_sync(
+        self,
+        market_status: str = "",
+        bullish_factors: List[Dict] = None,
+        bearish_factors: List[Dict] = None,
+        institution_predictions: List[Dict] = None,
+        recent_news: List[Dict] = None
+    ) -> Dict[str, Any]:
+        """同步刷新分析（阻塞，用于预热和定时任务）"""
+        result = self.analyzer.analyze(
+            self.db,
+            market_status,
+            bullish_factors or [],
+            bearish_factors or [],
+            institution_predictions or [],
+            recent_news or []
+        )
+        # 用实时价格覆盖AI生成的价格
+        result["current_price"] = self._get_realtime_price()
+        self.cache.set(result)
+        return result
@@ -0,0 +1,96 @@
+"""查询结果缓存 - 按接口和规范化参数缓存数据库查询结果
+
+历史日线数据每天最多由定时任务更新一次，图表接口重复加载时无需每次查询数据库。
+缓存键为 query:<命名空间>:<规范化参数>，结果保存在一级缓存后端（不写文件）。
+
+数据写入数据库后由 cache_events 按标签调用 invalidate(命名空间)，该命名空间下所有查询结果失效：
+命名空间记录最后失效时间戳（共享后端直接可见，进程内后端通过代数表通知其他进程），
+早于该时间开始计算的结果一律视为失效，避免失效前读到的旧数据在失效后回填。
+"""
+import time
+from typing import Any, Callable, Dict, Optional
+
+from app.services.cache_backends import get_backend
+from app.services.cache_manager import invalidated_at, mark_invalidated
+
+QUERY_CACHE_PREFIX = "query:"
+# 兜底有效期（秒），正常情况下由数据更新任务主动失效
+QUERY_CACHE_TTL = 6 * 3600
+
+# 命名空间
+PRICES_DAILY = "prices_daily"
+PRICES_CORRELATION = "prices_correlation"
+
+
+class QueryCache:
+    """查询结果缓存"""
+
+    def __init__(self, ttl: float = QUERY_CACHE_TTL):
+        self.ttl = ttl
+
+    @staticmethod
+    def make_key(namespace: str, params: Dict[str, Any]) -> str:
+        """按命名空间和规范化参数（按参数名排序）生成缓存键"""
+        normalized = "&".join(f"{name}={params[name]}" for name in sorted(params))
+        return f"{QUERY_CACHE_PREFIX}{namespace}:{normalized}"
+
+    @staticmethod
+    def _namespace_key(namespace: str) -> str:
+        return f"{QUERY_CACHE_PREFIX}{namespace}"
+
+    def get(self, namespace: str, params: Dict[str, Any]) -> Optional[Any]:
+        """读取查询结果，不存在、已失效或已过期时返回None"""
+        try:
+            cached = get_backend().get(self.make_key(namespace, params))
+            if cached is None:
+                return None
+            data, timestamp = cached
+            if time.time() - timestamp >= self.ttl or timestamp < invalidated_at(self._namespace_key(namespace)):
+                return None
+            return data
+        except Exception as e:
+            print(f"[QueryCache] 读取查询缓存失败: {e}")
+            return None
+
+    def set(self, namespace: str, params: Dict[str, Any], data: Any, started_at: float) -> None:
+        """
+        写入查询结果
+
+        Args:
+            started_at: 开始查询的时间戳（作为写入时间，查询期间发生的失效会使本结果失效）
+        """
+        try:
+            get_backend().set(self.make_key(namespace, params), data, started_at)
+        except Exception as e:
+            print(f"[QueryCache] 写入查询缓存失败: {e}")
+
+    def get_or_compute(self, namespace: str, params: Dict[str, Any], compute: Callable[[], Any]) -> Any:
+        """读取查询结果，未命中时执行 compute 并缓存（同步执行，由调用方放入线程池）"""
+        data = self.get(namespace, params)
+        if data is not None:
+            return data
+        started_at = time.time()
+        data = compute()
+        self.set(namespace, params, data, started_at)
+        return data
+
+    def invalidate(self, *namespaces: str) -> None:
+        """数据更新后使命名空间下的所有查询结果失效"""
+        now = time.time()
+        try:
+            backend = get_backend()
+            for namespace in namespaces:
+                key = self._namespace_key(namespace)
+                mark_invalidated(key, now)
+                # 释放本地（或共享后端中）已失效的结果
+                prefix = key + ":"
+                for cached_key in backend.keys():
+                    if cached_key.startswith(prefix):
+                        backend.delete(cached_key)
+        except Exception as e:
+            print(f"[QueryCache] 查询缓存失效失败: {e}")
+
+
+# 全局实例
+query_cache = QueryCache()
+
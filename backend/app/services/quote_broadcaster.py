@@ -0,0 +1,62 @@
+"""行情推送广播器 - 单一生产者向所有订阅客户端扇出
+
+后台行情轮询器是唯一的生产者，每个连接的客户端（SSE/WebSocket）拥有一个有界队列。
+队列满时丢弃最旧的消息（慢客户端只会错过中间行情，不会阻塞生产者或占用无限内存）。
+无论有多少客户端在线，上游行情请求只有一份。
+"""
+import asyncio
+from typing import Any, Dict, Optional, Set
+
+from app.config import settings
+
+
+class QuoteBroadcaster:
+    """行情广播器（仅在事件循环线程中使用，无需加锁）"""
+
+    def __init__(self, queue_size: int = 16):
+        """
+        Args:
+            queue_size: 每个客户端的队列长度上限
+        """
+        self.queue_size = queue_size
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._latest: Optional[Dict[str, Any]] = None
+        self.published = 0
+        self.dropped = 0
+
+    def subscribe(self) -> asyncio.Queue:
+        """订阅行情，返回客户端专属队列（立即放入最新一条行情）"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        if self._latest is not None:
+            queue.put_nowait(self._latest)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        """取消订阅"""
+        self._subscribers.discard(queue)
+
+    def publish(self, message: Dict[str, Any]) -> None:
+        """向所有订阅者推送行情（队列满时丢弃最旧的一条）"""
+        self._latest = message
+        self.published += 1
+        for queue in list(self._subscribers):
+            if queue.full():
+                try:
+                    queue.get_nowait()
+                    self.dropped += 1
+                except asyncio.QueueEmpty:
+                    pass
+            queue.put_nowait(message)
+
+    def get_stats(self) -> Dict[str, int]:
+        """获取广播统计"""
+        return {
+            "subscribers": len(self._subscribers),
+            "published": self.published,
+            "dropped": self.dropped,
+        }
+
+
+# 全局实例
+quote_broadcaster = QuoteBroadcaster(queue_size=settings.QUOTE_STREAM_QUEUE_SIZE)
@@ -0,0 +1,129 @@
+"""行情数据解析器 - 直接从字节解析新浪/腾讯行情（无正则）
+
+新浪返回格式:  var hq_str_<代码>="字段0,字段1,...";
+腾讯返回格式:  v_<代码>="字段0,字段1,...";
+
+一次请求可以包含多个代码（新浪 list=hf_GC,DINIW,hf_SI / 腾讯 q=hf_GC,hf_SI），
+解析器按记录顺序扫描字节，按数据源的字段索引表只转换需要的字段，
+文本字段（名称、日期）按需解码，不对整个响应做字符集转换。
+"""
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# 各数据源的记录前缀
+RECORD_PREFIXES = {
+    "sina": b"var hq_str_",
+    "tencent": b"v_",
+}
+
+# 中文文本字段的编码
+TEXT_ENCODINGS = {
+    "sina": "gb2312",
+    "tencent": "gbk",
+}
+
+
+class FieldLayout:
+    """行情记录的字段索引表"""
+
+    def __init__(self, numeric: Dict[str, int], text: Dict[str, int], min_fields: int):
+        """
+        Args:
+            numeric: 数值字段名 -> 字段索引
+            text: 文本字段名 -> 字段索引
+            min_fields: 有效记录至少包含的字段数
+        """
+        self.numeric = numeric
+        self.text = text
+        self.min_fields = min_fields
+
+
+# 新浪外盘期货（hf_GC、hf_SI 等）
+# [0]最新价, [1]涨跌额(空), [2]买价, [3]卖价, [4]最高价, [5]最低价,
+# [6]时间, [7]昨收, [8]开盘价, [9-11]其他, [12]日期, [13]名称
+SINA_FUTURES = FieldLayout(
+    numeric={"price": 0, "bid": 2, "ask": 3, "high": 4, "low": 5, "prev_close": 7, "open": 8},
+    text={"time": 6, "date": 12, "name": 13},
+    min_fields=13
+)
+
+# 新浪外汇/指数（DINIW 等）
+# [0]时间, [1]最新价, [2]买价, [3]卖价, [4]成交量, [5]开盘价, [6]最高价, [7]最低价, [8]昨收, [9]名称
+SINA_FX = FieldLayout(
+    numeric={"price": 1, "bid": 2, "ask": 3, "open": 5, "high": 6, "low": 7, "prev_close": 8},
+    text={"time": 0, "name": 9},
+    min_fields=10
+)
+
+# 腾讯外盘期货（hf_GC、hf_SI 等）
+# [0]最新价, [2]开盘价, [3]最高价, [4]最低价, [7]昨收, [12]日期
+TENCENT_FUTURES = FieldLayout(
+    numeric={"price": 0, "open": 2, "high": 3, "low": 4, "prev_close": 7},
+    text={"date": 12},
+    min_fields=13
+)
+
+
+def layout_for(provider: str, code: str) -> FieldLayout:
+    """根据数据源和代码选择字段索引表"""
+    if provider == "tencent":
+        return TENCENT_FUTURES
+    if code.startswith("hf_"):
+        return SINA_FUTURES
+    return SINA_FX
+
+
+def iter_records(payload: bytes, provider: str) -> Iterator[Tuple[str, List[bytes]]]:
+    """按顺序遍历响应中的 (代码, 原始字段列表)；空记录（无效代码）返回空列表"""
+    prefix = RECORD_PREFIXES[provider]
+    pos = 0
+    while True:
+        start = payload.find(prefix, pos)
+        if start < 0:
+            return
+        eq = payload.find(b'="', start)
+        if eq < 0:
+            return
+        end = payload.find(b'"', eq + 2)
+        if end < 0:
+            return
+        code = payload[start + len(prefix):eq].decode('ascii', errors='replace')
+        body = payload[eq + 2:end]
+        pos = end + 1
+        yield code, body.split(b',') if body else []
+
+
+def _to_float(raw: bytes) -> float:
+    try:
+        return float(raw) if raw.strip() else 0.0
+    except ValueError:
+        return 0.0
+
+
+def parse_record(fields: List[bytes], layout: FieldLayout, encoding: str) -> Optional[Dict]:
+    """按字段索引表转换一条记录，字段数不足时返回None"""
+    if len(fields) < layout.min_fields:
+        return None
+    record: Dict = {name: _to_float(fields[index]) for name, index in layout.numeric.items()}
+    for name, index in layout.text.items():
+        record[name] = fields[index].decode(encoding, errors='replace').strip() if index < len(fields) else ""
+    return record
+
+
+def parse_quotes(payload: bytes, provider: str) -> Dict[str, Dict]:
+    """
+    解析数据源响应中的所有行情记录
+
+    Args:
+        payload: 原始响应字节
+        provider: 数据源名称（sina / tencent）
+
+    Returns:
+        代码 -> 字段字典（数值字段为float，文本字段为str），无效记录不包含在内
+    """
+    encoding = TEXT_ENCODINGS[provider]
+    quotes = {}
+    for code, fields in iter_records(payload, provider):
+        record = parse_record(fields, layout_for(provider, code), encoding)
+        if record is not None:
+            quotes[code] = record
+    return quotes
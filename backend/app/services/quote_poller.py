@@ -0,0 +1,191 @@
+"""后台行情轮询器 - 进程内最新行情快照
+
+由 lifespan 启动的后台任务按固定频率批量刷新注册品种（黄金、白银、美元指数）行情，
+写入不可变快照。
+请求处理直接读取快照（O(1)），API延迟不再依赖第三方行情接口，
+上游请求频率也不再随流量增长。
+"""
+import asyncio
+import time
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, Mapping, Optional
+
+from loguru import logger
+
+from app.config import settings
+from app.services.batch_quote_service import QUOTE_SYMBOLS, batch_quote_service, resolve_symbols
+from app.services.quote_broadcaster import quote_broadcaster
+from app.services.tick_store import TICK_SYMBOLS, tick_store
+
+# 轮询的品种（同一数据源的品种合并为一次请求）
+POLL_SYMBOLS = tuple(QUOTE_SYMBOLS)
+
+
+@dataclass(frozen=True)
+class QuoteSnapshot:
+    """最新行情快照（不可变，整体替换）"""
+    quotes: Mapping[str, Mapping[str, Any]]  # 品种 -> 行情
+    fetched_at: Mapping[str, float]          # 品种 -> 最后成功刷新的时间戳
+    version: int
+
+    @property
+    def gold(self) -> Optional[Mapping[str, Any]]:
+        return self.quotes.get("gold")
+
+    @property
+    def dollar(self) -> Optional[Mapping[str, Any]]:
+        return self.quotes.get("dxy")
+
+    @property
+    def gold_at(self) -> float:
+        return self.fetched_at.get("gold", 0.0)
+
+    @property
+    def dollar_at(self) -> float:
+        return self.fetched_at.get("dxy", 0.0)
+
+
+# 当前快照（引用赋值是原子的，读取无需加锁）
+_snapshot: Optional[QuoteSnapshot] = None
+
+
+def get_quote_snapshot() -> Optional[QuoteSnapshot]:
+    """获取当前行情快照"""
+    return _snapshot
+
+
+def get_snapshot_quote(symbol: str, max_age: Optional[float] = None) -> Optional[Dict[str, Any]]:
+    """从快照读取品种行情（超过 max_age 秒视为过期，返回None）"""
+    snapshot = _snapshot
+    if snapshot is None:
+        return None
+    quote = snapshot.quotes.get(symbol)
+    max_age = settings.QUOTE_SNAPSHOT_MAX_AGE if max_age is None else max_age
+    if quote is None or time.time() - snapshot.fetched_at.get(symbol, 0.0) > max_age:
+        return None
+    return dict(quote)
+
+
+def get_snapshot_gold(max_age: Optional[float] = None) -> Optional[Dict[str, Any]]:
+    """从快照读取实时金价（超过 max_age 秒视为过期，返回None）"""
+    return get_snapshot_quote("gold", max_age)
+
+
+def get_snapshot_dollar(max_age: Optional[float] = None) -> Optional[Dict[str, Any]]:
+    """从快照读取实时美元指数（超过 max_age 秒视为过期，返回None）"""
+    return get_snapshot_quote("dxy", max_age)
+
+
+async def get_latest_quotes(symbols: Iterable[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+    """获取多个品种的最新行情：优先读取快照，快照缺失或过期的品种合并为一次批量请求"""
+    resolved = resolve_symbols(symbols)
+    quotes = {symbol: get_snapshot_quote(symbol) for symbol in resolved}
+    missing = [symbol for symbol, quote in quotes.items() if quote is None]
+    if missing:
+        quotes.update(await batch_quote_service.get_quotes(missing))
+    return quotes
+
+
+def snapshot_to_message(snapshot: QuoteSnapshot) -> Dict[str, Any]:
+    """将快照转换为推送消息"""
+    return {
+        "version": snapshot.version,
+        "gold": dict(snapshot.gold) if snapshot.gold else None,
+        "dollar": dict(snapshot.dollar) if snapshot.dollar else None,
+        "gold_at": snapshot.gold_at,
+        "dollar_at": snapshot.dollar_at,
+        "quotes": {symbol: dict(quote) for symbol, quote in snapshot.quotes.items()},
+    }
+
+
+class QuotePoller:
+    """后台行情轮询器"""
+
+    def __init__(self, interval: float):
+        """
+        Args:
+            interval: 轮询间隔（秒）
+        """
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def poll_once(self) -> QuoteSnapshot:
+        """刷新一次行情并替换快照（每个数据源一次批量请求，失败的品种保留上一次的值）"""
+        global _snapshot
+
+        fetched = await batch_quote_service.get_quotes(POLL_SYMBOLS)
+        now = time.time()
+        previous = _snapshot
+
+        quotes: Dict[str, Mapping[str, Any]] = dict(previous.quotes) if previous else {}
+        fetched_at: Dict[str, float] = dict(previous.fetched_at) if previous else {}
+        updated = [symbol for symbol, quote in fetched.items() if quote]
+        for symbol in updated:
+            quotes[symbol] = MappingProxyType(fetched[symbol])
+            fetched_at[symbol] = now
+
+        # 记录日内Tick（只记录本次成功刷新的品种）
+        for symbol in TICK_SYMBOLS:
+            if symbol in updated:
+                tick_store.append(symbol, quotes[symbol].get("price"), now)
+
+        _snapshot = QuoteSnapshot(
+            quotes=MappingProxyType(quotes),
+            fetched_at=MappingProxyType(fetched_at),
+            version=(previous.version + 1) if previous else 1
+        )
+
+        # 有新行情时推送给所有订阅客户端
+        if updated:
+            quote_broadcaster.publish(snapshot_to_message(_snapshot))
+        return _snapshot
+
+    async def _run(self) -> None:
+        logger.info(f"[行情轮询] 已启动，轮询间隔: {self.interval}s")
+        last_flush = time.monotonic()
+        while True:
+            started = time.monotonic()
+            try:
+                await self.poll_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"[行情轮询] 刷新失败: {e}")
+
+            # 定期将日内Tick追加写入磁盘
+            if started - last_flush >= settings.TICK_FLUSH_INTERVAL:
+                last_flush = started
+                try:
+                    await asyncio.to_thread(tick_store.flush)
+                except Exception as e:
+                    logger.error(f"[行情轮询] Tick落盘失败: {e}")
+
+            # 固定节奏：扣除本次刷新耗时
+            elapsed = time.monotonic() - started
+            await asyncio.sleep(max(0.0, self.interval - elapsed))
+
+    def start(self) -> None:
+        """在当前事件循环中启动轮询任务"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """停止轮询任务"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            await asyncio.to_thread(tick_store.flush)
+            logger.info("[行情轮询] 已停止")
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+
+# 全局实例
+quote_poller = QuotePoller(interval=settings.QUOTE_POLL_INTERVAL)
@@ -0,0 +1,283 @@
+"""日内行情Tick存储与OHLC K线聚合
+
+- Tick按 品种/交易日 分段，内存中使用 array('d') 紧凑存储（每个Tick 16字节）
+- 磁盘格式为列式二进制：每个分段两个只追加文件
+  ticks/{symbol}/{YYYYMMDD}.ts   时间戳列（float64，小端）
+  ticks/{symbol}/{YYYYMMDD}.px   价格列（float64，小端）
+- 追加Tick时增量更新 1m/5m/1h K线，查询无需重新扫描Tick
+
+Tick由进程内的后台行情轮询器写入，多个worker进程会追加同一个分段文件：
+落盘时持有分段锁文件 ticks/{symbol}/{YYYYMMDD}.lock（fcntl.flock），
+在锁内对齐两列长度，并且只追加时间戳晚于文件末尾的Tick，保证两列一一对应且时间戳递增。
+"""
+import os
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows 不支持 fcntl，退化为单进程写入
+    fcntl = None
+
+# 数据目录
+TICK_DIR = Path(__file__).parent.parent.parent / "cache" / "ticks"
+
+# 支持的K线周期（秒）
+BAR_INTERVALS = {
+    "1m": 60,
+    "5m": 300,
+    "1h": 3600,
+}
+
+# 支持的品种
+TICK_SYMBOLS = ("gold", "dxy")
+
+_LITTLE_ENDIAN = sys.byteorder == "little"
+
+
+def _to_disk(values: array) -> bytes:
+    if _LITTLE_ENDIAN:
+        return values.tobytes()
+    swapped = array('d', values)
+    swapped.byteswap()
+    return swapped.tobytes()
+
+
+def _from_disk(raw: bytes) -> array:
+    values = array('d')
+    # 忽略写入中断导致的不完整尾部
+    values.frombytes(raw[:len(raw) - len(raw) % values.itemsize])
+    if not _LITTLE_ENDIAN:
+        values.byteswap()
+    return values
+
+
+class BarAggregator:
+    """单一周期的增量K线聚合器（列式数组存储）"""
+
+    def __init__(self, interval: int):
+        self.interval = interval
+        self.starts = array('d')
+        self.opens = array('d')
+        self.highs = array('d')
+        self.lows = array('d')
+        self.closes = array('d')
+        self.counts = array('I')
+
+    def update(self, ts: float, price: float) -> None:
+        """加入一个Tick，更新对应K线"""
+        bucket = ts - ts % self.interval
+
+        if self.starts and self.starts[-1] == bucket:
+            i = len(self.starts) - 1
+        elif not self.starts or bucket > self.starts[-1]:
+            self.starts.append(bucket)
+            self.opens.append(price)
+            self.highs.append(price)
+            self.lows.append(price)
+            self.closes.append(price)
+            self.counts.append(1)
+            return
+        else:
+            # 乱序Tick：只更新最高/最低，不改变开盘/收盘
+            i = bisect_left(self.starts, bucket)
+            if i >= len(self.starts) or self.starts[i] != bucket:
+                return
+            self.highs[i] = max(self.highs[i], price)
+            self.lows[i] = min(self.lows[i], price)
+            self.counts[i] += 1
+            return
+
+        if price > self.highs[i]:
+            self.highs[i] = price
+        if price < self.lows[i]:
+            self.lows[i] = price
+        self.closes[i] = price
+        self.counts[i] += 1
+
+    def query(self, start_ts: float, end_ts: float) -> List[Dict]:
+        """查询 [start_ts, end_ts] 区间内开始的K线"""
+        lo = bisect_left(self.starts, start_ts - start_ts % self.interval)
+        hi = bisect_right(self.starts, end_ts)
+        return [
+            {
+                "time": datetime.fromtimestamp(self.starts[i]).isoformat(),
+                "timestamp": self.starts[i],
+                "open": self.opens[i],
+                "high": self.highs[i],
+                "low": self.lows[i],
+                "close": self.closes[i],
+                "ticks": self.counts[i],
+            }
+            for i in range(lo, hi)
+        ]
+
+
+class DaySegment:
+    """单个品种单个交易日的Tick分段"""
+
+    def __init__(self, symbol: str, day: date, root: Path):
+        self.symbol = symbol
+        self.day = day
+        self.ts_path = root / symbol / f"{day.strftime('%Y%m%d')}.ts"
+        self.px_path = root / symbol / f"{day.strftime('%Y%m%d')}.px"
+        self.lock_path = root / symbol / f"{day.strftime('%Y%m%d')}.lock"
+        self.ts = array('d')
+        self.px = array('d')
+        self.flushed = 0  # 已写入磁盘的Tick数
+        self.bars = {name: BarAggregator(seconds) for name, seconds in BAR_INTERVALS.items()}
+
+    def load(self) -> None:
+        """从磁盘加载分段并重建K线"""
+        if not self.ts_path.exists() or not self.px_path.exists():
+            return
+        ts = _from_disk(self.ts_path.read_bytes())
+        px = _from_disk(self.px_path.read_bytes())
+        # 两列长度不一致时（写入中断）以较短的为准
+        count = min(len(ts), len(px))
+        for i in range(count):
+            self._append(ts[i], px[i])
+        self.flushed = count
+
+    def _append(self, ts: float, price: float) -> None:
+        self.ts.append(ts)
+        self.px.append(price)
+        for aggregator in self.bars.values():
+            aggregator.update(ts, price)
+
+    def append(self, ts: float, price: float) -> bool:
+        """追加Tick（时间戳不递增的Tick会被忽略）"""
+        if self.ts and ts <= self.ts[-1]:
+            return False
+        self._append(ts, price)
+        return True
+
+    def flush(self) -> int:
+        """将未落盘的Tick追加写入磁盘（跨进程互斥），返回写入条数"""
+        if len(self.ts) - self.flushed <= 0:
+            return 0
+        self.ts_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.lock_path, 'ab') as lock:
+            if fcntl is not None:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+            try:
+                return self._flush_locked()
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+    def _flush_locked(self) -> int:
+        itemsize = self.ts.itemsize
+        ts_size = self.ts_path.stat().st_size if self.ts_path.exists() else 0
+        px_size = self.px_path.stat().st_size if self.px_path.exists() else 0
+        count = min(ts_size, px_size) // itemsize
+        # 写入中断导致两列长度不一致或不完整时，截断到两列都完整的位置
+        for path, size in ((self.ts_path, ts_size), (self.px_path, px_size)):
+            if size != count * itemsize:
+                os.truncate(path, count * itemsize)
+
+        # 其他进程已写入的最后时间戳，只追加晚于它的Tick
+        start = self.flushed
+        if count:
+            with open(self.ts_path, 'rb') as f:
+                f.seek((count - 1) * itemsize)
+                last_ts = _from_disk(f.read(itemsize))[0]
+            start = bisect_right(self.ts, last_ts, self.flushed)
+
+        written = len(self.ts) - start
+        if written > 0:
+            with open(self.ts_path, 'ab') as f:
+                f.write(_to_disk(self.ts[start:]))
+            with open(self.px_path, 'ab') as f:
+                f.write(_to_disk(self.px[start:]))
+        self.flushed = len(self.ts)
+        return written
+
+
+class TickStore:
+    """日内Tick存储（按交易日分段，只追加）"""
+
+    def __init__(self, root: Path = TICK_DIR, max_loaded_days: int = 7):
+        """
+        Args:
+            root: 数据目录
+            max_loaded_days: 内存中最多保留的历史分段数（当日分段始终保留）
+        """
+        self.root = root
+        self.max_loaded_days = max_loaded_days
+        self._segments: Dict[Tuple[str, date], DaySegment] = {}
+        self._lock = threading.Lock()
+
+    def _get_segment(self, symbol: str, day: date) -> DaySegment:
+        key = (symbol, day)
+        segment = self._segments.get(key)
+        if segment is None:
+            segment = DaySegment(symbol, day, self.root)
+            segment.load()
+            self._segments[key] = segment
+            self._evict()
+        return segment
+
+    def _evict(self) -> None:
+        """淘汰最早的已落盘历史分段"""
+        today = date.today()
+        history = sorted(
+            (key for key, seg in self._segments.items()
+             if key[1] != today and seg.flushed == len(seg.ts)),
+            key=lambda key: key[1]
+        )
+        while len(history) > self.max_loaded_days:
+            del self._segments[history.pop(0)]
+
+    def append(self, symbol: str, price: float, ts: Optional[float] = None) -> bool:
+        """追加一个Tick"""
+        if not price:
+            return False
+        ts = time.time() if ts is None else ts
+        day = datetime.fromtimestamp(ts).date()
+        with self._lock:
+            return self._get_segment(symbol, day).append(ts, float(price))
+
+    def flush(self) -> int:
+        """将所有分段中未落盘的Tick写入磁盘"""
+        written = 0
+        with self._lock:
+            for segment in list(self._segments.values()):
+                try:
+                    written += segment.flush()
+                except Exception as e:
+                    print(f"[TickStore] 写入 {segment.symbol} {segment.day} 失败: {e}")
+        return written
+
+    def get_bars(self, symbol: str, interval: str, start: datetime, end: datetime) -> List[Dict]:
+        """按时间范围查询K线"""
+        start_ts, end_ts = start.timestamp(), end.timestamp()
+        result: List[Dict] = []
+        day = start.date()
+        with self._lock:
+            while day <= end.date():
+                segment = self._get_segment(symbol, day)
+                result.extend(segment.bars[interval].query(start_ts, end_ts))
+                day += timedelta(days=1)
+        return result
+
+    def get_stats(self) -> Dict[str, Dict]:
+        """获取已加载分段的统计信息"""
+        with self._lock:
+            return {
+                f"{symbol}:{day.isoformat()}": {
+                    "ticks": len(seg.ts),
+                    "unflushed": len(seg.ts) - seg.flushed,
+                }
+                for (symbol, day), seg in self._segments.items()
+            }
+
+
+# 全局实例
+tick_store = TickStore()
@@ -3,7 +3,8 @@
 功能:
     1. 创建数据库（如果不存在）
     2. 创建数据表结构
-    3. 自动填充初始数据（从公开API获取2025年至今的黄金和美元指数数据）
+    3. 执行数据库迁移（migrations/*.sql，升级已有数据库的表结构）
+    4. 自动填充初始数据（从公开API获取2025年至今的黄金和美元指数数据）
 
 使用方式:
     cd backend
@@ -18,6 +19,7 @@
     SKIP_SEED: 设置为1跳过数据填充 (默认: 0)
 """
 
+import glob
 import os
 import sys
 import subprocess
@@ -95,6 +97,40 @@ def create_database_and_tables():
     print("✅ 所有数据表创建成功!")
 
 
+def run_migrations():
+    """按文件名顺序执行 migrations/*.sql（迁移语句可重复执行）"""
+    import pymysql
+
+    files = sorted(glob.glob(os.path.join('migrations', '*.sql')))
+    if not files:
+        return
+
+    print("\n📋 执行数据库迁移...")
+    conn = pymysql.connect(
+        host=DB_HOST,
+        user=DB_USER,
+        password=DB_PASSWORD,
+        database=DB_NAME,
+        port=DB_PORT,
+        charset='utf8mb4'
+    )
+    cursor = conn.cursor()
+    for path in files:
+        with open(path, 'r', encoding='utf-8') as f:
+            sql = f.read()
+        # 去掉注释行后按分号拆分
+        sql = '\n'.join(line for line in sql.splitlines() if not line.strip().startswith('--'))
+        for statement in sql.split(';'):
+            statement = statement.strip()
+            if statement:
+                cursor.execute(statement)
+        print(f"✅ {os.path.basename(path)}")
+
+    conn.commit()
+    cursor.close()
+    conn.close()
+
+
 def seed_database():
     """填充初始数据"""
     print("\n" + "=" * 60)
@@ -132,8 +168,11 @@ def main():
     try:
         # 1. 创建数据库和表
         create_database_and_tables()
+
+        # 2. 升级已有数据库的表结构
+        run_migrations()
         
-        # 2. 填充初始数据（除非跳过）
+        # 3. 填充初始数据（除非跳过）
         if not SKIP_SEED:
             success = seed_database()
             if not success:
@@ -0,0 +1,4 @@
+-- 更新日志新增 skipped_unchanged 状态（定时任务因输入无实质变化跳过分析）
+-- 适用于在此之前用 schema.sql 创建的数据库；可重复执行
+ALTER TABLE update_logs
+    MODIFY status ENUM('success', 'failed', 'skipped_unchanged') NOT NULL;
@@ -81,7 +81,7 @@ CREATE TABLE IF NOT EXISTS predictions (
 CREATE TABLE IF NOT EXISTS update_logs (
     id INT AUTO_INCREMENT PRIMARY KEY,
     data_type VARCHAR(50) NOT NULL,
-    status ENUM('success', 'failed') NOT NULL,
+    status ENUM('success', 'failed', 'skipped_unchanged') NOT NULL,
     records_affected INT,
     error_message TEXT,
     duration_seconds DECIMAL(10, 3),
@@ -0,0 +1,15 @@
+"""测试公共配置"""
+import pytest
+
+from app.services import cache_backends, cache_manager
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    """将文件缓存和一级缓存后端隔离到临时目录"""
+    monkeypatch.setattr(cache_manager, "CACHE_DIR", tmp_path)
+    monkeypatch.setattr(cache_backends, "GENERATION_FILE", tmp_path / ".generations")
+    monkeypatch.setattr(cache_manager.settings, "CACHE_BACKEND", "memory")
+    monkeypatch.setattr(cache_backends, "_backend", None)
+    yield tmp_path
+    monkeypatch.setattr(cache_backends, "_backend", None)
@@ -0,0 +1,95 @@
+"""AI分析流水线测试（任务替换为记录执行顺序的假任务）"""
+import threading
+import time
+
+import pytest
+
+from app.services import analysis_pipeline
+from app.services.analysis_pipeline import ANALYSIS_NODES, AnalysisNode, run_pipeline, with_dependents
+from app.services.cache_manager import CacheManager
+
+
+class FakeTasks:
+    """记录 (事件, 任务, 依赖输入) 的假任务，failing 中的任务返回降级结果"""
+
+    def __init__(self):
+        self.log = []
+        self.failing = set()
+        self._lock = threading.Lock()
+
+    def run(self, key):
+        def run(db, inputs):
+            with self._lock:
+                self.log.append(("start", key, sorted(inputs)))
+            time.sleep(0.05)
+            with self._lock:
+                self.log.append(("end", key, None))
+            return {"key": key, "fallback": key in self.failing}
+        return run
+
+    def position(self, event, key):
+        return next(i for i, (e, k, _) in enumerate(self.log) if e == event and k == key)
+
+
+@pytest.fixture
+def tasks(cache_dir, monkeypatch):
+    fake = FakeTasks()
+    for key, node in list(ANALYSIS_NODES.items()):
+        monkeypatch.setitem(ANALYSIS_NODES, key, AnalysisNode(key, node.name, fake.run(key), node.deps))
+    return fake
+
+
+def test_downstream_runs_after_all_dependencies(tasks):
+    results = run_pipeline(list(ANALYSIS_NODES), max_workers=3)
+
+    assert all(result["key"] == key for key, result in results.items())
+    # 三个独立任务并发执行：全部开始后才有任务结束
+    assert {key for _, key, _ in tasks.log[:3]} == set(analysis_pipeline.FACTOR_KEYS)
+    last_factor_end = max(tasks.position("end", key) for key in analysis_pipeline.FACTOR_KEYS)
+    for key in ("investment_advice", "market_summary"):
+        assert tasks.position("start", key) > last_factor_end
+        assert tasks.log[tasks.position("start", key)][2] == sorted(analysis_pipeline.FACTOR_KEYS)
+
+
+def test_failed_dependency_without_cache_skips_downstream(tasks):
+    tasks.failing.add("bearish_factors")
+    progress = analysis_pipeline.PipelineProgress("测试", list(ANALYSIS_NODES))
+    results = run_pipeline(list(ANALYSIS_NODES), progress=progress)
+
+    status = progress.to_dict()["tasks"]
+    assert status["bearish_factors"]["status"] == "failed"
+    assert status["investment_advice"]["status"] == "skipped"
+    assert "bearish_factors" in status["investment_advice"]["reason"]
+    assert results["market_summary"] is None
+
+
+def test_failed_dependency_falls_back_to_cache(tasks):
+    tasks.failing.add("bearish_factors")
+    for key in analysis_pipeline.FACTOR_KEYS:  # 不在计划内的依赖读取缓存
+        CacheManager(key).set({"cached": key})
+    results = run_pipeline(["bearish_factors", "investment_advice"])
+
+    assert results["investment_advice"]["key"] == "investment_advice"
+    assert [key for event, key, _ in tasks.log if event == "start"] == ["bearish_factors", "investment_advice"]
+
+
+def test_gate_skips_unchanged_and_sees_refreshed_deps(tasks):
+    calls = []
+
+    def gate(key, refreshed_deps):
+        calls.append((key, sorted(refreshed_deps)))
+        return key != "institution_predictions", "测试"
+
+    CacheManager("institution_predictions").set({"institutions": []})
+    progress = analysis_pipeline.PipelineProgress("测试", list(ANALYSIS_NODES))
+    run_pipeline(list(ANALYSIS_NODES), progress=progress, gate=gate)
+
+    status = progress.to_dict()["tasks"]
+    assert status["institution_predictions"]["status"] == analysis_pipeline.SKIPPED_UNCHANGED
+    assert status["market_summary"]["status"] == "done"
+    assert ("market_summary", ["bearish_factors", "bullish_factors"]) in calls
+
+
+def test_with_dependents_adds_downstream_in_order():
+    assert with_dependents(["bearish_factors"]) == ["bearish_factors", "investment_advice", "market_summary"]
+    assert with_dependents(["market_summary"]) == ["market_summary"]
@@ -0,0 +1,128 @@
+"""缓存管理器测试"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from app.services import cache_backends, cache_manager
+from app.services.cache_manager import CacheManager
+
+
+def test_realtime_failures_stay_off_disk(cache_dir, monkeypatch):
+    cache = CacheManager("realtime_price")
+    assert not cache.persist
+
+    cache.set({"price": 600.0, "fallback": True, "error": "timeout"})
+    assert cache.failure_state()["failures"] == 1
+    assert list(cache_dir.glob("*.cache")) == []
+
+    reads = []
+    original = cache_manager.read_timestamp
+    monkeypatch.setattr(cache_manager, "read_timestamp", lambda path: reads.append(path) or original(path))
+    cache.set({"price": 601.0})
+    cache.set({"price": 602.0})
+    assert reads == []
+    assert cache.failure_state() is None
+    assert cache.get() == {"price": 602.0}
+
+
+def test_persisted_failures_cleared_on_success(cache_dir):
+    cache = CacheManager("bullish_factors")
+    cache.record_failure("boom")
+    assert (cache_dir / "bullish_factors.failure.cache").exists()
+
+    cache.set({"bullish_factors": [1]})
+    assert cache.failure_state() is None
+    assert not (cache_dir / "bullish_factors.failure.cache").exists()
+
+
+def test_single_flight_shares_one_refresh(cache_dir):
+    cache = CacheManager("market_summary")
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        cache.set({"summary": "new"})
+        return {"summary": "new"}
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        first = cache.single_flight(compute, executor)
+        started.wait(5)
+        second = cache.single_flight(compute, executor)
+        assert second is first
+        assert cache.is_refreshing()
+        release.set()
+        assert first.result(5) == {"summary": "new"}
+
+    assert len(calls) == 1
+    assert not cache.is_refreshing()
+    assert not cache.lock_path.exists()
+
+
+def test_single_flight_waits_for_other_process(cache_dir, monkeypatch):
+    monkeypatch.setattr(cache_manager, "LOCK_POLL_INTERVAL", 0.01)
+    cache = CacheManager("market_summary")
+    cache.lock_path.write_text("other-process")  # 其他进程持有刷新锁
+
+    def other_process_finishes():
+        CacheManager("market_summary").set({"summary": "from other process"})
+        cache.lock_path.unlink()
+
+    threading.Timer(0.1, other_process_finishes).start()
+    calls = []
+    result = cache.single_flight(lambda: calls.append(1)).result(5)
+    assert result == {"summary": "from other process"}
+    assert calls == []
+
+
+def test_single_flight_failure_records_backoff(cache_dir):
+    cache = CacheManager("market_summary")
+
+    def compute():
+        raise RuntimeError("LLM timeout")
+
+    future = cache.single_flight(compute)
+    assert isinstance(future.exception(), RuntimeError)
+    assert cache.backoff_remaining() > 0
+    assert cache.refresh_in_background(compute) is None  # 退避期内不再提交刷新
+
+
+def test_soft_and_hard_ttl(cache_dir, monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(cache_manager.time, "time", lambda: now[0])
+    cache = CacheManager("ttl_test", ttl=60, hard_ttl=300)
+    cache.set({"value": 1})
+
+    now[0] += 59
+    assert cache.get() == {"value": 1}
+    assert cache.exists()
+
+    # 超过软过期：get() 视为过期，get_entry() 仍返回旧数据（stale）
+    now[0] += 2
+    assert cache.get() is None
+    assert not cache.exists()
+    entry = cache.get_entry()
+    assert entry.data == {"value": 1} and entry.stale and entry.age == 61
+
+    # 超过硬过期：视为未命中（一级缓存和文件缓存都不返回）
+    now[0] += 240
+    assert cache.get_entry() is None
+
+
+def test_stale_entry_reloaded_from_file(cache_dir, monkeypatch):
+    CacheManager("ttl_test", ttl=60, hard_ttl=300).set({"value": 1})
+    monkeypatch.setattr(cache_backends, "_backend", None)  # 模拟进程重启
+
+    entry = CacheManager("ttl_test", ttl=0, hard_ttl=300).get_entry()
+    assert entry.data == {"value": 1} and entry.stale
+
+
+def test_invalidate_marks_tagged_cache_stale(cache_dir):
+    cache = CacheManager("market_summary")
+    cache.set({"summary": "old"})
+    assert cache.get() == {"summary": "old"}
+
+    cache.invalidate()
+    assert cache.get() is None
+    assert cache.get_entry().stale
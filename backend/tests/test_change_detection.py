@@ -0,0 +1,58 @@
+"""AI分析变更检测测试"""
+import pytest
+
+from app.services import change_detection
+from app.services.cache_manager import CacheManager
+from app.services.change_detection import check_inputs, record_inputs
+
+NOW = 1_000_000.0
+
+
+@pytest.fixture
+def recorded(cache_dir, monkeypatch):
+    """各分析已有缓存，并记录了上次运行的快照"""
+    monkeypatch.setattr(change_detection.settings, "ANALYSIS_CHANGE_DETECTION", True)
+    monkeypatch.setattr(change_detection.settings, "ANALYSIS_MAX_STALENESS", 86400)
+    monkeypatch.setattr(change_detection.settings, "ANALYSIS_PRICE_CHANGE_THRESHOLD", 0.5)
+    for key in ("bullish_factors", "investment_advice"):
+        CacheManager(key).set({"key": key})
+        record_inputs(key, {"news_id": 10, "price": 2000.0, "at": NOW})
+
+
+def snapshot(news_id=10, price=2000.0, at=NOW + 3600):
+    return {"news_id": news_id, "price": price, "at": at}
+
+
+def test_unchanged_inputs_skip(recorded):
+    assert check_inputs("bullish_factors", snapshot(price=2005.0)) == (False, "输入无实质变化")
+
+
+def test_new_news_triggers_news_tagged_analysis(recorded):
+    assert check_inputs("bullish_factors", snapshot(news_id=11)) == (True, "有新增新闻")
+
+
+def test_price_move_over_threshold(recorded):
+    should_run, reason = check_inputs("investment_advice", snapshot(price=2010.0))
+    assert should_run and reason == "金价变动 +0.50%"
+    assert not check_inputs("investment_advice", snapshot(price=2009.0))[0]
+
+
+def test_refreshed_upstream_triggers_factor_tagged_analysis(recorded):
+    assert check_inputs("investment_advice", snapshot(), ["bullish_factors"]) == \
+        (True, "上游分析已更新: bullish_factors")
+    assert not check_inputs("bullish_factors", snapshot(), ["bearish_factors"])[0]
+
+
+def test_missing_cache_record_or_staleness_forces_run(recorded):
+    assert check_inputs("market_summary", snapshot()) == (True, "无缓存")
+
+    CacheManager("market_summary").set({"key": "market_summary"})
+    assert check_inputs("market_summary", snapshot()) == (True, "无上次运行记录")
+
+    should_run, reason = check_inputs("bullish_factors", snapshot(at=NOW + 86400))
+    assert should_run and "超过最长间隔" in reason
+
+
+def test_disabled_always_runs(recorded, monkeypatch):
+    monkeypatch.setattr(change_detection.settings, "ANALYSIS_CHANGE_DETECTION", False)
+    assert check_inputs("bullish_factors", snapshot())[0]
@@ -0,0 +1,50 @@
+"""因子服务测试（降级结果不写入因子表）"""
+import pytest
+
+from app.services.bearish_factor_service import BearishFactorService
+from app.services.bullish_factor_service import BullishFactorService
+from app.services import zhipu_service
+from app.services.combined_factor_service import CombinedFactorAnalyzer
+
+
+@pytest.fixture(autouse=True)
+def zhipu_client(monkeypatch):
+    """分析器初始化时创建智谱AI客户端（不发起请求），使用测试密钥"""
+    monkeypatch.setattr(zhipu_service.settings, "ZHIPU_API_KEY", "test-key")
+    monkeypatch.setattr(zhipu_service, "_zhipu_service", None)
+
+
+@pytest.fixture
+def saved(monkeypatch):
+    calls = []
+    for service in (BullishFactorService, BearishFactorService):
+        monkeypatch.setattr(service(None).analyzer.__class__, "save_to_database",
+                            lambda self, db, result: calls.append(result))
+    return calls
+
+
+@pytest.mark.parametrize("service_class,side", [(BullishFactorService, "bullish"), (BearishFactorService, "bearish")])
+def test_fallback_result_is_not_saved(cache_dir, saved, monkeypatch, service_class, side):
+    service = service_class(None)
+    fallback = service.analyzer._get_default_factors("AI分析失败")
+    monkeypatch.setattr(service.analyzer, "analyze", lambda db, use_llm_cache=True: fallback)
+
+    assert service._analyze_and_save(None) is fallback
+    assert saved == []
+    assert service.cache.get() is None
+    assert service.cache.failure_state()["failures"] == 1
+
+    result = {f"{side}_factors": [{"id": "a", "title": "b"}]}
+    monkeypatch.setattr(service.analyzer, "analyze", lambda db, use_llm_cache=True: result)
+    service._analyze_and_save(None)
+    assert saved == [result]
+    assert service.cache.get() == result
+
+
+def test_combined_skips_fallback_side(saved):
+    analyzer = CombinedFactorAnalyzer()
+    bullish = {"bullish_factors": [{"id": "a", "title": "b"}]}
+    bearish = analyzer.analyzers["bearish"]._get_default_factors("搜索失败")
+
+    analyzer.save_to_database(None, {"bullish": bullish, "bearish": bearish})
+    assert saved == [bullish]
@@ -0,0 +1,58 @@
+"""因子流式刷新测试"""
+import threading
+
+from app.services.cache_manager import CacheManager
+from app.services.factor_stream_service import (
+    FactorArrayParser, _commit, parse_json_content, validate_factors
+)
+
+CONTENT = (
+    '```json\n{"bullish_factors": [{"id": "fed-policy", "title": "降息 {预期}", "details": ["a\\"]"]},'
+    ' {"id": "central-bank", "title": "央行购金", "impact": "high"}], "analysis_summary": "总结"}\n```'
+)
+
+
+def test_parser_yields_each_factor_once_complete():
+    parser = FactorArrayParser("bullish_factors")
+    items = []
+    for i in range(0, len(CONTENT), 7):
+        items.extend(parser.feed(CONTENT[i:i + 7]))
+
+    assert [item["id"] for item in items] == ["fed-policy", "central-bank"]
+    assert items[0]["details"] == ['a"]']
+    assert parser.finished
+
+
+def test_parser_ignores_other_arrays():
+    parser = FactorArrayParser("bearish_factors")
+    assert parser.feed(CONTENT) == []
+    assert not parser.finished
+
+
+def test_parse_and_validate():
+    result = parse_json_content(CONTENT)
+    assert validate_factors(result, "bullish_factors") is None
+    assert validate_factors(result, "bearish_factors") == "AI返回结果中没有因子数据"
+    assert validate_factors(parse_json_content("没有JSON"), "bullish_factors") == "AI返回结果解析失败"
+
+    result["bullish_factors"][1]["impact"] = "extreme"
+    assert "impact 无效" in validate_factors(result, "bullish_factors")
+
+
+def test_commit_waits_for_inflight_refresh(cache_dir):
+    cache = CacheManager("bullish_factors")
+    started, release = threading.Event(), threading.Event()
+
+    def background():
+        started.set()
+        release.wait(5)
+        cache.set({"source": "background"})
+
+    thread = threading.Thread(target=lambda: cache.single_flight(background))
+    thread.start()
+    started.wait(5)
+    threading.Timer(0.1, release.set).start()
+
+    assert _commit(cache, lambda: cache.set({"source": "stream"}))
+    thread.join(5)
+    assert cache.get()["source"] == "stream"
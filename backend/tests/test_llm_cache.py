@@ -0,0 +1,63 @@
+"""LLM响应缓存测试"""
+import pytest
+
+from app.services.llm_cache import LLMResponseCache, normalize_inputs
+
+
+@pytest.fixture
+def llm_cache(cache_dir):
+    return LLMResponseCache(ttl=60)
+
+
+def make_call(results):
+    calls = []
+
+    def call():
+        calls.append(1)
+        return results[min(len(calls), len(results)) - 1]
+    return call, calls
+
+
+def test_normalize_inputs_ignores_key_order_and_whitespace():
+    assert normalize_inputs({"b": "a  b\n", "a": 1.000001}) == normalize_inputs({"a": 1.0, "b": "a b"})
+
+
+def test_identical_inputs_skip_call(llm_cache):
+    call, calls = make_call([{"value": 1}])
+    first = llm_cache.get_or_call("t", "m", 0.7, "1", {"news": [1, 2]}, call)
+    first["value"] = 2  # 返回副本，修改不影响缓存
+    second = llm_cache.get_or_call("t", "m", 0.7, "1", {"news": [1, 2]}, call)
+
+    assert len(calls) == 1
+    assert second == {"value": 1}
+
+
+def test_changed_inputs_or_version_call_again(llm_cache):
+    call, calls = make_call([{"value": 1}])
+    llm_cache.get_or_call("t", "m", 0.7, "1", {"news": [1]}, call)
+    llm_cache.get_or_call("t", "m", 0.7, "1", {"news": [1, 2]}, call)
+    llm_cache.get_or_call("t", "m", 0.7, "2", {"news": [1, 2]}, call)
+    assert len(calls) == 3
+
+
+def test_reuse_false_always_calls_and_stores(llm_cache):
+    call, calls = make_call([{"value": 1}, {"value": 2}])
+    llm_cache.get_or_call("t", "m", 0.7, "1", {}, call)
+    forced = llm_cache.get_or_call("t", "m", 0.7, "1", {}, call, reuse=False)
+    reused = llm_cache.get_or_call("t", "m", 0.7, "1", {}, call)
+
+    assert len(calls) == 2
+    assert forced == reused == {"value": 2}
+
+
+def test_fallback_and_invalid_results_not_cached(llm_cache):
+    call, calls = make_call([{"fallback": True}])
+    llm_cache.get_or_call("t", "m", 0.7, "1", {}, call)
+    llm_cache.get_or_call("t", "m", 0.7, "1", {}, call)
+
+    invalid, invalid_calls = make_call([{"factors": []}])
+    for _ in range(2):
+        llm_cache.get_or_call("v", "m", 0.7, "1", {}, invalid, is_valid=lambda r: bool(r["factors"]))
+
+    assert len(calls) == 2
+    assert len(invalid_calls) == 2
@@ -0,0 +1,46 @@
+"""有界 LRU 缓存测试"""
+from app.services import lru_cache
+from app.services.lru_cache import BoundedLRU
+
+
+def test_evicts_least_recently_used_by_count():
+    cache = BoundedLRU(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # a 变为最近使用
+    cache.set("c", 3)
+
+    assert cache.keys() == ["a", "c"]
+    assert cache.evictions == 1
+    assert cache.stats()["keys"]["b"]["evictions"] == 1
+
+
+def test_evicts_by_bytes_and_skips_oversized_values():
+    cache = BoundedLRU(max_entries=10, max_bytes=100)
+    cache.set("a", "x", size=60)
+    cache.set("b", "y", size=60)
+    assert cache.keys() == ["b"]
+
+    cache.set("big", "z", size=101)
+    assert cache.get("big") is None
+    assert cache.stats()["bytes"] == 60
+
+    cache.set("b", "y2", size=30)  # 覆盖写入按新大小计算
+    assert cache.stats()["bytes"] == 30
+
+
+def test_ttl_and_is_valid_count_as_misses(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(lru_cache.time, "time", lambda: now[0])
+    cache = BoundedLRU(ttl=10)
+    cache.set("a", (1, 5.0))
+    assert cache.get("a") == (1, 5.0)
+
+    assert cache.get("a", is_valid=lambda value: value[1] >= 6.0) is None
+    assert len(cache) == 0
+
+    cache.set("a", (1, 5.0))
+    now[0] += 10
+    assert cache.get("a", "default") == "default"
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 2, 0.3333)
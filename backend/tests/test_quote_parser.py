@@ -0,0 +1,47 @@
+"""行情解析器测试"""
+from app.services.quote_parser import parse_quotes
+
+SINA_PAYLOAD = (
+    'var hq_str_hf_GC="2880.500,,2880.400,2880.600,2890.000,2870.000,10:30:00,2870.100,2875.000,0,1,0,'
+    '2026-02-01,纽约黄金,0";\n'
+    'var hq_str_DINIW="10:30:00,107.8500,107.8400,107.8600,0,107.5000,108.0000,107.4000,107.6000,美元指数";\n'
+    'var hq_str_hf_XX="";\n'
+).encode("gb2312")
+
+TENCENT_PAYLOAD = (
+    'v_hf_GC="2880.5,0.36,2875.0,2890.0,2870.0,0,0,2870.1,0,0,0,0,2026-02-01,纽约黄金";\n'
+    'v_hf_SI="32.15,0.5,32.0";\n'
+).encode("gbk")
+
+
+def test_parse_sina_futures_and_fx():
+    quotes = parse_quotes(SINA_PAYLOAD, "sina")
+
+    assert set(quotes) == {"hf_GC", "DINIW"}  # 空记录（无效代码）不包含在内
+    gold = quotes["hf_GC"]
+    assert gold["price"] == 2880.5
+    assert (gold["bid"], gold["ask"], gold["high"], gold["low"]) == (2880.4, 2880.6, 2890.0, 2870.0)
+    assert (gold["prev_close"], gold["open"]) == (2870.1, 2875.0)
+    assert (gold["date"], gold["name"], gold["time"]) == ("2026-02-01", "纽约黄金", "10:30:00")
+
+    dxy = quotes["DINIW"]
+    assert (dxy["price"], dxy["open"], dxy["prev_close"]) == (107.85, 107.5, 107.6)
+    assert dxy["name"] == "美元指数"
+
+
+def test_parse_tencent_skips_short_records():
+    quotes = parse_quotes(TENCENT_PAYLOAD, "tencent")
+
+    assert set(quotes) == {"hf_GC"}
+    gold = quotes["hf_GC"]
+    assert (gold["price"], gold["open"], gold["high"], gold["low"]) == (2880.5, 2875.0, 2890.0, 2870.0)
+    assert gold["prev_close"] == 2870.1
+    assert gold["date"] == "2026-02-01"
+
+
+def test_blank_numeric_fields_parse_as_zero():
+    payload = b'var hq_str_hf_GC="2880.5,,x,,,,,,,,,,2026-02-01,";'
+    gold = parse_quotes(payload, "sina")["hf_GC"]
+    assert gold["price"] == 2880.5
+    assert gold["bid"] == 0.0 and gold["low"] == 0.0
+    assert gold["name"] == ""
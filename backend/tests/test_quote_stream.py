@@ -0,0 +1,53 @@
+"""行情 WebSocket 推送测试"""
+import asyncio
+
+from app.routers.gold_prices import stream_quotes_ws
+from app.services.quote_broadcaster import quote_broadcaster
+
+
+class FakeWebSocket:
+    """按顺序返回客户端消息，记录发送的行情"""
+
+    def __init__(self, messages):
+        self.messages = asyncio.Queue()
+        for message in messages:
+            self.messages.put_nowait(message)
+        self.sent = []
+
+    async def accept(self):
+        pass
+
+    async def receive(self):
+        return await self.messages.get()
+
+    async def send_json(self, data):
+        self.sent.append(data)
+
+
+def run(websocket, publish=None):
+    async def main():
+        handler = asyncio.ensure_future(stream_quotes_ws(websocket))
+        await asyncio.sleep(0.01)
+        if publish is not None:
+            quote_broadcaster.publish(publish)
+            await asyncio.sleep(0.01)
+        websocket.messages.put_nowait({"type": "websocket.disconnect", "code": 1000})
+        await asyncio.wait_for(handler, timeout=2)
+    asyncio.run(main())
+
+
+def test_disconnect_without_quotes_unsubscribes():
+    quote_broadcaster._latest = None
+    websocket = FakeWebSocket([{"type": "websocket.receive", "text": "ping"}])
+    run(websocket)  # 休市时没有新行情，断开后也要及时退出
+    assert not quote_broadcaster._subscribers
+    assert websocket.sent == []
+
+
+def test_published_quotes_are_sent():
+    quote_broadcaster._latest = None
+    websocket = FakeWebSocket([])
+    message = {"version": 1, "gold": {"price": 2880.5}}
+    run(websocket, publish=message)
+    assert websocket.sent == [message]
+    assert not quote_broadcaster._subscribers
@@ -0,0 +1,40 @@
+"""共享内存缓存后端测试（两个后端实例模拟两个进程）"""
+import os
+import time
+
+from app.services.cache_backends import SharedMemoryBackend
+
+
+def test_delete_unlinks_segment_for_all_processes(tmp_path):
+    first, second = SharedMemoryBackend(str(tmp_path)), SharedMemoryBackend(str(tmp_path))
+    first.set("gold_price", {"price": 600.0}, 1.0)
+    assert second.get("gold_price") == ({"price": 600.0}, 1.0)
+
+    second.delete("gold_price")
+    assert not (tmp_path / "gold_price.seg").exists()
+    assert first.get("gold_price") is None
+
+    # 持有已删除文件映射的进程重新创建共享段，对其他进程可见
+    first.set("gold_price", {"price": 601.0}, 2.0)
+    assert second.get("gold_price") == ({"price": 601.0}, 2.0)
+
+
+def test_clear_removes_all_segments(tmp_path):
+    backend = SharedMemoryBackend(str(tmp_path))
+    backend.set("a", {"v": 1}, 1.0)
+    backend.set("b", {"v": 2}, 1.0)
+    backend.clear()
+    assert list(tmp_path.glob("*.seg")) == []
+    assert backend.keys() == []
+
+
+def test_segment_count_is_capped(tmp_path):
+    backend = SharedMemoryBackend(str(tmp_path), max_segments=4)
+    for i in range(4):
+        backend.set(f"query:{i}", {"v": i}, 1.0)
+        os.utime(tmp_path / f"query:{i}.seg", (time.time() - 100 + i,) * 2)
+
+    backend.set("query:new", {"v": "new"}, 1.0)
+    assert len(list(tmp_path.glob("*.seg"))) <= 4
+    assert backend.get("query:0") is None
+    assert backend.get("query:new") == ({"v": "new"}, 1.0)
@@ -0,0 +1,70 @@
+"""日内Tick存储测试"""
+from datetime import datetime
+
+from app.services.tick_store import DaySegment, TickStore, _from_disk
+
+BASE = datetime(2026, 2, 2, 9, 30).timestamp()
+
+
+def test_bars_aggregate_ticks(tmp_path):
+    store = TickStore(root=tmp_path)
+    for i, price in enumerate([10.0, 12.0, 9.0, 11.0]):
+        store.append("gold", price, BASE + i)
+
+    bars = store.get_bars("gold", "1m", datetime.fromtimestamp(BASE), datetime.fromtimestamp(BASE + 60))
+
+    assert len(bars) == 1
+    assert (bars[0]["open"], bars[0]["high"], bars[0]["low"], bars[0]["close"]) == (10.0, 12.0, 9.0, 11.0)
+    assert bars[0]["ticks"] == 4
+
+
+def test_flush_and_reload(tmp_path):
+    store = TickStore(root=tmp_path)
+    for i in range(3):
+        store.append("gold", 100.0 + i, BASE + i)
+    assert store.flush() == 3
+    assert store.flush() == 0
+
+    reloaded = TickStore(root=tmp_path)
+    bars = reloaded.get_bars("gold", "1m", datetime.fromtimestamp(BASE), datetime.fromtimestamp(BASE + 60))
+    assert bars[0]["ticks"] == 3
+    assert bars[0]["close"] == 102.0
+
+
+def test_concurrent_writers_keep_columns_aligned_and_ordered(tmp_path):
+    """两个进程各自的分段写入同一文件：只追加晚于文件末尾的Tick"""
+    day = datetime.fromtimestamp(BASE).date()
+    writer_a = DaySegment("gold", day, tmp_path)
+    writer_b = DaySegment("gold", day, tmp_path)
+    for i in range(5):
+        writer_a.append(BASE + i, 100.0 + i)
+        writer_b.append(BASE + i + 0.5, 200.0 + i)
+
+    writer_a.flush()
+    writer_b.flush()  # 只有晚于 A 最后一个Tick的部分被追加
+    writer_a.append(BASE + 10, 110.0)
+    writer_a.flush()
+
+    ts = _from_disk(writer_a.ts_path.read_bytes())
+    px = _from_disk(writer_a.px_path.read_bytes())
+    assert len(ts) == len(px)
+    assert list(ts) == sorted(ts)
+    assert list(px) == [100.0, 101.0, 102.0, 103.0, 104.0, 204.0, 110.0]
+
+
+def test_flush_repairs_truncated_column(tmp_path):
+    day = datetime.fromtimestamp(BASE).date()
+    segment = DaySegment("gold", day, tmp_path)
+    segment.append(BASE, 100.0)
+    segment.flush()
+    # 模拟写入中断：时间戳列多写了半条记录
+    with open(segment.ts_path, "ab") as f:
+        f.write(b"\x00" * 4)
+
+    segment.append(BASE + 1, 101.0)
+    segment.flush()
+
+    ts = _from_disk(segment.ts_path.read_bytes())
+    px = _from_disk(segment.px_path.read_bytes())
+    assert list(ts) == [BASE, BASE + 1]
+    assert list(px) == [100.0, 101.0]